@@ -9,6 +9,9 @@
 #                   hdpcli path/to/my.hdp.yml
 #                 Specific file, remote:
 #                   hdpcli http://example.org/path/my.hdp.yml
+#                 Transpose each file of an directory to many languages:
+#                   hdpcli --transpose-multiplum RUS,POR,ARA \
+#                     --transpose-multiplum-exitum path/to/output/ path/to/
 #
 #   DESCRIPTION:  HDP Declarative Programming Command Line Interface
 #
@@ -63,9 +66,12 @@
 
 import sys
 import os
+import json
 import logging
 import argparse
-# import tempfile
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from distutils.util import strtobool
 # import base64
@@ -92,6 +98,14 @@ from hxlm.core.model.hdp import (
     HDP
 )
 
+from hxlm.core.schema.vocab import (
+    ItemHVocab
+)
+
+from hxlm.core.hdp.util.common import (
+    get_vkg_languages
+)
+
 from hxlm.core.internal.keystore import (
     HKeystore
 )
@@ -159,6 +173,98 @@ def prompt_confirmation(message: str) -> bool:
     return yesorno
 
 
+# Already parsed vocabulary (ItemHVocab().to_dict()), set once per process of
+# hdpcli --transpose-multiplum and only read after that
+_TRANSPOSE_MULTIPLUM_VOCAB = None
+
+
+def _transpose_multiplum_initiale(vocab: dict):
+    """Initializer of each process of hdpcli --transpose-multiplum"""
+    global _TRANSPOSE_MULTIPLUM_VOCAB
+    _TRANSPOSE_MULTIPLUM_VOCAB = vocab
+
+
+def get_transpose_multiplum_archivum(hdp_file: str, linguam: str) -> str:
+    """File name of hdp_file transposed to linguam (an ISO 639-3 code)
+
+    The language code already in the name (if any) is replaced. Output is
+    always YAML.
+
+    >>> get_transpose_multiplum_archivum('tests/salve-mundi.lat.hdp.yml',
+    ...                                  'RUS')
+    'salve-mundi.rus.hdp.yml'
+    >>> get_transpose_multiplum_archivum('salve-mundi.hrecipe.mul.hdpr.yml',
+    ...                                  'POR')
+    'salve-mundi.hrecipe.por.hdpr.yml'
+    >>> get_transpose_multiplum_archivum('salve-mundi.hdp.json', 'ARA')
+    'salve-mundi.ara.hdp.yml'
+    """
+    nomen = os.path.basename(hdp_file)
+    extension = ''
+    for item in HDP.HDP_YML_EXTENSIONS + HDP.HDP_JSON_EXTENSIONS:
+        if nomen.endswith(item):
+            nomen = nomen[:-len(item)]
+            extension = item.replace('.json', '.yml')
+            break
+    parts = nomen.rsplit('.', 1)
+    if len(parts) == 2 and len(parts[1]) == 3 and parts[1].isalpha():
+        nomen = parts[0]
+    return nomen + '.' + linguam.lower() + (extension or '.hdp.yml')
+
+
+def _transpose_multiplum_archivum(hdp_file: str, exitum: list,
+                                  hdp_filters: dict = None) -> dict:
+    """Load one HDP file and write it transposed to each language of exitum
+
+    Runs on an worker process of hdpcli --transpose-multiplum. Each output
+    is written to an temporary file and then renamed, so an reader never
+    see an incomplete file.
+
+    Args:
+        hdp_file (str): Path to the HDP file
+        exitum (list): List of (linguam, archivum, skipped). If skipped is
+                       not None, is the reason to not write archivum
+        hdp_filters (dict, optional): Same as HDP.get_prepared_filter()
+
+    Returns:
+        dict: timings (seconds) and sizes (bytes) of input and outputs
+    """
+    statisticae = {
+        'fontem': hdp_file,
+        'bytes': os.path.getsize(hdp_file),
+        'exitum': {}
+    }
+    start = time.perf_counter()
+
+    hdp = HDP(hdp_entry_point=hdp_file, vocab=_TRANSPOSE_MULTIPLUM_VOCAB)
+    statisticae['load_seconds'] = time.perf_counter() - start
+
+    umask = os.umask(0)
+    os.umask(umask)
+    for linguam, archivum, skipped in exitum:
+        if skipped:
+            statisticae['exitum'][linguam] = {
+                'archivum': archivum, 'skipped': skipped}
+            continue
+        item_start = time.perf_counter()
+        hdp_rules = hdp.export_yml(hdp_filters, linguam)
+        with tempfile.NamedTemporaryFile(
+                'wb', dir=os.path.dirname(archivum) or '.',
+                delete=False) as exitum_tmp:
+            exitum_tmp.write(hdp_rules)
+        # NamedTemporaryFile is 0600; the output is not private
+        os.chmod(exitum_tmp.name, 0o666 & ~umask)
+        os.replace(exitum_tmp.name, archivum)
+        statisticae['exitum'][linguam] = {
+            'archivum': archivum,
+            'bytes': len(hdp_rules),
+            'seconds': time.perf_counter() - item_start
+        }
+
+    statisticae['seconds'] = time.perf_counter() - start
+    return statisticae
+
+
 class HDPCLI:
     """
     HDP Declarative Programming Command Line Interface
@@ -183,9 +289,12 @@ class HDPCLI:
         # TODO: while the default of HDP (and later also from the hdpcli) is
         #       not allow online initialization, at this moment, for testing,
         #       we're allowing here. (Emerson Rocha, 2021-03-13 01:48 UTC)
+        # hdpcli runs from an `if __name__ == '__main__'` guard, so can
+        # parse directories on an process pool
         hdp = HDP(hdp_entry_point=hdp_entry_point,
                   online_unrestricted_init=True,
-                  debug=debug)
+                  debug=debug,
+                  processus=os.cpu_count() or 1)
 
         # if debug:
         #     print('hdpcli ... hdp', hdp)
@@ -391,6 +500,137 @@ class HDPCLI:
         return secrets.token_urlsafe(size)
         # return 'test'
 
+    def _exec_transpose_multiplum(self, args, debug: bool = False,
+                                  stderr=sys.stderr) -> int:
+        """Transpose each HDP file of args.infile to many languages
+
+        Each file is loaded once (on an worker process) and exported to all
+        languages of --transpose-multiplum. The vocabulary is parsed once and
+        shared with the workers. Timing and throughput statistics are
+        printed as JSON.
+
+        Returns:
+            int: EXIT_OK, EXIT_ERROR or EXIT_SYNTAX
+        """
+        vocab = ItemHVocab().to_dict()
+        languages = get_vkg_languages(vocab)
+        linguam = [item.strip().upper()
+                   for item in args.transpose_multiplum.split(',')
+                   if item.strip()]
+        invalid = [item for item in linguam if item not in languages]
+        if not linguam or invalid:
+            print('ERROR: --transpose-multiplum [' +
+                  ','.join(invalid) + '] is not one of: ' +
+                  ','.join(languages), file=stderr)
+            return self.EXIT_SYNTAX
+
+        if args.transpose_multiplum_processus is not None and \
+                args.transpose_multiplum_processus < 1:
+            print('ERROR: --transpose-multiplum-processus [' +
+                  str(args.transpose_multiplum_processus) +
+                  '] must be 1 or more', file=stderr)
+            return self.EXIT_SYNTAX
+
+        if os.path.isdir(args.infile):
+            hdp_files = sorted(
+                str(file_) for file_ in Path(args.infile).glob('*')
+                if not file_.name.startswith('~') and
+                file_.name.endswith(HDP.HDP_YML_EXTENSIONS +
+                                    HDP.HDP_JSON_EXTENSIONS))
+            exitum_dir = args.transpose_multiplum_exitum or args.infile
+        else:
+            hdp_files = [args.infile]
+            exitum_dir = args.transpose_multiplum_exitum or \
+                os.path.dirname(args.infile) or '.'
+        os.makedirs(exitum_dir, exist_ok=True)
+
+        # Same as HDP.get_prepared_filter(), without an HDP object
+        hdp_filters = {arg: value for arg, value in vars(args).items()
+                       if arg.startswith(('non_', 'verum_')) and
+                       value is not None}
+        processus = args.transpose_multiplum_processus
+        if processus is None:
+            processus = os.cpu_count() or 1
+        processus = min(processus, len(hdp_files) or 1)
+        if debug:
+            print('DEBUG: --transpose-multiplum', linguam, hdp_files,
+                  exitum_dir, processus, file=stderr)
+
+        # Never replace an input file and, if two inputs have the same
+        # output (like salve-mundi.mul.hdp.yml and salve-mundi.lat.hdp.yml
+        # to POR) the first one (sorted) is used
+        fontem_real = {os.path.realpath(item): item for item in hdp_files}
+        exitum_real = {}
+        exitum = []
+        for hdp_file in hdp_files:
+            exitum.append([])
+            for item in linguam:
+                archivum_ = os.path.join(
+                    exitum_dir,
+                    get_transpose_multiplum_archivum(hdp_file, item))
+                real = os.path.realpath(archivum_)
+                skipped = None
+                if real in fontem_real:
+                    skipped = 'fontem: ' + fontem_real[real]
+                elif real in exitum_real:
+                    skipped = 'duplicatum: ' + exitum_real[real]
+                else:
+                    exitum_real[real] = hdp_file
+                exitum[-1].append((item, archivum_, skipped))
+
+        start = time.perf_counter()
+        archivum = []
+        if processus == 1:
+            _transpose_multiplum_initiale(vocab)
+            for hdp_file, exitum_ in zip(hdp_files, exitum):
+                try:
+                    archivum.append(_transpose_multiplum_archivum(
+                        hdp_file, exitum_, hdp_filters))
+                except Exception as err:  # pylint: disable=broad-except
+                    archivum.append({'fontem': hdp_file, 'error': repr(err)})
+        else:
+            with ProcessPoolExecutor(
+                    max_workers=processus,
+                    initializer=_transpose_multiplum_initiale,
+                    initargs=(vocab,)) as executor:
+                futures = [
+                    executor.submit(_transpose_multiplum_archivum, hdp_file,
+                                    exitum_, hdp_filters)
+                    for hdp_file, exitum_ in zip(hdp_files, exitum)]
+                # Same order as hdp_files, not as they finish
+                for hdp_file, future in zip(hdp_files, futures):
+                    try:
+                        archivum.append(future.result())
+                    except Exception as err:  # pylint: disable=broad-except
+                        archivum.append(
+                            {'fontem': hdp_file, 'error': repr(err)})
+        seconds = time.perf_counter() - start
+
+        errors = [item for item in archivum if 'error' in item]
+        bytes_in = sum(item.get('bytes', 0) for item in archivum)
+        bytes_out = sum(exitum.get('bytes', 0) for item in archivum
+                        for exitum in item.get('exitum', {}).values())
+        summa = {
+            'files': len(hdp_files),
+            'outputs': sum(
+                1 for item in archivum
+                for exitum in item.get('exitum', {}).values()
+                if 'bytes' in exitum),
+            'errors': len(errors),
+            'processus': processus,
+            'bytes_in': bytes_in,
+            'bytes_out': bytes_out,
+            'seconds': seconds,
+            'files_per_second': len(hdp_files) / seconds if seconds else 0,
+            'bytes_out_per_second': bytes_out / seconds if seconds else 0
+        }
+        print(beautify(json.dumps(
+            {'archivum': archivum, 'summa': summa}, indent=4), 'json'))
+
+        for item in errors:
+            print('ERROR:', item['fontem'], item['error'], file=stderr)
+        return self.EXIT_ERROR if errors else self.EXIT_OK
+
     def make_args_hdpcli(self):
         """Prepare parse args
 
@@ -569,6 +809,36 @@ class HDPCLI:
             nargs='?'
         )
 
+        parser.add_argument(
+            '--transpose-multiplum',
+            help='(draft) Transpose each HDP file of infile (file or ' +
+            'directory) to many languages, like "RUS,POR,ARA", and print ' +
+            'timing statistics. Each output is infile with the ISO 639-3 ' +
+            'code of the language, like salve-mundi.rus.hdp.yml',
+            metavar='LINGUAM',
+            action='store',
+            default=None
+        )
+
+        parser.add_argument(
+            '--transpose-multiplum-exitum',
+            help='Output directory of --transpose-multiplum. ' +
+            'Defaults to the directory of infile',
+            metavar='DIR',
+            action='store',
+            default=None
+        )
+
+        parser.add_argument(
+            '--transpose-multiplum-processus',
+            help='Number of processes of --transpose-multiplum. ' +
+            'Defaults to the number of CPUs',
+            metavar='N',
+            type=int,
+            action='store',
+            default=None
+        )
+
         # TODO: add unitary tests for --urn-index-local
         parser.add_argument(
             '--urn-index-local',
@@ -715,6 +985,15 @@ class HDPCLI:
         # TODO: while the default of HDP (and later also from the hdpcli) is
         #       not allow online initialization, at this moment, for testing,
         #       we're allowing here. (Emerson Rocha, 2021-03-13 01:48 UTC)
+        if args.transpose_multiplum:
+            if 'infile' not in args or not args.infile or \
+                    not os.path.exists(args.infile):
+                print('ERROR: --transpose-multiplum requires an local ' +
+                      'file or directory', file=stderr)
+                return self.EXIT_SYNTAX
+            return self._exec_transpose_multiplum(
+                args, debug=is_debug, stderr=stderr)
+
         if 'infile' in args and (os.path.isfile(args.infile) or
                                  os.path.isdir(args.infile) or
                                  args.infile.startswith(('http://',
@@ -722,7 +1001,8 @@ class HDPCLI:
                                                          'urn:'))):
             hdp = HDP(hdp_entry_point=args.infile,
                       online_unrestricted_init=True,
-                      debug=is_debug)
+                      debug=is_debug,
+                      processus=os.cpu_count() or 1)
 
             hdp_filters = hdp.get_prepared_filter(args)
 
@@ -26,6 +26,18 @@
 #                 ## Same as --urn-list-pattern, but python regexes
 #                 urnresolver --urn-list-pattern "un|br" --urn-list-pattern "b"
 #
+#                 ## Same as --urn-list, but by URN prefix (namespace)
+#                 urnresolver --urn-list-prefix urn:data:xz:hxl
+#
+#                 ## Any --urn-list* option, with paging
+#                 urnresolver --urn-list --limit 10 --offset 20
+#
+#                 ## HTTP service, sources are reloaded if changed on disk
+#                 urnresolver --servitium 127.0.0.1:8000
+#                 curl http://127.0.0.1:8000/urn:data:un:locode
+#                 urnresolver --urn-list | curl --data-binary @- \
+#                     http://127.0.0.1:8000/
+#
 #                 ## Resolve something know at random
 #                 urnresolver --urn-list | sort -R | urnresolver
 #
@@ -40,6 +52,31 @@
 #                 urnresolver -?? +v_iso15924
 #                 urnresolver -?? country+code+v_iso2
 #
+#                 ## Compile the current URN indexes to one file. Next calls
+#                 ## use it while the source files do not change
+#                 urnresolver --urn-index-compile
+#
+#                 ## Resolve several URNs (one per line) at once. Output is
+#                 ## HXL CSV (URN, resolved resource)
+#                 urnresolver --urn-list | urnresolver --urn-multiplum -
+#                 urnresolver --urn-multiplum manifest.txt
+#
+#                 ## Where the time goes (sources, merge, index, lookups),
+#                 ## as JSON on stderr (or on an file, --metricae file.json)
+#                 urnresolver --metricae urn:data:un:locode
+#
+#                 ## Same URN with different content on more than one place
+#                 urnresolver --urn-conflict-list
+#
+#                 ## DDDS/NAPTR-style rewrite rules (resolved offline) are
+#                 ## loaded from *.urn.naptr.yml / *.urn.naptr.json files
+#                 ## on the same places of the URN lists
+#
+#                 ## Remote URN lists (fetched concurrently, cached on disk
+#                 ## and revalidated with ETag / Last-Modified)
+#                 urnresolver --urn-index-remote https://example.org/urn.csv \
+#                     --urn-index-remote example.org urn:data:un:locode
+#
 #   DESCRIPTION:  urnresolver uses hxlm.core to resolve Uniform Resource Name
 #                 (URI) to Uniform Resource Identifier (URI)
 #
@@ -114,6 +151,14 @@ import sys
 import os
 import logging
 import argparse
+import csv
+import io
+import threading
+import time
+from email.utils import formatdate
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, unquote
+from wsgiref.simple_server import make_server, WSGIServer
 # import tempfile
 from pathlib import Path
 import re
@@ -129,9 +174,22 @@ import hxl.io
 
 import hxlm.core.htype.urn as HUrn
 from hxlm.core.schema.urn.util import (
+    compile_urn_index,
+    find_urn_resolver_local,
+    get_urn_index_hash,
+    get_urn_index_signature,
+    get_urn_pattern_literals,
     get_urn_resolver_local,
-    # get_urn_resolver_remote,
-    HXLM_CONFIG_BASE
+    get_urn_resolver_remotes,
+    get_urn_rewrite_rules_local,
+    get_urn_rule_fontem,
+    merge_urn_resolvers,
+    HXLM_CONFIG_BASE,
+    HXLM_DATA_URN_REWRITE_EXTENSIONS,
+    HXLM_URN_INDEX,
+    URNIndex,
+    URNRewriteRules,
+    URNTrie
 )
 
 from hxlm.core import (
@@ -146,6 +204,10 @@ from hxlm.core.internal.formatter import (
     beautify
 )
 
+from hxlm.core.internal.metrics import (
+    Metrics
+)
+
 # import yaml
 
 # @see https://github.com/hugapi/hug
@@ -168,12 +230,18 @@ class URNResolver:
         """
         self.hxlhelper = None
         self.args = None
+        self.urn_conflicts = []
+        self.urn_rewrite = URNRewriteRules()
+        self.metricae = Metrics(enabled=False)
 
         # Posix exit codes
         self.EXIT_OK = 0
         self.EXIT_ERROR = 1
         self.EXIT_SYNTAX = 2
 
+        # Rows of --urn-multiplum kept in memory before write to output
+        self.URN_MULTIPLUM_LIMITEM = 1000
+
     def make_args_urnresolver(self):
 
         self.hxlhelper = HXLUtils()
@@ -230,10 +298,12 @@ class URNResolver:
             # default=False
         )
 
-        # TODO: add unitary tests for --urn-index-remote
         parser.add_argument(
             '--urn-index-remote',
-            help='Load URN index from exact URL (accept multiple options)',
+            help='Load URN index from exact URL or bare domain ' +
+            '(https://domain/.well-known/urn.txt). Accept multiple ' +
+            'options. Cached on HXLM_URN_REMOTE_CACHE, revalidated each ' +
+            'HXLM_URN_REMOTE_TTL seconds',
             metavar='urn_index_remote',
             type=str,
             action='append'
@@ -271,6 +341,17 @@ class URNResolver:
             default=False
         )
 
+        parser.add_argument(
+            '--urn-conflict-list',
+            help='List URNs defined more than once with different content '
+            '[urn<TAB>urnref used<TAB>urnref ignored]. Precedence: '
+            '--urn-index-local, then user defaults, then vendor defaults',
+            metavar='urn_conflict_list',
+            action='store_const',
+            const=True,
+            default=False
+        )
+
         parser.add_argument(
             '--urn-list-filter',
             help='List know URNs by filter (simple string match)',
@@ -279,6 +360,15 @@ class URNResolver:
             type=str
         )
 
+        parser.add_argument(
+            '--urn-list-prefix',
+            help='List know URNs by prefix, like urn:data:xz:hxl ' +
+            '(accept multiple options)',
+            metavar='urn_list_prefix',
+            action='append',
+            type=str
+        )
+
         parser.add_argument(
             '--urn-list-pattern',
             help='List know URNs by pattern (accepts python regex)',
@@ -287,6 +377,88 @@ class URNResolver:
             type=str
         )
 
+        # Trivia: "multiplum", https://en.wiktionary.org/wiki/multiplus#Latin
+        parser.add_argument(
+            '--urn-multiplum',
+            help='Resolve several URNs, one per line, from a file ' +
+            '(use - for stdin). Output is HXL CSV with ' +
+            '#item+conceptum+codicem (the URN) and ' +
+            '#item+rem+i_qcc+is_zxxx+ix_urn (the resolved resource, ' +
+            'empty if not found). With --all, alternatives are ' +
+            'separated by |',
+            metavar='urn_multiplum',
+            type=str,
+            default=None
+        )
+
+        parser.add_argument(
+            '--servitium',
+            help='Run as HTTP service (WSGI) on host:port. ' +
+            'GET /urn:data:... to resolve one URN (?all=1 for all ' +
+            'alternatives), POST / with one URN per line for HXL CSV. ' +
+            'Sources are reloaded when changed on disk. ' +
+            'Default: 127.0.0.1:8000',
+            metavar='servitium',
+            nargs='?',
+            const='127.0.0.1:8000',
+            type=str,
+            default=None
+        )
+
+        parser.add_argument(
+            '--urn-index-compile',
+            help='Compile the URN indexes (--urn-index-local, user and '
+            'vendor defaults) to --urn-index-file and exit. Next calls '
+            'with same sources use it while the files do not change',
+            metavar='urn_index_compile',
+            action='store_const',
+            const=True,
+            default=False
+        )
+
+        parser.add_argument(
+            '--urn-index-file',
+            help='Compiled URN index file. Default: ' + HXLM_URN_INDEX,
+            metavar='urn_index_file',
+            type=str,
+            default=HXLM_URN_INDEX
+        )
+
+        parser.add_argument(
+            '--metricae',
+            help='Output metrics (time of each source, entries, ' +
+            'duplicates, index, lookups, cache hit/miss) as JSON. ' +
+            'Default to stderr, or to an file',
+            metavar='FILE',
+            nargs='?',
+            const='-'
+        )
+
+        parser.add_argument(
+            '--no-urn-index',
+            help='Do not use an compiled URN index, even if not stale',
+            metavar='no_urn_index',
+            action='store_const',
+            const=True,
+            default=False
+        )
+
+        parser.add_argument(
+            '--limit',
+            help='Maximum number of URNs to list (--urn-list* options)',
+            metavar='limit',
+            type=int,
+            default=None
+        )
+
+        parser.add_argument(
+            '--offset',
+            help='Skip this number of URNs on list (--urn-list* options)',
+            metavar='offset',
+            type=int,
+            default=0
+        )
+
         parser.add_argument(
             '--no-urn-user-defaults',
             help='Disable load urnresolver URN indexes from ' +
@@ -309,12 +481,362 @@ class URNResolver:
         self.args = parser.parse_args()
         return self.args
 
+    def get_urn_sources(self, args) -> list:
+        """Local files or folders to load URN rules, same order as loaded
+
+        Returns:
+            list: list of (kind, file_or_path), where kind is one of
+                  'urn_index_local', 'urn_index_remote', 'user_defaults',
+                  'vendor_defaults'
+        """
+        urnrslr_sources = []
+
+        if 'urn_index_local' in args and args.urn_index_local \
+                and len(args.urn_index_local) > 0:
+            for file_or_path in args.urn_index_local:
+                urnrslr_sources.append(('urn_index_local', file_or_path))
+
+        if 'urn_index_remote' in args and args.urn_index_remote \
+                and len(args.urn_index_remote) > 0:
+            for iri_or_domain in args.urn_index_remote:
+                urnrslr_sources.append(('urn_index_remote', iri_or_domain))
+
+        # If user is not asking to disable load ~/.config/hxlm/urn/
+        if not args.no_urn_user_defaults:
+            urnrslr_sources.append(
+                ('user_defaults', HXLM_CONFIG_BASE + 'urn/'))
+
+        # If user is not asking to disable load 'urnresolver-default.urn.yml'
+        if not args.no_urn_vendor_defaults:
+            urnrslr_sources.append(
+                ('vendor_defaults', HXLM_ROOT + '/core/bin/' +
+                 'urnresolver-default.urn.yml'))
+
+        return urnrslr_sources
+
+    def get_urn_rules(self, args, urnrslr_sources: list) -> list:
+        """Load URN rules from the urnrslr_sources (see get_urn_sources)
+
+        One rule per URN: the first source has precedence (see
+        merge_urn_resolvers). Conflicting duplicates are on
+        self.urn_conflicts and DDDS/NAPTR-style rewrite rules (from
+        HXLM_DATA_URN_REWRITE_EXTENSIONS files) on self.urn_rewrite.
+        """
+        urn_resolvers = []
+        rewrite_rules = []
+
+        # Remote lists are downloaded (or revalidated) concurrently
+        iris = [source_ for kind, source_ in urnrslr_sources
+                if kind == 'urn_index_remote']
+        remotes = {}
+        if iris:
+            with self.metricae.timer('remote'):
+                remotes = dict(zip(iris, get_urn_resolver_remotes(
+                    iris, required=True,
+                    headers=self.hxlhelper.make_headers(args)
+                    if self.hxlhelper else None,
+                    metrics=self.metricae if self.metricae else None)))
+
+        def _urn_resolver(file_or_path: str, urn_rules: list):
+            self.metricae.set('sources', file_or_path, 'entries',
+                              value=len(urn_rules or []))
+            urn_resolvers.append(urn_rules)
+
+        for kind, file_or_path in urnrslr_sources:
+            with self.metricae.timer('sources', file_or_path):
+                if kind == 'urn_index_remote':
+                    if args.version is True:
+                        print('[urn_index_remote[' + file_or_path + ']]')
+                    _urn_resolver(file_or_path, remotes[file_or_path])
+                    continue
+
+                rewrite_rules_ = get_urn_rewrite_rules_local(file_or_path)
+                rewrite_rules.extend(rewrite_rules_)
+                if rewrite_rules_:
+                    self.metricae.set('sources', file_or_path,
+                                      'rewrite_rules',
+                                      value=len(rewrite_rules_))
+                if str(file_or_path).endswith(
+                        HXLM_DATA_URN_REWRITE_EXTENSIONS):
+                    continue
+
+                if kind == 'urn_index_local':
+                    if args.version is True:
+                        print('[urn_index_local[' + file_or_path + ']]')
+
+                    _urn_resolver(file_or_path, get_urn_resolver_local(
+                        file_or_path, required=not rewrite_rules_))
+
+                elif kind == 'user_defaults':
+                    if Path(file_or_path).is_dir():
+                        opt_ = get_urn_resolver_local(file_or_path)
+
+                        if args.version is True:
+                            print('[user_defaults[' + file_or_path + ']]')
+
+                        if opt_:
+                            _urn_resolver(file_or_path, opt_)
+                        else:
+                            print(
+                                'DEBUG: HXLM_CONFIG_BASE/urn/ [[' +
+                                HXLM_CONFIG_BASE +
+                                '/urn/]] exists. but no valid urn lists ' +
+                                'found'
+                            )
+                    else:
+                        if args.version is True:
+                            print('[user_defaults[]]')
+
+                        if 'debug' in args and args.debug:
+                            print(
+                                'DEBUG: HXLM_CONFIG_BASE/urn/ [[' +
+                                HXLM_CONFIG_BASE +
+                                '/urn/]] do not exist. This could be ' +
+                                'used to store local urn references'
+                            )
+
+                elif kind == 'vendor_defaults':
+                    _urn_resolver(
+                        file_or_path, get_urn_resolver_local(file_or_path))
+
+                    if args.version is True:
+                        print('[vendor_defaults[' + file_or_path + ']]')
+
+        self.urn_conflicts = []
+        self.urn_rewrite = URNRewriteRules(rewrite_rules)
+        with self.metricae.timer('merge'):
+            urn_rules = merge_urn_resolvers(urn_resolvers, self.urn_conflicts)
+        if self.metricae:
+            entries = sum(len(item or []) for item in urn_resolvers)
+            self.metricae.set('merge', 'entries', value=entries)
+            self.metricae.set('merge', 'urns', value=len(urn_rules))
+            self.metricae.set('merge', 'duplicates',
+                              value=entries - len(urn_rules))
+            self.metricae.set('merge', 'conflicts',
+                              value=len(self.urn_conflicts))
+        return urn_rules
+
+    def get_urn_quaerendum(self, urnrslr_options: list, urn_index=None):
+        """Function to search an URN (exact rules first, then rewrite rules)
+
+        Returns:
+            Callable: urn -> rule (dict) or None
+        """
+        if urn_index is None:
+            urn_map = {}
+            for item in urnrslr_options or []:
+                urn_map.setdefault(item['urn'], item)
+
+            def _urn_exactum(urn: str):
+                return urn_map.get(urn)
+        else:
+            def _urn_exactum(urn: str):
+                matches = urn_index.lookup(urn)
+                return matches[0] if matches else None
+
+        urn_rewrite = self.urn_rewrite
+
+        def _urn_quaerendum(urn: str):
+            item = _urn_exactum(urn)
+            if item is not None or not urn_rewrite:
+                return item
+            fontem = urn_rewrite.resolve(urn, _urn_exactum)
+            if not fontem:
+                return None
+            return {'urn': urn, 'fontem': fontem, 'urnref': 'DDDS-NAPTR'}
+
+        if not self.metricae:
+            return _urn_quaerendum
+
+        metricae = self.metricae
+
+        def _urn_quaerendum_metricae(urn: str):
+            with metricae.timer('lookup'):
+                item = _urn_quaerendum(urn)
+            metricae.add('lookup', 'hit' if item is not None else 'miss')
+            return item
+
+        return _urn_quaerendum_metricae
+
+    @staticmethod
+    def is_urn_quaerendum_simplex(args, urnrslr_sources: list) -> bool:
+        """True if the only thing asked is to resolve one URN (from the
+        command line) using local sources. Then the first exact match is
+        enough (see find_urn_resolver_local)
+        """
+        if not args.infile or any(
+                kind == 'urn_index_remote' for kind, _ in urnrslr_sources):
+            return False
+        for option in ('urn_index_compile', 'version', 'urn_conflict_list',
+                       'urn_multiplum', 'referens', 'urn_explanandum_list',
+                       'urn_list', 'urn_list_filter', 'urn_list_prefix',
+                       'urn_list_pattern', 'debug'):
+            if option in args and getattr(args, option):
+                return False
+        return True
+
+    @staticmethod
+    def get_urn_list_positions(args, urnrslr_options: list,
+                               trie: URNTrie = None) -> list:
+        """Positions of urnrslr_options for --urn-list, --urn-list-filter,
+        --urn-list-prefix and --urn-list-pattern, in order
+
+        An URN is listed if matches any of the filters, prefixes or
+        patterns. Patterns are only tested with the full regex after the
+        literal prefilter (get_urn_pattern_literals). With an URNTrie
+        (worth when reused, like on long running processes) prefixes are
+        O(k); without it, an str.startswith scan is cheaper than to build
+        the trie for one query.
+
+        Returns:
+            list: positions (after --offset and --limit), or None if no
+                  list was requested
+        """
+        urn_list_filter = args.urn_list_filter \
+            if 'urn_list_filter' in args else None
+        urn_list_prefix = args.urn_list_prefix \
+            if 'urn_list_prefix' in args else None
+        urn_list_pattern = args.urn_list_pattern \
+            if 'urn_list_pattern' in args else None
+        offset = args.offset if 'offset' in args and args.offset else 0
+        limit = args.limit if 'limit' in args else None
+        finale = None if limit is None else offset + limit
+
+        if not urn_list_filter and not urn_list_prefix and \
+                not urn_list_pattern:
+            if 'urn_list' in args and args.urn_list is True:
+                return list(range(len(urnrslr_options or []))[offset:finale])
+            return None
+
+        if not urnrslr_options:
+            return []
+
+        urns = [item['urn'] for item in urnrslr_options]
+        matches = set()
+
+        def _prefix(prefix: str):
+            if trie is not None:
+                return trie.prefix(prefix)
+            return [position for position, urn in enumerate(urns)
+                    if urn.startswith(prefix)]
+
+        for sitem in urn_list_filter or []:
+            matches.update(
+                position for position, urn in enumerate(urns)
+                if sitem in urn)
+
+        for prefix in urn_list_prefix or []:
+            matches.update(_prefix(prefix))
+
+        for lptn in urn_list_pattern or []:
+            cptn = re.compile(lptn)
+            prefix, literals = get_urn_pattern_literals(lptn)
+            candidates = _prefix(prefix) if prefix else range(len(urns))
+            literals = [literal for literal in literals if literal != prefix]
+            for position in candidates:
+                urn = urns[position]
+                if literals and not all(
+                        literal in urn for literal in literals):
+                    continue
+                if cptn.search(urn):
+                    matches.add(position)
+
+        return sorted(matches)[offset:finale]
+
+    @staticmethod
+    def get_urn_fontem(item: dict) -> list:
+        """Resources of an URN rule (see get_urn_rule_fontem)"""
+        return get_urn_rule_fontem(item)
+
+    def execute_urn_multiplum(self, args, urnrslr_options: list,
+                              urn_index=None,
+                              stdout=sys.stdout, stderr=sys.stderr):
+        """Resolve each line of --urn-multiplum, output as HXL CSV
+
+        Rules are loaded only once (by execute_cli) and each lookup is an
+        hash access. Output is written each URN_MULTIPLUM_LIMITEM rows.
+        """
+        _urn_quaerendum = self.get_urn_quaerendum(urnrslr_options, urn_index)
+
+        resultatum = self.EXIT_OK
+        scriptor = csv.writer(stdout)
+        scriptor.writerow(['#item+conceptum+codicem',
+                           '#item+rem+i_qcc+is_zxxx+ix_urn'])
+        lineam = []
+
+        if args.urn_multiplum == '-':
+            fontem = sys.stdin
+        else:
+            fontem = open(args.urn_multiplum, 'r')
+
+        try:
+            for rem in self.get_urn_multiplum_lineam(
+                    fontem, _urn_quaerendum, args.all):
+                if not rem[1]:
+                    stderr.write("ERROR: urn [" + rem[0] +
+                                 "] strict match not found \n")
+                    resultatum = self.EXIT_ERROR
+                lineam.append(rem)
+
+                if len(lineam) >= self.URN_MULTIPLUM_LIMITEM:
+                    scriptor.writerows(lineam)
+                    lineam = []
+        finally:
+            if fontem is not sys.stdin:
+                fontem.close()
+
+        scriptor.writerows(lineam)
+        stdout.flush()
+        return resultatum
+
+    @classmethod
+    def get_urn_multiplum_lineam(cls, fontem, urn_quaerendum,
+                                 omnes: bool = False):
+        """Rows [urn, resolved resource] for each URN (one per line) of
+        fontem. The resource is empty if not found.
+
+        >>> list(URNResolver.get_urn_multiplum_lineam(
+        ...     ['urn:data:zz:a\\n', '\\n', 'urn:data:zz:b'],
+        ...     {'urn:data:zz:a': {'fontem': ['a.csv', 'b.csv']}}.get, True))
+        [['urn:data:zz:a', 'a.csv|b.csv'], ['urn:data:zz:b', '']]
+        """
+        for urn_string in fontem:
+            urn_string = urn_string.strip()
+            if not urn_string:
+                continue
+            item = urn_quaerendum(urn_string)
+            if item is None or not cls.get_urn_fontem(item):
+                yield [urn_string, '']
+            elif omnes:
+                yield [urn_string, '|'.join(cls.get_urn_fontem(item))]
+            else:
+                yield [urn_string, cls.get_urn_fontem(item)[0]]
+
     def execute_cli(self, args,
                     stdin=STDIN, stdout=sys.stdout, stderr=sys.stderr):
         """
         The execute_cli is the main entrypoint of URNResolver. When
         called will try to convert the URN to an valid IRI.
+
+        With --metricae, what was measured is written at the end.
         """
+        metricae = args.metricae if 'metricae' in args else None
+        self.metricae = Metrics(enabled=bool(metricae))
+        try:
+            with self.metricae.timer('total'):
+                return self._execute_cli(args, stdin, stdout, stderr)
+        finally:
+            if self.urn_rewrite:
+                self.metricae.set('rewrite', 'rules',
+                                  value=len(self.urn_rewrite))
+                self.metricae.set('rewrite', 'cache_hits',
+                                  value=self.urn_rewrite.cache_hits)
+                self.metricae.set('rewrite', 'cache_misses',
+                                  value=self.urn_rewrite.cache_misses)
+            self.metricae.write(metricae, stderr)
+
+    def _execute_cli(self, args,
+                     stdin=STDIN, stdout=sys.stdout, stderr=sys.stderr):
 
         if args.version is True:
             print('URNResolver ' + __version__)
@@ -342,88 +864,95 @@ class URNResolver:
 
         # print('args.infile', args.infile, stdin)
 
+        urnrslr_sources = self.get_urn_sources(args)
         urnrslr_options = []
+        urn_index = None
 
-        # return "fin"
-        # print('args', args)
-
-        if 'urn_index_local' in args and args.urn_index_local \
-                and len(args.urn_index_local) > 0:
-            for file_or_path in args.urn_index_local:
-
-                if args.version is True:
-                    print('[urn_index_local[' + file_or_path + ']]')
-
-            # We will exit later, but will print what was loaded
-            # return self.EXIT_OK
-
-                opt_ = get_urn_resolver_local(file_or_path, required=True)
-                # print('opt_ >> ', opt_ , '<<')
-                # urnrslr_options.extend(opt_)
-                for item_ in opt_:
-                    if item_ not in urnrslr_options:
-                        urnrslr_options.append(item_)
-
-        # if 'urn_index_remote' in args and args.urn_index_remote \
-        #         and len(args.urn_index_remote) > 0:
-        #     for iri_or_domain in args.urn_index_remote:
-        #         opt_ = get_urn_resolver_remote(iri_or_domain, required=True)
-        #         # print('opt_ >> ', opt_ , '<<')
-        #         # urnrslr_options.extend(opt_)
-        #         for item_ in opt_:
-        #             if item_ not in urnrslr_options:
-        #                 urnrslr_options.append(item_)
+        # urnresolver --servitium 127.0.0.1:8000
+        if 'servitium' in args and args.servitium:
+            host, _, port = args.servitium.rpartition(':')
+            URNResolverServitium(self, args, urnrslr_sources).serve(
+                host or '127.0.0.1', int(port))
+            return self.EXIT_OK
 
-        # If user is not asking to disable load ~/.config/hxlm/urn/
-        if not args.no_urn_user_defaults:
-            # print(get_urn_resolver_local(HXLM_CONFIG_BASE + '/urn/'))
-            if Path(HXLM_CONFIG_BASE + 'urn/').is_dir():
-                opt_ = get_urn_resolver_local(HXLM_CONFIG_BASE + 'urn/')
-
-                if args.version is True:
-                    print('[user_defaults[' + HXLM_CONFIG_BASE + 'urn/' + ']]')
-
-                if opt_:
-                    urnrslr_options.extend(opt_)
-                    # print(get_urn_resolver_local(HXLM_CONFIG_BASE + '/urn/'))
-                    for item_ in opt_:
-                        if item_ not in urnrslr_options:
-                            urnrslr_options.append(item_)
-                else:
-                    print(
-                        'DEBUG: HXLM_CONFIG_BASE/urn/ [[' + HXLM_CONFIG_BASE +
-                        '/urn/]] exists. but no valid urn lists found'
-                    )
+        # The compiled index only knows if local files changed
+        if not args.urn_index_compile and not args.version and \
+                not args.no_urn_index and not any(
+                    kind == 'urn_index_remote'
+                    for kind, _ in urnrslr_sources):
+            urn_index = URNIndex(
+                args.urn_index_file,
+                [source_ for _, source_ in urnrslr_sources])
+            with self.metricae.timer('urn_index', 'load'):
+                fresh = urn_index.is_fresh()
+                if fresh:
+                    urnrslr_options = urn_index.rules()
+                    self.urn_conflicts = urn_index.conflicts()
+                    self.urn_rewrite = URNRewriteRules(
+                        urn_index.rewrite_rules())
+            self.metricae.set('urn_index', 'cache',
+                              value='hit' if fresh else 'miss')
+            if fresh:
+                self.metricae.set('urn_index', 'urns',
+                                  value=len(urnrslr_options))
             else:
-                if args.version is True:
-                    print('[user_defaults[]]')
-
                 if 'debug' in args and args.debug:
-                    print(
-                        'DEBUG: HXLM_CONFIG_BASE/urn/ [[' + HXLM_CONFIG_BASE +
-                        '/urn/]] do not exist. This could be used to store ' +
-                        'local urn references'
-                    )
-
-        # If user is not asking to disable load 'urnresolver-default.urn.yml'
-        if not args.no_urn_vendor_defaults:
-            urnrslvr_def = HXLM_ROOT + '/core/bin/' + \
-                'urnresolver-default.urn.yml'
-            opt_ = get_urn_resolver_local(urnrslvr_def)
-            for item_ in opt_:
-                if item_ not in urnrslr_options:
-                    urnrslr_options.append(item_)
-            # urnrslr_options = get_urn_resolver_local(urnrslvr_def)
-
-            if args.version is True:
-                print('[vendor_defaults[' + urnrslvr_def + ']]')
+                    print('DEBUG: urn_index_file [[' + args.urn_index_file +
+                          ']] do not exist or is stale')
+                urn_index = None
+
+        # urnresolver urn:data:xz:eticaai:pcode:br (an exact match on the
+        # first files does not need to load all the others)
+        if urn_index is None and \
+                self.is_urn_quaerendum_simplex(args, urnrslr_sources):
+            # Same error of get_urn_rules (get_urn_resolver_local with
+            # required=True), even if an later source has the URN
+            for kind, file_or_path in urnrslr_sources:
+                if kind == 'urn_index_local' and \
+                        not os.path.exists(file_or_path):
+                    raise RuntimeError(
+                        'local_file_or_path [' + file_or_path +
+                        '] not found')
+            with self.metricae.timer('find_first'):
+                item = find_urn_resolver_local(
+                    args.infile, [source_ for _, source_ in urnrslr_sources])
+            self.metricae.set('find_first', 'found', value=item is not None)
+            if item is not None:
+                urnrslr_options = [item]
+
+        if urn_index is None and not urnrslr_options:
+            urnrslr_options = self.get_urn_rules(args, urnrslr_sources)
+
+        if args.urn_index_compile:
+            with self.metricae.timer('urn_index', 'compile'):
+                compile_urn_index(
+                    urnrslr_options,
+                    [source_ for _, source_ in urnrslr_sources],
+                    args.urn_index_file,
+                    self.urn_conflicts,
+                    self.urn_rewrite.rules)
+            print(args.urn_index_file)
+            return self.EXIT_OK
 
         if args.version is True:
             # Now we exit
-            print('[DDDS-NAPTR-Private[not-implemented]]')
+            print('[DDDS-NAPTR-Private[' + str(len(self.urn_rewrite)) +
+                  ' rules]]')
             print('[DDDS-NAPTR-Public[not-implemented]]')
             return self.EXIT_OK
 
+        # urnresolver --urn-conflict-list
+        if 'urn_conflict_list' in args and args.urn_conflict_list:
+            for urn, urnref_used, urnref_ignored in self.urn_conflicts:
+                print(urn + "\t" + str(urnref_used) + "\t" +
+                      str(urnref_ignored))
+            return self.EXIT_OK
+
+        # urnresolver --urn-multiplum -
+        if 'urn_multiplum' in args and args.urn_multiplum:
+            return self.execute_urn_multiplum(
+                args, urnrslr_options, urn_index, stdout, stderr)
+
         # urnresolver --! +v_iso15924
         if 'referens' in args and args.referens:
             # print('referens', args.referens)
@@ -461,85 +990,23 @@ class URNResolver:
 
             return self.EXIT_OK
 
-            # urnresolver --urn-list-filter un --urn-list-filter br
-        if 'urn_list_filter' in args and args.urn_list_filter:
-            # print('urn_list_filter', args.urn_list_filter)
-            if urnrslr_options and len(urnrslr_options) > 0:
-                matches = []
-                expl_items = []
-                for item in urnrslr_options:
-                    for sitem in args.urn_list_filter:
-                        if item['urn'].find(sitem) > -1:
-                            matches.append(item['urn'])
-
-                            # TODO: deal with duplicate items
-                            expl_items.append(item)
-
-                # urnresolver --? --urn-list-filter un --urn-list-filter br
-                if args.explanandum:
-                    # print(matches)
-                    print(beautify(json.dumps(expl_items,
-                                              indent=4), 'json'))
-                    return self.EXIT_ERROR
-
-                matches = set(matches)
-                for result in matches:
-                    print(result)
-
-            return self.EXIT_OK
-
-        # print('args.urn_list_pattern', args.urn_list_pattern)
-
-        # urnresolver --urn-list-pattern something
-        if 'urn_list_pattern' in args and args.urn_list_pattern:
-            # print('urn_list_pattern', args.urn_list_pattern)
-            cptterns = []
-
-            for lptn in args.urn_list_pattern:
-                # print('urn_list_pattern lptn', lptn)
-                cptterns.append(re.compile(lptn))
-
-            if urnrslr_options and len(urnrslr_options) > 0:
-                matches = []
-                expl_items = []
-                for item in urnrslr_options:
-                    for cptn in cptterns:
-
-                        # print('cptn', cptn, item['urn'])
-                        if cptn.search(item['urn']):
-                            matches.append(item['urn'])
-
-                            # TODO: deal with duplicate items
-                            expl_items.append(item)
-
-                matches = set(matches)
-
-                # urnresolver --? --urn-list-pattern un --urn-list-pattern br
-                if args.explanandum:
-                    # print(matches)
-                    print(beautify(json.dumps(expl_items,
-                                              indent=4), 'json'))
-                    return self.EXIT_ERROR
-
-                for result in matches:
-                    print(result)
-
-            return self.EXIT_OK
-
         # urnresolver --urn-list
-        if 'urn_list' in args and args.urn_list is True:
-            # print('urn_list')
-            if urnrslr_options and len(urnrslr_options) > 0:
-
-                # urnresolver --? urn:data:zz:example
-                if args.explanandum:
-                    print(beautify(json.dumps(urnrslr_options,
-                                              indent=4), 'json'))
-                    return self.EXIT_ERROR
+        # urnresolver --urn-list-filter un --urn-list-filter br
+        # urnresolver --urn-list-prefix urn:data:xz:hxl
+        # urnresolver --urn-list-pattern "un|br" --urn-list-pattern "b"
+        with self.metricae.timer('urn_list'):
+            positions = self.get_urn_list_positions(args, urnrslr_options)
+        if positions is not None:
+            self.metricae.set('urn_list', 'urns', value=len(positions))
+            # urnresolver --? --urn-list-filter un --urn-list-filter br
+            if args.explanandum:
+                print(beautify(json.dumps(
+                    [urnrslr_options[position] for position in positions],
+                    indent=4), 'json'))
+                return self.EXIT_ERROR
 
-                matches = []
-                for item in urnrslr_options:
-                    print(item['urn'])
+            for position in positions:
+                print(urnrslr_options[position]['urn'])
 
             return self.EXIT_OK
 
@@ -584,12 +1051,10 @@ class URNResolver:
             print('')
             print('')
 
-        if urnrslr_options and len(urnrslr_options) > 0:
-            matches = []
-            for item in urnrslr_options:
-                if item['urn'] == urn_string:
-                    # print('great')
-                    matches.append(item)
+        if urnrslr_options or self.urn_rewrite:
+            item = self.get_urn_quaerendum(
+                urnrslr_options, urn_index)(urn_string)
+            matches = [item] if item is not None else []
 
             # urnresolver --? urn:data:zz:example
             if args.explanandum:
@@ -606,11 +1071,11 @@ class URNResolver:
 
             if len(matches) > 0:
                 if args.all:
-                    for sitem in matches[0]['fontem']:
+                    for sitem in self.get_urn_fontem(matches[0]):
                         print(sitem)
                     # print('all...')
                 else:
-                    print(matches[0]['fontem'][0])
+                    print(self.get_urn_fontem(matches[0])[0])
                 return self.EXIT_OK
 
         stderr.write("ERROR: urn [" + str(urn_string) +
@@ -632,6 +1097,189 @@ class URNResolver:
         # return self.EXIT_OK
 
 
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    """WSGIServer (wsgiref), one thread per request"""
+    daemon_threads = True
+
+
+class URNResolverServitium:
+    """WSGI application of urnresolver --servitium
+
+    The rules are loaded once and kept in memory. Each request checks, at
+    most each INTERVALLUM_VERIFICANDUM seconds, if the sources changed on
+    disk (see get_urn_index_signature) and reloads them. If the reload
+    fails (like an source saved with syntax errors) the error goes to
+    stderr and the previous rules are still served.
+
+    - GET /urn:data:...: resolved resource (text/plain); ?all=1 for all
+      alternatives, one per line; 404 if not found
+    - GET /?prefix=urn:data:xz: URNs starting with prefix (URNTrie)
+    - POST /: body (up to LIMITEM_CORPUS bytes, UTF-8) with one URN per
+      line, output as HXL CSV (same as --urn-multiplum); 413 if larger,
+      400 if not UTF-8
+
+    For GET, ETag is the hash of sources and rules (get_urn_index_hash);
+    Last-Modified is when they were loaded. POST responses are not
+    cacheable.
+
+    Trivia: "servitium", https://en.wiktionary.org/wiki/servitium#Latin
+    """
+
+    INTERVALLUM_VERIFICANDUM = 2.0
+
+    # Maximum size (bytes) of the body of POST requests
+    LIMITEM_CORPUS = 1048576
+
+    def __init__(self, urnresolver: URNResolver, args,
+                 urnrslr_sources: list):
+        self.urnresolver = urnresolver
+        self.args = args
+        self.sources = [source_ for _, source_ in urnrslr_sources]
+        self.urnrslr_sources = urnrslr_sources
+        self._lock = threading.Lock()
+        self._verificandum = 0.0
+        self.status = None
+        self.reload()
+
+    def reload(self):
+        """Load the rules from the sources (again)"""
+        signature = get_urn_index_signature(self.sources)
+        rules = self.urnresolver.get_urn_rules(
+            self.args, self.urnrslr_sources)
+        urn_quaerendum = self.urnresolver.get_urn_quaerendum(rules)
+
+        # One attribute, so requests on other threads see either the old
+        # or the new rules
+        self.status = {
+            'signature': signature,
+            'rules': rules,
+            'urn': urn_quaerendum,
+            'trie': None,
+            'etag': '"' + get_urn_index_hash(signature, rules) + '"',
+            'last_modified': formatdate(time.time(), usegmt=True)
+        }
+
+    def reload_if_changed(self):
+        """Reload if the sources changed (checked at most each
+        INTERVALLUM_VERIFICANDUM seconds)"""
+        now = time.monotonic()
+        if now - self._verificandum < self.INTERVALLUM_VERIFICANDUM:
+            return
+        with self._lock:
+            if now - self._verificandum < self.INTERVALLUM_VERIFICANDUM:
+                return
+            if get_urn_index_signature(self.sources) != \
+                    self.status['signature']:
+                try:
+                    self.reload()
+                except Exception as err:  # pylint: disable=broad-except
+                    sys.stderr.write(
+                        'urnresolver --servitium: reload failed, serving '
+                        'the previous rules: ' + repr(err) + '\n')
+            self._verificandum = time.monotonic()
+
+    def __call__(self, environ, start_response):
+        self.reload_if_changed()
+        status = self.status
+        method = environ.get('REQUEST_METHOD', 'GET')
+
+        if method == 'POST':
+            return self._post(environ, start_response, status)
+
+        if method not in ('GET', 'HEAD'):
+            return self._response(
+                start_response, '405 Method Not Allowed', [], '')
+
+        headers = [
+            ('ETag', status['etag']),
+            ('Last-Modified', status['last_modified']),
+            ('Cache-Control', 'public, max-age=120')
+        ]
+
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and status['etag'] in \
+                [etag.strip() for etag in if_none_match.split(',')]:
+            start_response('304 Not Modified', headers)
+            return [b'']
+
+        path = unquote(environ.get('PATH_INFO', '/')).lstrip('/')
+        query = parse_qs(environ.get('QUERY_STRING', ''))
+
+        if not path and 'prefix' in query:
+            if status['trie'] is None:
+                status['trie'] = URNTrie(
+                    [item['urn'] for item in status['rules']])
+            textum = ''
+            for prefix in query['prefix']:
+                for position in status['trie'].prefix(prefix):
+                    textum += status['rules'][position]['urn'] + "\n"
+            return self._response(start_response, '200 OK', headers, textum)
+
+        item = status['urn'](path)
+        if item is None or not self.urnresolver.get_urn_fontem(item):
+            return self._response(
+                start_response, '404 Not Found', headers,
+                "ERROR: urn [" + path + "] strict match not found\n")
+
+        fontem = self.urnresolver.get_urn_fontem(item)
+        if 'all' not in query:
+            fontem = fontem[:1]
+        return self._response(
+            start_response, '200 OK', headers,
+            ''.join(sitem + "\n" for sitem in fontem))
+
+    def _post(self, environ, start_response, status: dict):
+        """POST /: --urn-multiplum of the body"""
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            return self._response(
+                start_response, '400 Bad Request', [],
+                "ERROR: invalid Content-Length\n")
+        if length > self.LIMITEM_CORPUS:
+            return self._response(
+                start_response, '413 Payload Too Large', [],
+                "ERROR: body larger than " + str(self.LIMITEM_CORPUS) +
+                " bytes\n")
+        try:
+            body = environ['wsgi.input'].read(length).decode('utf-8')
+        except UnicodeDecodeError:
+            return self._response(
+                start_response, '400 Bad Request', [],
+                "ERROR: body is not UTF-8\n")
+
+        query = parse_qs(environ.get('QUERY_STRING', ''))
+        output = io.StringIO()
+        scriptor = csv.writer(output)
+        scriptor.writerow(['#item+conceptum+codicem',
+                           '#item+rem+i_qcc+is_zxxx+ix_urn'])
+        scriptor.writerows(self.urnresolver.get_urn_multiplum_lineam(
+            body.splitlines(), status['urn'], 'all' in query))
+        return self._response(
+            start_response, '200 OK', [], output.getvalue(), 'text/csv')
+
+    @staticmethod
+    def _response(start_response, status: str, headers: list,
+                  textum: str, content_type: str = 'text/plain'):
+        body = textum.encode('utf-8')
+        start_response(status, headers + [
+            ('Content-Type', content_type + '; charset=utf-8'),
+            ('Content-Length', str(len(body)))
+        ])
+        return [body]
+
+    def serve(self, host: str = '127.0.0.1', port: int = 8000):
+        """Serve forever with wsgiref (use any WSGI server in production)
+        """
+        with make_server(host, port, self,
+                         server_class=ThreadingWSGIServer) as server:
+            sys.stderr.write('urnresolver --servitium http://' + host +
+                             ':' + str(server.server_port) + '/\n')
+            server.serve_forever()
+
+
 class HXLUtils:
     """
     HXLUtils contains functions from the Console scripts of libhxl-python
@@ -6,6 +6,11 @@ SPDX-License-Identifier: Unlicense OR 0BSD
 """
 
 import os
+import hashlib
+import json
+import mmap
+import tempfile
+import threading
 from copy import deepcopy
 from typing import Union
 from pathlib import Path
@@ -20,8 +25,11 @@ from hxlm.core.localization.util import (
 )
 
 from hxlm.core.internal.integrity import (
-    get_checksum_crc32,
-    get_hashable
+    get_checksum,
+    get_hashable,
+    get_hashable_json,
+    HASH_ALGORITHMS,
+    MerkleTree
 )
 
 from hxlm.core.io.util import (
@@ -36,13 +44,17 @@ from hxlm.core.util import load_file as generic_load_file
 __all__ = [
     'build_new_vocabulary_knowledge_graph',  # Maybe make it short?
     'checksum',
+    'get_core_lkg',
+    'get_hdp_vkg',
     'get_hdp_term_cleaned',  # Maybe this could be _private?
     'get_metadata',
     'get_language_identifiers',
     'get_language_from_hdp_raw',  # Deprecated
+    'get_merkle_tree',
     'hashable',
     'transpose',
-    'transpose_hsilo'
+    'transpose_hsilo',
+    'TransposeFragmentCache'
 ]
 
 # os.environ["HDP_DEBUG"] = "1"
@@ -89,15 +101,101 @@ VOCAB_RECURSION_LEAF = (
 
 # HDP_VKG = Cutil.load_file(C.HXLM_ROOT + '/core/schema/core_vocab.yml')
 # HDP_VKG = Cutil.load_file(C.HXLM_ROOT + '/ontology/core.vkg.yml')
-HDP_VKG = Cutil.load_file(C.HXLM_ROOT + '/ontologia/core.vkg.yml')
-"""Vocabulary knowledge graph, aka ontologia/core.vkg.yml"""
+HDP_VKG_FILE = C.HXLM_ROOT + '/ontologia/core.vkg.yml'
+"""Path of the vocabulary knowledge graph"""
+
+# HDP_VKG (Vocabulary knowledge graph, aka ontologia/core.vkg.yml) is
+# loaded on first use. See get_hdp_vkg()
+
+HDP_VKG_KEYMAP_FILE = os.getenv(
+    'HDP_VKG_KEYMAP_FILE', C.HXLM_ROOT + '/ontologia/core.vkg.keymap')
+"""Compiled key maps of every language pair of HDP_VKG_FILE (see
+compile_transpose_keymaps). Regenerated if HDP_VKG_FILE changes"""
+
+HDP_VKG_KEYMAP_FILE_ALT = os.getenv(
+    'HDP_VKG_KEYMAP_FILE_ALT',
+    str(Path.home()) + '/.cache/hxlm/core.vkg.keymap')
+"""Used instead of HDP_VKG_KEYMAP_FILE if it is outdated and the folder of
+HDP_VKG_FILE is not writable (like an system wide installation)"""
 
 HDP_VKG_FULL: dict = {}
 """Dictionary with transposition from other languages back to Latin"""
 
+HDP_VKG_KEYMAP: dict = {}
+"""Cache of get_transpose_keymap, (source, target) -> (root, attr)"""
+
+_HDP_VKG_KEYMAP_TABLE = None
+
+_HDP_VKG_KEYMAP_MAGIC = b'HDP-VKG-KEYMAP 1 '
+
+CORE_LKG_FILE = C.HXLM_ROOT + '/ontologia/core.lkg.yml'
+"""Path of the localization knowledge graph"""
+
+# CORE_LKG (Localization knowledge graph, aka ontologia/core.lkg.yml) is
+# loaded on first use. See get_core_lkg()
+
+_KNOWLEDGE_GRAPHS: dict = {}
+"""Loaded knowledge graphs, file path -> dict"""
+
+_KNOWLEDGE_GRAPHS_LOCK = threading.Lock()
+
+# Algorithms of checksum(); MERKLE is the root digest of get_merkle_tree()
+_CHECKSUM_ALGORITHMS = tuple(HASH_ALGORITHMS) + ('MERKLE',)
+
+
+def __getattr__(name: str):
+    """HDP_VKG and CORE_LKG, as module attributes, loaded on first access
+
+    >>> import hxlm.core.hdp.util.common as common
+    >>> common.HDP_VKG is common.get_hdp_vkg()
+    True
+    """
+    if name == 'HDP_VKG':
+        return get_hdp_vkg()
+    if name == 'CORE_LKG':
+        return get_core_lkg()
+    raise AttributeError(
+        'module ' + repr(__name__) + ' has no attribute ' + repr(name))
+
+
+def _get_knowledge_graph(file_path: str) -> dict:
+    """Load an knowledge graph once, even if called from many threads"""
+    try:
+        return _KNOWLEDGE_GRAPHS[file_path]
+    except KeyError:
+        pass
+    with _KNOWLEDGE_GRAPHS_LOCK:
+        if file_path not in _KNOWLEDGE_GRAPHS:
+            _KNOWLEDGE_GRAPHS[file_path] = Cutil.load_file(file_path)
+        return _KNOWLEDGE_GRAPHS[file_path]
+
 
-CORE_LKG = Cutil.load_file(C.HXLM_ROOT + '/ontologia/core.lkg.yml')
-"""Localization knowledge graph, aka ontologia/core.lkg.yml"""
+def get_core_lkg() -> dict:
+    """Localization knowledge graph (CORE_LKG), aka ontologia/core.lkg.yml
+
+    Loaded on first use (not on import), thread-safe. Do not change it.
+
+    Returns:
+        dict: The CORE_LKG
+
+    >>> get_core_lkg()['fs']['hdp']['base'][0]
+    'lat.hdp.json'
+    """
+    return _get_knowledge_graph(CORE_LKG_FILE)
+
+
+def get_hdp_vkg() -> dict:
+    """Vocabulary knowledge graph (HDP_VKG), aka ontologia/core.vkg.yml
+
+    Loaded on first use (not on import), thread-safe. Do not change it.
+
+    Returns:
+        dict: The HDP_VKG
+
+    >>> get_hdp_vkg()['root']['hsilo']['LAT']['id']
+    'hsilo'
+    """
+    return _get_knowledge_graph(HDP_VKG_FILE)
 
 
 def _clean_metakeys(thing: Union[dict, list],
@@ -122,9 +220,9 @@ def _clean_metakeys(thing: Union[dict, list],
     level += 1
 
     if prefix is None:
-        prefix = CORE_LKG['itkn']['internal_l1']['start']
+        prefix = get_core_lkg()['itkn']['internal_l1']['start']
     if suffix is None:
-        suffix = CORE_LKG['itkn']['internal_l1']['end']
+        suffix = get_core_lkg()['itkn']['internal_l1']['end']
 
     if level >= 10:
         # Likely to be some error.
@@ -199,11 +297,17 @@ def _get_hsilo_body_language_identifier(hsilo_item: dict) -> dict:
     return lid
 
 
-def _get_checksum(hashable_str: str, chktag: str = 'α') -> list:
-    """Generic CRC32 checksum for strings
+def _get_checksum(hashable_str: Union[str, dict, list],
+                  chktag: str = 'α',
+                  algorithm: str = 'CRC32') -> list:
+    """Generic checksum (default CRC32) for strings
 
     Args:
-        hashable_str (str): an alterady ready to hash (like Latin) input
+        hashable_str (str): an alterady ready to hash (like Latin) input.
+                            dicts and lists are hashed without an
+                            intermediate string (see get_checksum)
+        algorithm (str): One of HASH_ALGORITHMS or MERKLE.
+                         Defaults to 'CRC32'
 
     Returns:
         list: List of S-expression checksum values
@@ -213,8 +317,8 @@ def _get_checksum(hashable_str: str, chktag: str = 'α') -> list:
     #       redundant with checksum()
     #       (Emerson Rocha, 2021-03-26 08:37 UTC)
 
-    return '(CRC32 \'' + chktag + ' "' + \
-        str(get_checksum_crc32(hashable_str)) + '")'
+    return '(' + algorithm + ' \'' + chktag + ' "' + \
+        get_checksum(hashable_str, algorithm) + '")'
 
 
 def _get_checksum_keyterm(keyterm: str) -> dict:
@@ -236,6 +340,9 @@ def _get_checksum_keyterm(keyterm: str) -> dict:
     {'algorithm': 'CRC32', 'chktag': "'α", 'value': '3839021470'}
     >>> _get_checksum_keyterm("(CRC32 'α 3839021470)")
     {'algorithm': 'CRC32', 'chktag': "'α", 'value': '3839021470'}
+    >>> _get_checksum_keyterm("(BLAKE2B 'α 3ff6fd4134b4d72daa6fc99334bb779b)")
+    {'algorithm': 'BLAKE2B', 'chktag': "'α", \
+'value': '3ff6fd4134b4d72daa6fc99334bb779b'}
     """
 
     # print('_get_checksum_keyterm', keyterm)
@@ -253,9 +360,9 @@ def _get_checksum_keyterm(keyterm: str) -> dict:
     if len(keyterm) > 192:
         return None
 
-    # At this moment, only CRC32 is supported. And we do not internationalized
+    # Only the algorithms of get_checksum. And we do not internationalized
     # another terms
-    if not keyterm.startswith('(CRC32 '):
+    if keyterm[1:].split(' ', 1)[0] not in _CHECKSUM_ALGORITHMS:
         return None
 
     result = {
@@ -305,7 +412,7 @@ def _get_file_preferred_suffix() -> tuple:
     """
     userpref_suffix = []
 
-    core_suffix = CORE_LKG['fs']['hdp']['base']
+    core_suffix = get_core_lkg()['fs']['hdp']['base']
 
     userlangs_upper = get_language_user_know()
     if len(userlangs_upper) > 0:
@@ -471,7 +578,7 @@ def build_new_vocabulary_knowledge_graph(
         vkg_name = key_vid
 
     if source_vkg is None:
-        source_vkg = HDP_VKG
+        source_vkg = get_hdp_vkg()
 
     if full_vkgs is None:
         full_vkgs = HDP_VKG_FULL
@@ -639,7 +746,8 @@ def checksum(hdpgroup: list,
 
     Args:
         hdpgroup (list): list of HDP-like objects
-        type (str): The type of checker
+        algorithm (str): The type of checker: CRC32, BLAKE2B, MERKLE (see
+                get_merkle_tree) or, if xxhash is installed, XXH64
         htag (str): select only by special tags (for complex documents) mixing
                 several hashings. See hashable()
 
@@ -653,9 +761,11 @@ def checksum(hdpgroup: list,
     >>> UDUR_RUS = HXLm.util.load_file(HXLm.HDATUM_UDHR + '/udhr.rus.hdp.yml')
     >>> checksum(UDUR_RUS)
     ['(CRC32 \\'\\'α "3839021470")']
+    >>> checksum(UDUR_RUS, 'BLAKE2B') == checksum(UDUR_LAT, 'BLAKE2B')
+    True
     """
 
-    if algorithm != 'CRC32':
+    if algorithm not in _CHECKSUM_ALGORITHMS:
         raise NotImplementedError('algorithm [' +
                                   str(algorithm) + '] not implemented')
 
@@ -667,8 +777,9 @@ def checksum(hdpgroup: list,
     result = []
     for hsilo in hdpgroup:
 
-        hashable_str = hashable([hsilo])[0]
-        hashable_code = _get_checksum(hashable_str, chktag=chktag)
+        # Same as _get_checksum(hashable([hsilo])[0]), without the string
+        hashable_code = _get_checksum(_get_hashable_body(hsilo),
+                                      chktag=chktag, algorithm=algorithm)
         result.append(hashable_code)
 
     return result
@@ -854,35 +965,63 @@ def hashable(hdpgroup: list, chktag: str = 'α') -> list:
         raise NotImplementedError('chktag still work in progress')
 
     for hsilo in hdpgroup:
+        result.append(get_hashable(_get_hashable_body(hsilo)))
 
-        # transpose requires array, but we're calling directly
-        hsilo_lat = transpose([hsilo], 'LAT')[0]
-        hsilo_lat_body = _get_hsilo_body(hsilo_lat)
-        hsilo_lat_body_clean = _clean_metakeys(
-            hsilo_lat_body, prefix='<<', suffix='>>')
+    return result
 
-        hsilo_lat_body_clean_str = get_hashable(
-            hsilo_lat_body_clean)
-        result.append(hsilo_lat_body_clean_str)
 
-    return result
+def get_merkle_tree(hsilo: dict) -> MerkleTree:
+    """Merkle tree of the body of an hsilo (the same of hashable)
+
+    The root, tree.hexdigest(), is the value of an (MERKLE 'α "...")
+    checksum (see checksum). After an edit with tree.update(), only the
+    changed path is hashed again; tree.get_proof() allows verify one part
+    of the hsilo (see hxlm.core.internal.integrity.verify_merkle_proof).
+    The tree is of an new body in Latin (tree.thing), not of hsilo, so
+    paths use the Latin keys.
+
+    Args:
+        hsilo (dict): An individual HSilo item
+
+    Returns:
+        MerkleTree: the tree
+
+    >>> import hxlm.core as HXLm
+    >>> UDUR_RUS = HXLm.util.load_file(HXLm.HDATUM_UDHR + '/udhr.rus.hdp.yml')
+    >>> tree = get_merkle_tree(UDUR_RUS[0])
+    >>> checksum(UDUR_RUS, 'MERKLE')[0].endswith(tree.hexdigest() + '")')
+    True
+    """
+    return MerkleTree(_get_hashable_body(hsilo))
+
+
+def _get_hashable_body(hsilo: dict) -> Union[dict, list]:
+    """The body of an hsilo, in Latin, without metakeys (see hashable)"""
+
+    # transpose requires array, but we're calling directly
+    hsilo_lat = transpose([hsilo], 'LAT')[0]
+    hsilo_lat_body = _get_hsilo_body(hsilo_lat)
+    return _clean_metakeys(hsilo_lat_body, prefix='<<', suffix='>>')
 
 
 def transpose(hsilo: list,
               target_lid: str,
-              verbose: bool = False) -> list:
+              verbose: bool = False,
+              cache: 'TransposeFragmentCache' = None) -> list:
     """Transpose ('translate') and HSilo betwen languages
 
     Args:
         hsilo (list): [description]
         target_lid (str): An Localization ID, like RUS-Cyrl
         verbose (bool, optional): If output metakeys. Defaults to False.
+        cache (TransposeFragmentCache, optional): Reuse fragments already
+                transposed (see transpose_hsilo). Defaults to None
 
     Returns:
         list: An transposed hdggroup
     """
 
-    transposed = transpose_hsilo(hsilo, target_lid=target_lid)
+    transposed = transpose_hsilo(hsilo, target_lid=target_lid, cache=cache)
     if not verbose:
         transposed = _clean_metakeys(transposed)
         # print('oioioi', verbose, transposed)
@@ -892,7 +1031,9 @@ def transpose(hsilo: list,
 
 def transpose_hsilo(hsilo: Union[list, dict],
                     target_lid: str,
-                    source_lid: str = None) -> Union[list, dict]:
+                    source_lid: str = None,
+                    cache: 'TransposeFragmentCache' = None
+                    ) -> Union[list, dict]:
     """Transpose ('translate') and HSilo from Latin to another language
 
     If the object already is not in Latin, you should first prepare in Latin
@@ -903,6 +1044,10 @@ def transpose_hsilo(hsilo: Union[list, dict],
         target_lid (str): An Localization ID, like RUS-Cyrl
         source_lid (str): An Localization ID, like RUS-Cyrl. If not given, will
                 be implicitly detected
+        cache (TransposeFragmentCache, optional): Fragments already
+                transposed. When the same (or an edited) hsilo is transposed
+                again, only the changed fragments are transposed.
+                Defaults to None
 
     Returns:
         dict: An transposed HSilo
@@ -920,9 +1065,6 @@ def transpose_hsilo(hsilo: Union[list, dict],
     'RUS-Cyrl'
     """
 
-    # TODO: maybe we should review this need here
-    global HDP_VKG_FULL  # pylint: disable=W0603
-
     # print('target_lid', target_lid)
 
     result = []
@@ -945,23 +1087,10 @@ def transpose_hsilo(hsilo: Union[list, dict],
             # We still using 3 letter (like RUS) instead of 8 (like RUS-Cyrl)
             source_lid_ = source_lid_[0:3]
 
-        # HDP_VKG_FULL = build_new_vocabulary_knowledge_graph(
-        #     key_vid=target_lid)
-        HDP_VKG_FULL = build_new_vocabulary_knowledge_graph(
-            key_vid=source_lid_)
-
-        # active_vkg = HDP_VKG
-        active_vkg = HDP_VKG_FULL[source_lid_]
-
-        # print('active_vkg', source_lid_, hsilo[idx])
-        # print('active_vkg', source_lid_, target_lid, active_vkg)
-        # if HPD_VKG is None:
-        #     HPD_VKG = Cutil.load_file(C.HXLM_ROOT + '/schema/core_vocab.yml')
-
         hsilo_ = _transpose_root(hsilo,
                                  objectivum_linguam=target_lid,
                                  fontem_linguam=source_lid_,
-                                 active_vkg=active_vkg
+                                 cache=cache
                                  )
         # TODO: this selection of first item of list should be changed when
         #       _transpose_root receive an refactoring. See notes there.
@@ -1009,97 +1138,299 @@ def transpose_hsilo(hsilo: Union[list, dict],
     # return hsilo
 
 
+def _get_transpose_keymap_vkg(active_vkg: dict,
+                              objectivum_linguam: str) -> tuple:
+    return tuple(
+        {key: terms[objectivum_linguam]['id']
+         for key, terms in active_vkg[group].items()
+         if objectivum_linguam in terms and
+         terms[objectivum_linguam].get('id')}
+        for group in ('root', 'attr'))
+
+
+def _get_vkg_hash(vkg_file: str) -> str:
+    with open(vkg_file, 'rb') as vkg_f:
+        return hashlib.sha256(vkg_f.read()).hexdigest()
+
+
+def get_vkg_languages(vkg: dict = None) -> list:
+    """ISO 639-3 codes (like LAT, RUS) of an vocabulary knowledge graph
+
+    >>> 'LAT' in get_vkg_languages()
+    True
+    """
+    vkg = get_hdp_vkg() if vkg is None else vkg
+    languages = set()
+    for group in ('root', 'attr'):
+        for terms in vkg[group].values():
+            languages.update(
+                key for key in terms
+                if len(key) == 3 and key.isalpha() and key.isupper())
+    return sorted(languages)
+
+
+def compile_transpose_keymaps(vkg_file: str = HDP_VKG_FILE,
+                              keymap_file: str = HDP_VKG_KEYMAP_FILE) -> str:
+    """Compile the get_transpose_keymap of every language pair to one file
+
+    Format (UTF-8, written atomically):
+        - HDP-VKG-KEYMAP 1 <sha256 of vkg_file>
+        - JSON index {source: {target: [offset, length]}}, offsets after
+          the end of this line
+        - one JSON [root, attr] per language pair
+
+    This allow TransposeKeymapTable only parse (via mmap) the pairs used.
+
+    Args:
+        vkg_file (str): Defaults to HDP_VKG_FILE
+        keymap_file (str): Defaults to HDP_VKG_KEYMAP_FILE
+
+    Returns:
+        str: keymap_file
+    """
+    vkg = Cutil.load_file(vkg_file)
+    languages = get_vkg_languages(vkg)
+    full_vkgs = {}
+    index = {}
+    blocks = []
+    offset = 0
+
+    for source in languages:
+        try:
+            active_vkg = build_new_vocabulary_knowledge_graph(
+                key_vid=source, source_vkg=vkg, full_vkgs=full_vkgs)[source]
+        except KeyError:
+            # Not all terms on this language; transpose from it would fail
+            continue
+        index[source] = {}
+        for target in languages:
+            block = json.dumps(
+                _get_transpose_keymap_vkg(active_vkg, target),
+                ensure_ascii=False, sort_keys=True).encode('utf-8')
+            index[source][target] = [offset, len(block)]
+            blocks.append(block)
+            offset += len(block)
+
+    keymap_dir = os.path.dirname(os.path.abspath(keymap_file))
+    os.makedirs(keymap_dir, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+            'wb', dir=keymap_dir, delete=False) as keymap_tmp:
+        keymap_tmp.write(_HDP_VKG_KEYMAP_MAGIC +
+                         _get_vkg_hash(vkg_file).encode('ascii') + b'\n')
+        keymap_tmp.write(json.dumps(index).encode('utf-8') + b'\n')
+        keymap_tmp.write(b''.join(blocks))
+    # NamedTemporaryFile is 0600; this one is not private
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(keymap_tmp.name, 0o666 & ~umask)
+    os.replace(keymap_tmp.name, keymap_file)
+    return keymap_file
+
+
+class TransposeKeymapTable:
+    """Read-only view (mmap) of an compile_transpose_keymaps file
+
+    Only the header and the index are parsed on open; each language pair
+    is parsed on first use.
+
+    >>> import tempfile
+    >>> keymap_file = tempfile.mkdtemp() + '/core.vkg.keymap'
+    >>> table = TransposeKeymapTable(compile_transpose_keymaps(
+    ...     keymap_file=keymap_file))
+    >>> table.vkg_hash == _get_vkg_hash(HDP_VKG_FILE)
+    True
+    >>> table.get('LAT', 'SPA')[0]['hfilum']
+    'archivo'
+    >>> table.get('LAT', 'XYZ')
+    """
+
+    def __init__(self, keymap_file: str):
+        with open(keymap_file, 'rb') as keymap_f:
+            self._mmap = mmap.mmap(
+                keymap_f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = self._mmap.readline()
+        if not header.startswith(_HDP_VKG_KEYMAP_MAGIC):
+            raise ValueError('Not an VKG keymap [' + keymap_file + ']')
+        self.vkg_hash = header[len(_HDP_VKG_KEYMAP_MAGIC):].strip().decode(
+            'ascii')
+        self._index = json.loads(self._mmap.readline())
+        self._start = self._mmap.tell()
+        self._cache = {}
+
+    def get(self, fontem_linguam: str, objectivum_linguam: str) -> tuple:
+        """(root, attr) of get_transpose_keymap, or None if unknown"""
+        cache_key = (fontem_linguam, objectivum_linguam)
+        if cache_key not in self._cache:
+            position = self._index.get(fontem_linguam, {}).get(
+                objectivum_linguam)
+            if position is None:
+                return None
+            start = self._start + position[0]
+            self._cache[cache_key] = tuple(json.loads(
+                self._mmap[start:start + position[1]]))
+        return self._cache[cache_key]
+
+
+def get_transpose_keymap_table() -> TransposeKeymapTable:
+    """The TransposeKeymapTable of HDP_VKG_FILE, compiled if need
+
+    HDP_VKG_KEYMAP_FILE is used if was compiled from the current
+    HDP_VKG_FILE (same sha256); then HDP_VKG_KEYMAP_FILE_ALT. If both
+    are outdated, the first writable one is (re)compiled.
+
+    Returns:
+        TransposeKeymapTable: the table, or None if not possible to have one
+    """
+    global _HDP_VKG_KEYMAP_TABLE  # pylint: disable=W0603
+
+    if _HDP_VKG_KEYMAP_TABLE is not None:
+        return _HDP_VKG_KEYMAP_TABLE or None
+
+    _HDP_VKG_KEYMAP_TABLE = False
+    vkg_hash = _get_vkg_hash(HDP_VKG_FILE)
+    keymap_files = (HDP_VKG_KEYMAP_FILE, HDP_VKG_KEYMAP_FILE_ALT)
+    for keymap_file in keymap_files:
+        try:
+            table = TransposeKeymapTable(keymap_file)
+        except (OSError, ValueError):
+            continue
+        if table.vkg_hash == vkg_hash:
+            _HDP_VKG_KEYMAP_TABLE = table
+            return table
+
+    for keymap_file in keymap_files:
+        try:
+            _HDP_VKG_KEYMAP_TABLE = TransposeKeymapTable(
+                compile_transpose_keymaps(HDP_VKG_FILE, keymap_file))
+            return _HDP_VKG_KEYMAP_TABLE
+        except (OSError, ValueError):
+            if _IS_DEBUG:
+                print('get_transpose_keymap_table: not writable', keymap_file)
+    return None
+
+
+def get_transpose_keymap(fontem_linguam: str,
+                         objectivum_linguam: str,
+                         active_vkg: dict = None) -> tuple:
+    """Key maps (root and attr) from one language to another
+
+    The maps come from the compiled table of all language pairs (see
+    get_transpose_keymap_table) or, if not available, are built from
+    HDP_VKG (see build_new_vocabulary_knowledge_graph). Both are cached on
+    HDP_VKG_KEYMAP, so transpose only do one dict lookup per key.
+
+    Args:
+        fontem_linguam (str): ISO 639-3 code of the source, like LAT
+        objectivum_linguam (str): ISO 639-3 code of the target, like RUS
+        active_vkg (dict, optional): An vocabulary knowledge graph. If
+                        given, the maps are built from it (and not cached).
+                        Defaults to HDP_VKG_FULL[fontem_linguam]
+
+    Returns:
+        tuple: (root, attr), both dict source key -> target key
+
+    Examples:
+        >>> root, attr = get_transpose_keymap('LAT', 'SPA')
+        >>> root['hfilum']
+        'archivo'
+        >>> get_transpose_keymap('LAT', 'SPA') is get_transpose_keymap(
+        ...     'LAT', 'SPA')
+        True
+    """
+    if active_vkg is not None:
+        return _get_transpose_keymap_vkg(active_vkg, objectivum_linguam)
+
+    cache_key = (fontem_linguam, objectivum_linguam)
+    if cache_key not in HDP_VKG_KEYMAP:
+        table = get_transpose_keymap_table()
+        keymap = table.get(*cache_key) if table is not None else None
+        if keymap is None:
+            keymap = _get_transpose_keymap_vkg(
+                build_new_vocabulary_knowledge_graph(
+                    key_vid=fontem_linguam)[fontem_linguam],
+                objectivum_linguam)
+        HDP_VKG_KEYMAP[cache_key] = keymap
+    return HDP_VKG_KEYMAP[cache_key]
+
+
 def _transpose_root(hdp_current: dict,
                     objectivum_linguam: str,
                     fontem_linguam: str = None,
-                    active_vkg: dict = HDP_VKG) -> dict:
+                    active_vkg: dict = None,
+                    cache: 'TransposeFragmentCache' = None) -> dict:
     """For an hdp_current (already with internal format) get translation
 
+    The source is not changed (or copied): new dicts and lists are created
+    only for what is transposed. Keys starting with _ and the
+    VOCAB_RECURSION_LEAF values are shared with hdp_current.
+
     Args:
         hdp_current (dict): an hdp meta object. Must already have keys in
                             the linguam:HDP
         objectivum_linguam (str): ISO 639-3 code to convert
         fontem_linguam (str): ISO 639-3 code to import. Defaults to none
-
-    Raises:
-        SyntaxError: when using ISO 639-3 invalid codes
+        active_vkg (dict, optional): Active vocabulary knowledge graph.
+                            Defaults to HDP_VKG_FULL[fontem_linguam]
+        cache (TransposeFragmentCache, optional): Fragments already
+                            transposed. Not used with active_vkg
 
     Returns:
         dict: And HDP object already translated to target linguam
-    """
-
-    # TODO: maybe this should be converted to change only one dict while
-    #       transpose_hsilo keep track of the lists. For now lists will
-    #       stay as it is, but this is something to do on potential refactoring
-    #       (Emerson Rocha, 2021-03-26 06:39)
 
-    # print('oi1', hdp_current)
+    Examples:
+        >>> hsilo = [{'hsilo': {'tag': ['udhr']}, '_note': {'hsilo': 1}}]
+        >>> hsilo_rus = _transpose_root(hsilo, 'RUS', 'LAT')
+        >>> hsilo_rus[0]['силосная']
+        {'тег': ['udhr']}
+        >>> hsilo_rus[0]['_note'] is hsilo[0]['_note']
+        True
+        >>> hsilo
+        [{'hsilo': {'tag': ['udhr']}, '_note': {'hsilo': 1}}]
+    """
 
     if _IS_DEBUG:
         print('HDP._transpose_root', fontem_linguam,
         objectivum_linguam, hdp_current)  # noqa
-        # print('HDP._transpose_root', HDP_VKG)
 
     if len(hdp_current) == 0:
         return hdp_current
 
-    hdp_result = deepcopy(hdp_current)
+    if active_vkg is None and fontem_linguam is None:
+        active_vkg = get_hdp_vkg()
+    root_map, attr_map = get_transpose_keymap(
+        fontem_linguam, objectivum_linguam, active_vkg)
 
-    # if len(objectivum_linguam) != 3 or not objectivum_linguam.isalpha():
-    #     raise SyntaxError('No 3 letter or 3 ASCII letter? ' +
-    #                       'linguam must be an ISO 639-3 (3 letter) ' +
-    #                       'code, like "ARA" or "RUS" ' +
-    #                       '[' + objectivum_linguam + ']')
-    # if not objectivum_linguam.isupper():
-    #     raise SyntaxError('No UPPERCASE? ' +
-    #                       'linguam must be an ISO 639-3 (3 letter) ' +
-    #                       'code, like "ARA" or "ARA" ' +
-    #                       '[' + objectivum_linguam + ']')
+    if cache is None or active_vkg is not None:
+        def _transpose_value(value, key_l1, _hdpns):
+            return _transpose_tree(value, key_l1, attr_map)
+    else:
+        def _transpose_value(value, key_l1, hdpns):
+            return cache.transpose(value, key_l1, attr_map,
+                                   (fontem_linguam, objectivum_linguam),
+                                   root=hdp_current, path=(hdpns, key_l1))
 
-    # for hdpns in hdp_current:
-    for hdpns, _ in enumerate(hdp_current):
+    hdp_result = []
 
-        # print('hdpns', hdpns)
-
-        # First level
-        for key_l1 in hdp_current[hdpns]:
-            # for key_l1, _ in enumerate(hdp_current[hdpns]):
-
-            # print('oooi', hdpns, key_l1)
-            if ((key_l1 in active_vkg['root']) and
-            (objectivum_linguam in active_vkg['root'][key_l1])):  # noqa
-                newterm = active_vkg['root'][key_l1][objectivum_linguam]['id']  # noqa
-                # print('key_l1 in active_vkg.root', key_l1)
-                # print('key_l1 in active_vkg.root', newterm)  # noqa
-                hdp_result[hdpns][newterm] = hdp_result[hdpns].pop(key_l1)
-                hdp_result[hdpns][newterm] = _transpose_recursive(
-                    hdp_result[hdpns][newterm],
-                    objectivum_linguam=objectivum_linguam,
-                    fontem_linguam=fontem_linguam,
-                    context=key_l1,
-                    active_vkg=active_vkg)
+    for hdpns, _ in enumerate(hdp_current):
+        hdp_item = hdp_current[hdpns]
+        hdp_item_new = {}
+        # Translated keys go after the untranslated ones
+        root_keys = []
+
+        for key_l1, value in hdp_item.items():
+            if key_l1 in root_map:
+                root_keys.append((key_l1, value))
+            elif str(key_l1).startswith('_'):
+                hdp_item_new[key_l1] = value
             else:
+                hdp_item_new[key_l1] = _transpose_value(value, key_l1, hdpns)
 
-                # print('hdp_current', hdp_current[hdpns])
-                # print('hdp_current', 'aaaaaaaaa')
-
-                # TODO: bruteforce here the thing
-                # if _IS_DEBUG:
-                #     res = self.quid_est_hoc(key_l1)
-                #     print('    HDP.quid_est_hoc ', key_l1, res)
-
-                if not str(key_l1).startswith('_'):
-                    hdp_result[hdpns][key_l1] = _transpose_recursive(
-                        hdp_current[hdpns][key_l1],
-                        objectivum_linguam=objectivum_linguam,
-                        fontem_linguam=fontem_linguam,
-                        context=key_l1,
-                        active_vkg=active_vkg)
+        for key_l1, value in root_keys:
+            hdp_item_new[root_map[key_l1]] = _transpose_value(
+                value, key_l1, hdpns)
 
-        # print(type(hdp_current[hdpns]))
-
-        lidsnow_ = get_language_identifiers(hdp_result[hdpns])
-        hdp_result[hdpns]['<<!transpose!>>'] = {
+        lidsnow_ = get_language_identifiers(hdp_item_new)
+        hdp_item_new['<<!transpose!>>'] = {
             'checksum': '(CRC (TODO))',
             'checksum_changed': False,  # TODO: this need to be tested later
             'source_lid': fontem_linguam,
@@ -1109,31 +1440,13 @@ def _transpose_root(hdp_current: dict,
             'needs_header_change': True
         }
 
-        # meta['body_canonical'] = _get_hsilo_body(hsilo)
-        # meta['checksum_source'] = get_hashable(meta['body_canonical'])
-        # meta['checksum'] = _get_checksum(meta['checksum_source'])
-
         if _IS_DEBUG:
-            hdp_result[hdpns]['<<!!transpose!!>>'] = {
+            hdp_item_new['<<!!transpose!!>>'] = {
                 'body_canonical': None,
                 'checksum_source': None
             }
 
-        # print('lidsnow_', lidsnow_)
-
-        # if fontem_linguam != objectivum_linguam:
-
-        #     hheader = _get_hsilo_meta_header(hdp_current[hdpns])
-        #     mheaderkey = list(hheader.keys())[0]
-        #     hheaderkey_new = '([' + objectivum_linguam + '])'
-
-        #     print(hdp_current[hdpns])
-        #     hdp_current[hdpns][mheaderkey] = 'old'
-        #     # delattr(hdp_current[hdpns], mheaderkey)
-
-        #     hdp_current[hdpns][hheaderkey_new] = hheader
-
-        #     print('TODO: add header', hheader, mheaderkey)
+        hdp_result.append(hdp_item_new)
 
     # TODO: the transpose root should create a new header with the new
     #       language. At the moment it's not doing this, so the language
@@ -1142,123 +1455,325 @@ def _transpose_root(hdp_current: dict,
     return hdp_result
 
 
-def _transpose_recursive(hdp_current: Union[dict, list],
-                         objectivum_linguam: str,
-                         fontem_linguam: str = None,
-                         context: str = None,
-                         level: int = 1,
-                         active_vkg: dict = HDP_VKG) -> Union[dict, bool]:
-    """Recursively translate an item.
+def _transpose_tree(hdp_current: Union[dict, list],
+                    context: str,
+                    attr_map: dict,
+                    key: str = None) -> Union[dict, list]:
+    """Translate the keys of an item, iteratively (no depth limit)
 
     Args:
         hdp_current (dict, list): The hdp internal object/list
-        objectivum_linguam (str): ISO 639-3 code
-        context (str, optional): Context (key on upper level key).
-                                    Defaults to None.
-        level (int, optional): How deep we are on this recursion?
-        active_vkg (dict, optional): Active vocabulary knowledge graph.
-                                  Defaults to vocab_core.yml (Latin)
+        context (str): Key on upper level (the hsilo root key)
+        attr_map (dict): attr keys, source -> target (see
+                         get_transpose_keymap)
+        key (str, optional): Key of hdp_current, if context is not (like
+                         context 'hsilo.grupum' and key 'grupum').
+                         Defaults to context
 
     Returns:
-        Union[dict, bool]: And HDP object already translated to target
-                            linguam or bool if no translation is need
-    """
-
-    if level > 10:
-        raise RecursionError('Level too high. ' +
-                             'Programming or HDP file error? ' +
-                             '[ ' + str(level) + ' ] ' +
-                             '[ ' + str(context) + ' ] ' +
-                             '[ ' + str(objectivum_linguam) + ' ] ' +
-                             '[ ' + str(fontem_linguam) + ' ] ' +
-                             '[ ' + str(hdp_current) + ' ] ')
+        Union[dict, list]: new dicts/lists; leafs are not copied
 
-    if _IS_DEBUG:
-        print('_transpose_recursive: start', level, context,
-                objectivum_linguam, fontem_linguam)  # noqa
+    Examples:
+        >>> _transpose_tree({'tag': ['a'], 'adm0': {'tag': 1}}, 'hsilo',
+        ...                 {'tag': 'etiqueta', 'adm0': 'adm0'})
+        {'etiqueta': ['a'], 'adm0': {'tag': 1}}
+        >>> deep = {'tag': 'x'}
+        >>> for _ in range(1000):
+        ...     deep = {'grupum': [deep]}
+        >>> for _ in range(1000):
+        ...     deep = _transpose_tree(deep, 'hsilo', {'grupum': 'g'})['g'][0]
+        >>> deep
+        {'tag': 'x'}
+    """
+    # Stack of (source, context, new parent, key on new parent). The
+    # context only keeps the parent key, enough for VOCAB_RECURSION_LEAF
+    # (no item with more than one '.')
+    result = [None]
+    stack = [(hdp_current, str(context),
+              str(context) if key is None else str(key), result, 0)]
+    while stack:
+        item, context_now, key_now, parent, slot = stack.pop()
+
+        if context_now.endswith(VOCAB_RECURSION_LEAF):
+            parent[slot] = item
+        elif isinstance(item, list):
+            item_new = [None] * len(item)
+            parent[slot] = item_new
+            for idx in range(len(item) - 1, -1, -1):
+                stack.append((item[idx], context_now, key_now, item_new, idx))
+        elif isinstance(item, dict):
+            item_new = {}
+            parent[slot] = item_new
+            children = []
+            for key, value in item.items():
+                # key attribute start with _. Don't translate this or leafs
+                if str(key).startswith('_'):
+                    item_new[key] = value
+                    continue
+                key_new = attr_map.get(key, key)
+                # Reserve the position; last one win if two keys collide
+                item_new[key_new] = None
+                children.append((value, key_now + '.' + str(key), str(key),
+                                 item_new, key_new))
+            stack.extend(reversed(children))
+        else:
+            parent[slot] = item
 
-    if context.endswith(VOCAB_RECURSION_LEAF):
-        if _IS_DEBUG:
-            print('_transpose_recursive: leaf. nop')
-        return hdp_current
+    return result[0]
 
-    if isinstance(hdp_current, list):
-        if _IS_DEBUG:
-            print('_transpose_recursive: list')  # noqa
-
-        hdp_new = []
-
-        # for idx, item in enumerate(hdp_current):
-        for idx, _ in enumerate(hdp_current):
-            # print('    pepa', type(idx))
-            # print('    pepa', type(item))
-
-            hdp_new.append(
-                _transpose_recursive(
-                    hdp_current[idx],
-                    objectivum_linguam=objectivum_linguam,
-                    fontem_linguam=fontem_linguam,
-                    context=context,
-                    level=(level+1),
-                    active_vkg=active_vkg)
-            )
-        return hdp_new
-
-    if isinstance(hdp_current, dict):
-        if _IS_DEBUG:
-            print('_transpose_recursive: dict', hdp_current)  # noqa
 
-        hdp_new = {}
+class TransposeFragmentCache:
+    """Cache of transposed fragments, for incremental transpose
 
-        for idx, (k, v) in enumerate(hdp_current.items()):
+    Without track(), an fragment is each item of an list on the root of an
+    hsilo (like each item of hdatum or hrecipe) or, if not an list, the
+    entire value of the root key. The cache key is an hash of the fragment
+    (see get_hashable_json, with the order of the keys), the root key and
+    the languages, so after an edit only the fragments that changed are
+    transposed again. Every fragment is still serialized and hashed on each
+    transpose (to find what changed), so this saves the transpose, but the
+    time is still proportional to the document. Fragments with keys that
+    are not str (like YAML years, that JSON would make str) are not cached.
 
-            # key attribute start with k. Don't translate this or leafs
-            if str(k).startswith('_'):
-                hdp_new[k] = hdp_current[k]
-                continue
+    With track(hsilo) and the edits done with update(), the changed paths
+    are already known: only the dicts and lists on each path (at any depth)
+    are built again, the lists with list.copy() of the previous result.
+    Nothing else is hashed or walked, so the transpose after an edit costs
+    about the size of the path (and of the dicts on it), not of the
+    document. update() itself costs an MerkleTree.update(): the nodes on
+    the path are hashed again (with the digests of their children).
 
-            # Let's find if current attribute is translatabe
-            # - attr exists?
-            # - objectivum_linguam exists for this attr?
-            # - id exists for this attr+objectivum_linguam?
-            if ((k in active_vkg['attr']) and
-                    (active_vkg['attr'][k][objectivum_linguam]['id']) and
-                    (active_vkg['attr'][k][objectivum_linguam]['id'])):
+    Fragments are shared between the results (and with the cache); as with
+    _transpose_root, do not change the results in place.
 
-                k_new = active_vkg['attr'][k][objectivum_linguam]['id']
-            else:
-                if _IS_DEBUG:
-                    print('_transpose_recursive: nop k', k)
-
-                # Ok. Deeper search
-
-                k_new = k
-
-            if isinstance(hdp_current, (dict, list)):
-                context_new = context + '.' + k
-                hdp_new[k_new] = _transpose_recursive(
-                    hdp_current[k],
-                    objectivum_linguam=objectivum_linguam,
-                    fontem_linguam=fontem_linguam,
-                    context=context_new,
-                    level=(level+1),
-                    active_vkg=active_vkg
-                )
-                continue
+    Examples:
+        >>> cache = TransposeFragmentCache()
+        >>> hsilo = [{'([Lingua Latina])': None, 'hsilo': {'tag': ['a']},
+        ...           'hdatum': [{'id': 'a'}, {'id': 'b'}]}]
+        >>> result1 = transpose_hsilo(hsilo, 'RUS', 'LAT', cache=cache)
+        >>> cache.cache_hits, cache.cache_misses
+        (0, 4)
+        >>> hsilo[0]['hdatum'][1] = {'id': 'c'}
+        >>> result2 = transpose_hsilo(hsilo, 'RUS', 'LAT', cache=cache)
+        >>> cache.cache_hits, cache.cache_misses
+        (3, 5)
+        >>> result2 == transpose_hsilo(hsilo, 'RUS', 'LAT')
+        True
+
+        With track(), the cache counts root values (not fragments)
+
+        >>> cache = TransposeFragmentCache()
+        >>> tree = cache.track(hsilo)
+        >>> result1 = transpose_hsilo(hsilo, 'RUS', 'LAT', cache=cache)
+        >>> cache.update((0, 'hdatum', 1, 'id'), 'd')
+        >>> result2 = transpose_hsilo(hsilo, 'RUS', 'LAT', cache=cache)
+        >>> cache.cache_hits, cache.cache_misses
+        (2, 4)
+        >>> result2 == transpose_hsilo(hsilo, 'RUS', 'LAT') != result1
+        True
+        >>> tree.hexdigest() == MerkleTree(hsilo).hexdigest()
+        True
+    """
 
-            if isinstance(v, str):
-                # If value already is an string, perfect match
-                hdp_new[k_new] = hdp_current[k]
+    def __init__(self, maxsize: int = None):
+        """
+        Args:
+            maxsize (int, optional): Maximum number of fragments. The least
+                           recently used are removed first. Should be more
+                           than the fragments of one transpose, or nothing
+                           is reused. Defaults to None (no limit)
+        """
+        self.maxsize = maxsize
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._fragments = {}
+        self._tree = None
+        # {(linguam, hdpns, root key): [result, [paths changed since]]}
+        self._tracked = {}
+
+    def __len__(self):
+        return len(self._fragments) + len(self._tracked)
+
+    def clear(self):
+        self._fragments.clear()
+        self._tracked.clear()
+
+    def track(self, hsilo: list) -> MerkleTree:
+        """Track the edits of hsilo (the same list, not an copy)
+
+        Only edits done with update() are seen: after any other change to
+        hsilo, call track() again.
+
+        Args:
+            hsilo (list): the hsilo list that will be transposed
+
+        Returns:
+            MerkleTree: MerkleTree(hsilo), kept updated by update()
+        """
+        self._tree = MerkleTree(hsilo)
+        self._tracked = {}
+        return self._tree
+
+    def update(self, path: tuple, value):
+        """Set an value of the hsilo of track(), like MerkleTree.update()
+
+        Args:
+            path (tuple): Starts with the index of the hsilo item, like
+                          (0, 'hdatum', 5, 'nomen')
+            value: the new value
+        """
+        if self._tree is None:
+            raise ValueError('TransposeFragmentCache.update without track')
+        path = tuple(path)
+        self._tree.update(path, value)
+        if len(path) == 0:
+            # MerkleTree.thing is not the hsilo of track() anymore
+            self._tree = None
+            self._tracked = {}
+            return
+        for key, tracked in list(self._tracked.items()):
+            if key[1:1 + len(path)] != path[:2]:
                 continue
-
-            # Did exist some conditiono not checked?
-            if _IS_DEBUG:
-                print('_transpose_recursive: dict (?)', k, v)
-            hdp_new[k_new] = hdp_current[k]
-
-        return hdp_new
-
-    if _IS_DEBUG:
-        print('_transpose_recursive: not dict/list')  # noqa
-
-    return hdp_current
+            if len(path) <= 2:
+                del self._tracked[key]
+            else:
+                tracked[1].append(path[2:])
+
+    @staticmethod
+    def _is_cacheable(fragment) -> bool:
+        """All keys (of all levels) are str, so the JSON is unique"""
+        pending = [fragment]
+        while pending:
+            item = pending.pop()
+            if isinstance(item, dict):
+                for key, value in item.items():
+                    if not isinstance(key, str):
+                        return False
+                    if isinstance(value, (dict, list)):
+                        pending.append(value)
+            elif isinstance(item, list):
+                pending.extend(
+                    sub for sub in item if isinstance(sub, (dict, list)))
+        return True
+
+    def _fragment(self, fragment, context: str, attr_map: dict,
+                  linguam: tuple):
+        if not self._is_cacheable(fragment):
+            return _transpose_tree(fragment, context, attr_map)
+        try:
+            key = (linguam, context, hashlib.blake2b(
+                get_hashable_json(fragment, sort_keys=False).encode('utf-8'),
+                digest_size=16).digest())
+        except (TypeError, ValueError):
+            # Not JSON serializable (like dates). Just transpose
+            return _transpose_tree(fragment, context, attr_map)
+
+        if key in self._fragments:
+            self.cache_hits += 1
+            if self.maxsize is None:
+                return self._fragments[key]
+            # dicts keep insertion order; move to the end, as most recent
+            result = self._fragments[key] = self._fragments.pop(key)
+            return result
+
+        self.cache_misses += 1
+        result = self._fragments[key] = _transpose_tree(
+            fragment, context, attr_map)
+        if self.maxsize is not None and len(self._fragments) > self.maxsize:
+            del self._fragments[next(iter(self._fragments))]
+        return result
+
+    def _tracked_value(self, value, context: str, attr_map: dict,
+                       linguam: tuple, path: tuple):
+        key = (linguam,) + path
+        tracked = self._tracked.get(key)
+        if tracked is not None and not tracked[1]:
+            self.cache_hits += 1
+            return tracked[0]
+
+        self.cache_misses += 1
+        if tracked is None:
+            result = _transpose_tree(value, context, attr_map)
+        else:
+            # {key: {key: ...}}, True where everything below changed
+            changed = {}
+            for path_changed in tracked[1]:
+                node = changed
+                for key_changed in path_changed[:-1]:
+                    node = node.setdefault(key_changed, {})
+                    if node is True:
+                        break
+                else:
+                    node[path_changed[-1]] = True
+            result = self._patch(value, tracked[0], str(context),
+                                 str(context), attr_map, changed)
+        self._tracked[key] = [result, []]
+        return result
+
+    def _patch(self, item, previous, context_now: str, key_now: str,
+               attr_map: dict, changed):
+        """_transpose_tree(item), reusing previous (the result before the
+        changed paths) for everything not on them"""
+        if context_now.endswith(VOCAB_RECURSION_LEAF):
+            return item
+        if changed is True:
+            return _transpose_tree(item, context_now, attr_map, key_now)
+
+        if isinstance(item, list) and isinstance(previous, list) and \
+                len(item) == len(previous):
+            result = previous.copy()
+            for idx, changed_idx in changed.items():
+                result[idx] = self._patch(
+                    item[idx], previous[idx], context_now, key_now,
+                    attr_map, changed_idx)
+            return result
+
+        if isinstance(item, dict) and isinstance(previous, dict):
+            result = {}
+            for key, value in item.items():
+                if str(key).startswith('_'):
+                    result[key] = value
+                    continue
+                key_new = attr_map.get(key, key)
+                if key in changed:
+                    result[key_new] = self._patch(
+                        value, previous.get(key_new),
+                        key_now + '.' + str(key), str(key), attr_map,
+                        changed[key])
+                elif key_new in previous:
+                    result[key_new] = previous[key_new]
+                else:
+                    break
+            else:
+                return result
+
+        return _transpose_tree(item, context_now, attr_map, key_now)
+
+    def transpose(self, value, context: str, attr_map: dict,
+                  linguam: tuple, root: list = None, path: tuple = None):
+        """Same result as _transpose_tree(value, context, attr_map)
+
+        Args:
+            value: value of an root key of an hsilo
+            context (str): the root key
+            attr_map (dict): attr keys, source -> target (see
+                             get_transpose_keymap)
+            linguam (tuple): (source, target) ISO 639-3 codes of attr_map
+            root (list, optional): the hsilo list of value
+            path (tuple, optional): (index of the hsilo item, root key). If
+                             root is the hsilo of track(), edits done with
+                             update() are patched on the previous result
+
+        Returns:
+            Union[dict, list]: transposed value
+        """
+        if str(context).endswith(VOCAB_RECURSION_LEAF):
+            return value
+        if path is not None and self._tree is not None and \
+                root is self._tree.thing:
+            return self._tracked_value(value, context, attr_map, linguam,
+                                       tuple(path))
+        if isinstance(value, list):
+            return [self._fragment(item, context, attr_map, linguam)
+                    for item in value]
+        return self._fragment(value, context, attr_map, linguam)
@@ -32,6 +32,7 @@ SPDX-License-Identifier: Unlicense OR 0BSD
 
 # from dataclasses import dataclass, field, InitVar
 from dataclasses import dataclass, InitVar
+from functools import lru_cache
 
 from typing import (
     Type,
@@ -44,6 +45,114 @@ from typing import (
 #     'urn:': cast_urn
 # }
 
+PARSED_URN_LIMIT = 4096
+"""Maximum number of URN strings kept parsed (parse_urn, parse_data_urn)"""
+
+
+@dataclass(frozen=True)
+class ParsedUrn:
+    """Immutable result of parse_urn / parse_data_urn
+
+    The same string returns the same object (while on the cache), so it can
+    be shared by any number of GenericUrnHtype objects.
+    """
+
+    #: The string value of the URN
+    value: str
+
+    #: the namespace identifier, lower case. Example: 'data' (urn:data--i:)
+    nid: str
+
+    #: <NSS> is the Namespace Specific String
+    nss: str
+
+    #: DataUrnHtype only. Example: 'i' on 'urn:data--i:'. None if omitted
+    nid_attr: str = None
+
+    #: DataUrnHtype only, see DataUrnHtype.bpgp
+    bpgp: str = None
+
+    #: DataUrnHtype only, see DataUrnHtype.bpln
+    bpln: str = None
+
+    #: DataUrnHtype only, see DataUrnHtype.bpln_isdn
+    bpln_isdn: bool = False
+
+
+@lru_cache(maxsize=PARSED_URN_LIMIT)
+def parse_urn(value: str) -> ParsedUrn:
+    """Split an URN on NID and NSS (does not check if is valid)
+
+    >>> parse_urn('urn:IETF:rfc:2141')
+    ParsedUrn(value='urn:IETF:rfc:2141', nid='ietf', nss='rfc:2141', \
+nid_attr=None, bpgp=None, bpln=None, bpln_isdn=False)
+    >>> parse_urn('urn:ietf:rfc:2141') is parse_urn('urn:ietf:rfc:2141')
+    True
+    """
+    parts = value.split(':')
+    return ParsedUrn(
+        value=value,
+        nid=parts[1].lower(),
+        nss=value.replace('urn:' + parts[1] + ':', '', 1)
+    )
+
+
+@lru_cache(maxsize=PARSED_URN_LIMIT)
+def parse_data_urn(value: str, nid_attr_spliter: str = '--') -> ParsedUrn:
+    """Split an urn:data URN (does not check if is valid)
+
+    Raises:
+        ValueError: if the NSS has less than 2 parts
+
+    >>> parse_data_urn('urn:data--i:br:__saude.gov.br__:covid-19-vacinacao')
+    ParsedUrn(value='urn:data--i:br:__saude.gov.br__:covid-19-vacinacao', \
+nid='data', nss='br:__saude.gov.br__:covid-19-vacinacao', nid_attr='i', \
+bpgp='br', bpln='saude.gov.br', bpln_isdn=True)
+    """
+    parts = value.split(':')
+    nid_attr = None
+    if parts[1].lower().find(nid_attr_spliter) != -1:
+        nid, nid_attr = parts[1].lower().split(nid_attr_spliter)
+    else:
+        nid = parts[1].lower()
+    nss = value.replace('urn:' + parts[1] + ':', '', 1)
+
+    bpgp, bpln, *_ = nss.split(":")
+    bpln_isdn = False
+    if bpln.find('__') != -1:
+        bpln = bpln.replace('__', '')
+        bpln_isdn = True
+
+    return ParsedUrn(value=value, nid=nid, nss=nss, nid_attr=nid_attr,
+                     bpgp=bpgp, bpln=bpln, bpln_isdn=bpln_isdn)
+
+
+@lru_cache(maxsize=PARSED_URN_LIMIT)
+def _cast_urn_class(urn: str):
+    urn_lower = urn.lower()
+
+    if urn_lower.startswith('urn:data:') or \
+            urn_lower.startswith('urn:data--i:') or \
+            urn_lower.startswith('urn:data--p:'):
+        return DataUrnHtype
+
+    if urn_lower.startswith('urn:x-hdp:') or urn_lower.startswith('urn:hdp:'):
+        return HdpUrnHtype
+
+    if urn_lower.startswith('urn:ietf:'):
+        return IetfUrnHtype
+
+    if urn_lower.startswith('urn:'):
+        return GenericUrnHtype
+
+    return None
+
+
+@lru_cache(maxsize=PARSED_URN_LIMIT)
+def _search_paths(bpgp: str, bpln: str, bpln_isdn: bool) -> tuple:
+    # bpln_isdn: same paths at the moment (see DataUrnHtype._search_paths)
+    return (bpgp + '/' + bpln + '/',)
+
 
 def cast_urn(urn: Union[str,
                         Type['GenericUrnHtype']]) -> Type['GenericUrnHtype']:
@@ -67,23 +176,11 @@ def cast_urn(urn: Union[str,
         # print('DEBUG: cast_urn already is an instance. Ok.')
         return urn
 
-    urn_lower = urn.lower()
-
-    if urn_lower.startswith('urn:data:') or \
-            urn_lower.startswith('urn:data--i:') or \
-            urn_lower.startswith('urn:data--p:'):
-        return DataUrnHtype(value=urn)
-
-    if urn_lower.startswith('urn:x-hdp:') or urn_lower.startswith('urn:hdp:'):
-        return HdpUrnHtype(value=urn)
-
-    if urn_lower.startswith('urn:ietf:'):
-        return IetfUrnHtype(value=urn)
-
-    if urn_lower.startswith('urn:'):
-        return GenericUrnHtype(value=urn)
-
-    return None
+    # The instances are mutable, so only the class is cached
+    urn_class = _cast_urn_class(urn)
+    if urn_class is None:
+        return None
+    return urn_class(value=urn)
 
 
 def is_urn(urn: Union[str, Type['GenericUrnHtype']],
@@ -171,9 +268,9 @@ class GenericUrnHtype:
             [self, False]: Return self (allow chaining) or false if less strict
         """
         if self.is_valid():
-            parts = self.value.split(':')
-            self.nss = self.value.replace('urn:' + parts[1] + ':', '', 1)
-            self.nid = parts[1].lower()
+            parsed = parse_urn(self.value)
+            self.nss = parsed.nss
+            self.nid = parsed.nid
             self.nss_parsed['nid'] = self.nid
             self.nss_parsed['nss'] = self.nss
             # self.nss_parsed['_raw'] = self.nss
@@ -320,13 +417,7 @@ Maybe?
         Returns:
             list: list of (default) search paths
         """
-        paths = []
-        if not self.bpln_isdn:
-            paths.append(self.bpgp + '/' + self.bpln + '/')
-        else:
-            paths.append(self.bpgp + '/' + self.bpln + '/')
-
-        return paths
+        return list(_search_paths(self.bpgp, self.bpln, self.bpln_isdn))
 
     def _search_object_names(self):
         """Return list of search object names to look (without file extension)
@@ -432,14 +523,11 @@ Maybe?
             [self, False]: Return self (allow chaining) or false if less strict
         """
         if self.is_valid():
-            parts = self.value.split(':')
-            self.nss = self.value.replace('urn:' + parts[1] + ':', '', 1)
-
-            if parts[1].lower().find(self.nid_attr_spliter) != -1:
-                self.nid, self.nid_attr = parts[1].lower().split(
-                    self.nid_attr_spliter)
-            else:
-                self.nid = parts[1].lower()
+            parsed = parse_data_urn(self.value, self.nid_attr_spliter)
+            self.nss = parsed.nss
+            self.nid = parsed.nid
+            if parsed.nid_attr is not None:
+                self.nid_attr = parsed.nid_attr
 
             # if parts[1].lower().find(self.nid_attr_spliter) != -1:
             #     print('')
@@ -453,10 +541,9 @@ Maybe?
             # else:
             #     self.nid = parts[1].lower()
 
-            self.bpgp, self.bpln, *_ = self.nss.split(":")
-            # print('_', _)
-            if self.bpln.find('__') != -1:
-                self.bpln = self.bpln.replace('__', '')
+            self.bpgp = parsed.bpgp
+            self.bpln = parsed.bpln
+            if parsed.bpln_isdn:
                 self.bpln_isdn = True
 
             self.nss_parsed['nid'] = self.nid
@@ -18,14 +18,75 @@ SPDX-License-Identifier: Unlicense OR 0BSD
 
 from hashlib import md5, sha224, sha256, sha3_256, sha3_512, blake2b
 from binascii import crc32
+from functools import partial
+import os
 
 from typing import (
+    Iterator,
     Union
 )
 
 import json
 
-__all__ = ['get_hashable', 'get_hashable_json', 'is_json_string']
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+__all__ = ['get_checksum', 'get_hashable', 'get_hashable_json',
+           'is_json_string', 'iter_hashable_json', 'verify_merkle_proof',
+           'HASH_ALGORITHMS', 'MerkleTree']
+
+# Used by get_hashable_json
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False)
+_JSON_ENCODER_SORTED = json.JSONEncoder(ensure_ascii=False, sort_keys=True)
+
+# Size of each update() of get_checksum
+_CHECKSUM_BUFFER_SIZE = 65536
+
+# Size of each read() of files on get_checksum
+_CHECKSUM_FILE_CHUNK_SIZE = 1048576
+
+# json.loads() only accept strings that (after whitespace) start with one of
+# these characters or are one of these words. See is_json_string
+_JSON_START = frozenset('{["-0123456789')
+_JSON_WORDS = ('true', 'false', 'null', 'NaN', 'Infinity')
+_JSON_WHITESPACE = ' \t\n\r'
+
+
+class _HashCRC32:
+    """CRC32 with the hashlib interface; the digest is an decimal string,
+    like the (CRC32 'α "3839021470") checksums of HDP"""
+
+    name = 'crc32'
+
+    def __init__(self, data: bytes = b''):
+        self._value = crc32(data)
+
+    def update(self, data: bytes):
+        self._value = crc32(data, self._value)
+
+    def hexdigest(self) -> str:
+        return str(self._value)
+
+
+HASH_ALGORITHMS = {
+    'CRC32': _HashCRC32,
+    'BLAKE2B': partial(blake2b, digest_size=32)
+}
+"""Algorithms of get_checksum, name -> hashlib-like constructor. XXH64 is
+available if xxhash (https://pypi.org/project/xxhash/) is installed"""
+
+if xxhash is not None:
+    HASH_ALGORITHMS['XXH64'] = xxhash.xxh64
+
+# Prefixes of the data hashed by MerkleTree. _MERKLE_LEAF only for an leaf
+# alone; leafs on an dict or list are just the JSON. _MERKLE_NODE is never
+# the first byte of an JSON
+_MERKLE_LEAF = b'\x00'
+_MERKLE_LIST = b'\x01'
+_MERKLE_DICT = b'\x02'
+_MERKLE_NODE = b'\x03'
 
 
 def _get_hash_blake2(hashable_data, digest_size: int = 32) -> str:
@@ -236,6 +297,101 @@ def _get_hash_sha3_512(thing: str) -> str:
     return sha3_512(str(thing).encode('utf-8')).hexdigest()
 
 
+def get_checksum(thing: Union[str, dict, list],
+                 algorithm: str = 'CRC32') -> str:
+    """Checksum of get_hashable(thing), without the entire string in memory
+
+    dicts and lists are hashed while serialized (see iter_hashable_json),
+    so the result is the same as hashing get_hashable(thing). bytes and
+    files (an path like pathlib.Path, or an file object) are hashed as they
+    are (not get_hashable), files in chunks. An str is never an path.
+
+    Args:
+        thing (Union[str, bytes, dict, list, os.PathLike, file object]):
+                         Input source
+        algorithm (str): One of HASH_ALGORITHMS or MERKLE (the root of
+                         an MerkleTree). Defaults to 'CRC32'
+
+    Returns:
+        str: The checksum. CRC32 is decimal, others hexadecimal
+
+    Examples:
+        >>> get_checksum({'b': [1, 2], 'a': 'α'})
+        '4228463761'
+        >>> int(get_checksum({'b': [1, 2], 'a': 'α'})) == get_checksum_crc32(
+        ...     {'b': [1, 2], 'a': 'α'})
+        True
+        >>> get_checksum('HDP', 'BLAKE2B') == _get_hash_blake2('HDP')
+        True
+        >>> import io
+        >>> get_checksum(io.BytesIO(b'HDP')) == get_checksum('HDP')
+        True
+        >>> get_checksum(b'\\xff') == get_checksum(io.BytesIO(b'\\xff'))
+        True
+        >>> get_checksum(b'{"b":1}') == get_checksum(io.BytesIO(b'{"b":1}'))
+        True
+        >>> get_checksum('HDP', 'MD4')
+        Traceback (most recent call last):
+        ...
+        NotImplementedError: algorithm [MD4] not implemented
+    """
+    if algorithm == 'MERKLE':
+        return MerkleTree(thing).hexdigest()
+    if algorithm not in HASH_ALGORITHMS:
+        raise NotImplementedError('algorithm [' +
+                                  str(algorithm) + '] not implemented')
+    hashobj = HASH_ALGORITHMS[algorithm]()
+
+    if isinstance(thing, os.PathLike):
+        with open(thing, 'rb') as file_:
+            _update_from_file(hashobj, file_)
+        return hashobj.hexdigest()
+    if hasattr(thing, 'read'):
+        _update_from_file(hashobj, thing)
+        return hashobj.hexdigest()
+    if isinstance(thing, (bytes, bytearray, memoryview)):
+        hashobj.update(thing)
+        return hashobj.hexdigest()
+
+    if isinstance(thing, (dict, list)):
+        parts = iter_hashable_json(thing)
+    else:
+        parts = [get_hashable(thing)]
+
+    buffer = []
+    size = 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= _CHECKSUM_BUFFER_SIZE:
+            hashobj.update(''.join(buffer).encode('utf-8'))
+            buffer = []
+            size = 0
+    hashobj.update(''.join(buffer).encode('utf-8'))
+
+    return hashobj.hexdigest()
+
+
+def _update_from_file(hashobj, file_):
+    """hashobj.update() with the content of an file object, in chunks"""
+    if hasattr(file_, 'readinto'):
+        # Binary: reuse the same buffer
+        buffer = bytearray(_CHECKSUM_FILE_CHUNK_SIZE)
+        view = memoryview(buffer)
+        while True:
+            size = file_.readinto(buffer)
+            if not size:
+                break
+            hashobj.update(view[:size])
+        return
+    while True:
+        chunk = file_.read(_CHECKSUM_FILE_CHUNK_SIZE)
+        if not chunk:
+            break
+        hashobj.update(
+            chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+
+
 def get_checksum_crc32(thing: Union[str, dict, list]) -> int:
     hashable = get_hashable(thing)
     return crc32(bytes(hashable.encode('utf-8')))
@@ -244,8 +400,12 @@ def get_checksum_crc32(thing: Union[str, dict, list]) -> int:
 def get_hashable(thing: Union[str, dict, list]) -> str:
     """Get an normalized string ready to generate an hash
 
+    JSON-like strings (see is_json_string) are normalized, like an dict or
+    list. bytes are decoded (UTF-8, or Latin-1 if not valid UTF-8) and then
+    normalized like an str; get_checksum hashes bytes without this.
+
     Args:
-        thing (Union[str, dict, list]): Input source
+        thing (Union[str, bytes, dict, list]): Input source
 
     Returns:
         str: String ready to be hashed
@@ -256,25 +416,38 @@ def get_hashable(thing: Union[str, dict, list]) -> str:
         'test string'
         >>> HDP_i.get_hashable(12345)
         '12345'
+        >>> HDP_i.get_hashable(' {"b": 1,  "a": [true]}')
+        '{"a": [true], "b": 1}'
+        >>> HDP_i.get_hashable(b'{"b": 1,  "a": [true]}')
+        '{"a": [true], "b": 1}'
+        >>> HDP_i.get_hashable(b'\\xff')
+        'ÿ'
     """
     if isinstance(thing, str):
         jsonlike = is_json_string(thing)
         if not jsonlike:
             return thing
-        else:
-            return get_hashable_json(jsonlike)
-        return thing
+        return get_hashable_json(jsonlike)
     if isinstance(thing, int):
         return str(thing)
+    if isinstance(thing, (bytes, bytearray, memoryview)):
+        try:
+            return get_hashable(bytes(thing).decode('utf-8'))
+        except UnicodeDecodeError:
+            return get_hashable(bytes(thing).decode('latin-1'))
 
     return get_hashable_json(thing)
 
 
-def get_hashable_json(thing: Union[dict, list]) -> str:
+def get_hashable_json(thing: Union[dict, list],
+                      sort_keys: bool = True) -> str:
     """Convert an dict or list to an input ready to be hashable.
 
     Args:
         thing (Union[dict, list]): [description]
+        sort_keys (bool): If False, the order of keys is part of the result
+                          (like for caches of results that keep the order).
+                          Defaults to True
 
     Returns:
         str: An JSON string ideal for hashing
@@ -282,9 +455,265 @@ def get_hashable_json(thing: Union[dict, list]) -> str:
         >>> import hxlm.core.internal.integrity as HDP_i
         >>> HDP_i.get_hashable_json(['test'])
         '["test"]'
+        >>> HDP_i.get_hashable_json({'b': 1, 'a': 2}, sort_keys=False)
+        '{"b": 1, "a": 2}'
     """
-    # json_object = json.load(thing)
-    return json.dumps(thing, indent=None, ensure_ascii=False, sort_keys=True)
+    # Same as json.dumps(thing, indent=None, ensure_ascii=False,
+    # sort_keys=sort_keys), without an new JSONEncoder per call
+    if sort_keys:
+        return _JSON_ENCODER_SORTED.encode(thing)
+    return _JSON_ENCODER.encode(thing)
+
+
+class MerkleTree:
+    """Merkle tree of an dict or list: each node hashes its children
+
+    Each dict or list is an node, hashed (BLAKE2b, 32 bytes) from its
+    children: the get_hashable_json() of leafs (anything not dict or list),
+    the digest of nodes and, for dicts, the keys (sorted). The root digest
+    can be stored as an (MERKLE 'α "...") checksum.
+
+    After an change done with update(), only the nodes on the path to the
+    root are hashed again. get_proof() returns what an reader needs, with
+    the root digest, to verify one subtree without the rest of the document
+    (see verify_merkle_proof).
+
+    Examples:
+        >>> thing = {'hsilo': {'nomen': 'test'}, 'hdatum': [{'id': 1}]}
+        >>> tree = MerkleTree(thing)
+        >>> tree.hexdigest() == MerkleTree({
+        ...     'hdatum': [{'id': 1}], 'hsilo': {'nomen': 'test'}}).hexdigest()
+        True
+        >>> old = tree.hexdigest()
+        >>> tree.update(('hdatum', 0, 'id'), 2)
+        >>> thing['hdatum'][0]
+        {'id': 2}
+        >>> tree.hexdigest() == MerkleTree(thing).hexdigest() != old
+        True
+        >>> proof = tree.get_proof(('hdatum', 0))
+        >>> verify_merkle_proof(tree.hexdigest(), {'id': 2}, proof)
+        True
+        >>> verify_merkle_proof(tree.hexdigest(), {'id': 3}, proof)
+        False
+        >>> verify_merkle_proof(tree.hexdigest(), 'test',
+        ...                     tree.get_proof(('hsilo', 'nomen')))
+        True
+    """
+
+    def __init__(self, thing: Union[dict, list]):
+        self.thing = thing
+        self._root = self._build(thing)
+
+    @staticmethod
+    def _leaf(value) -> bytes:
+        # JSON has no raw new lines, so '\n' ends the value
+        return get_hashable_json(value).encode('utf-8') + b'\n'
+
+    @staticmethod
+    def _part(child) -> bytes:
+        """What an child (leaf or node) adds to the hash of the parent"""
+        if isinstance(child, bytes):
+            return child
+        return _MERKLE_NODE + child[0]
+
+    @staticmethod
+    def _hash_node(children: Union[dict, list]) -> bytes:
+        # Same as _part(), inline (this is most of the time of an update)
+        if isinstance(children, dict):
+            # Sorted as str, like the keys of get_proof. Keys as JSON strings
+            # are self-delimiting
+            data = _MERKLE_DICT + b''.join([
+                get_hashable_json(str(key)).encode('utf-8') + (
+                    child if isinstance(child, bytes)
+                    else _MERKLE_NODE + child[0])
+                for key, child in sorted(children.items(),
+                                         key=lambda item: str(item[0]))])
+        else:
+            data = _MERKLE_LIST + b''.join([
+                child if isinstance(child, bytes) else _MERKLE_NODE + child[0]
+                for child in children])
+        return blake2b(data, digest_size=32).digest()
+
+    @classmethod
+    def _build(cls, thing):
+        """Leafs are _leaf() and nodes (dicts, lists) are [digest, children]
+        with children as an dict or list"""
+        if not isinstance(thing, (dict, list, tuple)):
+            return cls._leaf(thing)
+
+        # Iterative; nodes are hashed after, children before parents
+        root = [None, None]
+        stack = [(thing, root)]
+        nodes = []
+        while stack:
+            item, node = stack.pop()
+            nodes.append(node)
+            if isinstance(item, dict):
+                children = node[1] = dict.fromkeys(item)
+                pending = item.items()
+            else:
+                children = node[1] = [None] * len(item)
+                pending = enumerate(item)
+            for key, value in pending:
+                if isinstance(value, (dict, list, tuple)):
+                    children[key] = [None, None]
+                    stack.append((value, children[key]))
+                else:
+                    children[key] = cls._leaf(value)
+        for node in reversed(nodes):
+            node[0] = cls._hash_node(node[1])
+        return root
+
+    @classmethod
+    def _digest(cls, child) -> bytes:
+        if isinstance(child, bytes):
+            return blake2b(_MERKLE_LEAF + child, digest_size=32).digest()
+        return child[0]
+
+    def digest(self) -> bytes:
+        return self._digest(self._root)
+
+    def hexdigest(self) -> str:
+        return self.digest().hex()
+
+    def _get_path(self, path: tuple) -> list:
+        """List of (item, node) from the root to the parent of path[-1]"""
+        result = [(self.thing, self._root)]
+        for key in path[:-1]:
+            item, node = result[-1]
+            result.append((item[key], node[1][key]))
+        return result
+
+    def get_digest(self, path: tuple = ()) -> str:
+        """Hex digest of the subtree on path (like ('hdatum', 0)), the same
+        as MerkleTree(subtree).hexdigest()"""
+        if not path:
+            return self.hexdigest()
+        node = self._get_path(path)[-1][1]
+        return self._digest(node[1][path[-1]]).hex()
+
+    def get_proof(self, path: tuple) -> list:
+        """What is needed to verify the subtree on path with the root digest
+
+        Returns:
+            list: one [key, {sibling key: hex}] (for dicts) or
+                  [index, [hex, ...]] (for lists) per level, from the
+                  subtree to the root. JSON serializable
+        """
+        proof = []
+        for (_, node), key in zip(self._get_path(path), path):
+            if isinstance(node[1], dict):
+                siblings = {str(sibling): self._part(child).hex()
+                            for sibling, child in node[1].items()
+                            if sibling != key}
+            else:
+                siblings = [self._part(child).hex() for child in node[1]]
+                siblings[key] = None
+            proof.append([key, siblings])
+        proof.reverse()
+        return proof
+
+    def update(self, path: tuple, value):
+        """Set thing[path[0]][path[1]]...[path[-1]] = value
+
+        Only value and the nodes on the path are hashed again.
+        """
+        if not path:
+            self.thing = value
+            self._root = self._build(value)
+            return
+        parents = self._get_path(path)
+        item, node = parents[-1]
+        item[path[-1]] = value
+        node[1][path[-1]] = self._build(value)
+        for _, node in reversed(parents):
+            node[0] = self._hash_node(node[1])
+
+
+def verify_merkle_proof(root_hexdigest: str,
+                        subtree: Union[dict, list, str],
+                        proof: list) -> bool:
+    """Verify an subtree with the root digest of an MerkleTree and the
+    MerkleTree.get_proof() of the path of the subtree
+
+    Args:
+        root_hexdigest (str): MerkleTree.hexdigest() of the entire document
+        subtree (Union[dict, list, str]): the part to verify
+        proof (list): MerkleTree.get_proof()
+
+    Returns:
+        bool: True if subtree is part of the document, on the same path
+    """
+    if not proof:
+        return MerkleTree(subtree).hexdigest() == root_hexdigest
+
+    part = MerkleTree._part(MerkleTree._build(subtree))
+    for key, siblings in proof:
+        if isinstance(siblings, dict):
+            children = {sibling: bytes.fromhex(child)
+                        for sibling, child in siblings.items()}
+            children[str(key)] = part
+        else:
+            children = [bytes.fromhex(child) if child is not None else part
+                        for child in siblings]
+        digest = MerkleTree._hash_node(children)
+        part = _MERKLE_NODE + digest
+    return digest.hex() == root_hexdigest
+
+
+def iter_hashable_json(thing: Union[dict, list],
+                       sort_keys: bool = True,
+                       max_depth: int = 2) -> Iterator[str]:
+    """Same as get_hashable_json(thing, sort_keys), in parts
+
+    The first max_depth levels are walked here and each value below is
+    serialized alone (by the C encoder of the json module), so the memory
+    used is about the size of the biggest of these values, not the entire
+    result.
+
+    Args:
+        thing (Union[dict, list]): Input source
+        sort_keys (bool): See get_hashable_json. Defaults to True
+        max_depth (int): Levels walked before serializing an value at once.
+                         Defaults to 2
+
+    Yields:
+        str: parts of get_hashable_json(thing, sort_keys)
+
+    Examples:
+        >>> thing = {'b': [1, {'d': None, 'c': 1.5}], 'a': 'α', 'e': {}}
+        >>> list(iter_hashable_json(thing, max_depth=1))[:4]
+        ['{"a": ', '"α"', ', "b": ', '[1, {"c": 1.5, "d": null}]']
+        >>> ''.join(iter_hashable_json(thing)) == get_hashable_json(thing)
+        True
+        >>> ''.join(iter_hashable_json({2: 'b', 1: 'a'}))
+        '{"1": "a", "2": "b"}'
+    """
+    encoder = _JSON_ENCODER_SORTED if sort_keys else _JSON_ENCODER
+
+    if max_depth <= 0 or not thing:
+        yield encoder.encode(thing)
+    elif isinstance(thing, dict):
+        if not all(isinstance(key, str) for key in thing):
+            # The encoder converts and sorts these keys; just use it
+            yield encoder.encode(thing)
+            return
+        separator = '{'
+        for key, value in (sorted(thing.items()) if sort_keys
+                           else thing.items()):
+            yield separator + encoder.encode(key) + ': '
+            yield from iter_hashable_json(value, sort_keys, max_depth - 1)
+            separator = ', '
+        yield '}'
+    elif isinstance(thing, (list, tuple)):
+        separator = '['
+        for value in thing:
+            yield separator
+            yield from iter_hashable_json(value, sort_keys, max_depth - 1)
+            separator = ', '
+        yield ']'
+    else:
+        yield encoder.encode(thing)
 
 
 def is_json_string(thing: str) -> Union[bool, str]:
@@ -295,7 +724,28 @@ def is_json_string(thing: str) -> Union[bool, str]:
 
     Returns:
         Union[bool, str]: Either False (not JSON-like input) or the result
+
+    Examples:
+        >>> is_json_string('[1, 2]')
+        [1, 2]
+        >>> is_json_string('test string')
+        False
+        >>> is_json_string(' true ')
+        True
     """
+    # Most strings are not JSON: check the first character (cheap) before
+    # json.loads (that would raise an exception)
+    start = 0
+    while start < len(thing) and thing[start] in _JSON_WHITESPACE:
+        start += 1
+    if thing[start:start + 1] not in _JSON_START:
+        for word in _JSON_WORDS:
+            if thing.startswith(word, start):
+                break
+        else:
+            return False
+        if thing[start + len(word):].strip(_JSON_WHITESPACE):
+            return False
     try:
         json_object = json.loads(thing)
         return json_object
@@ -0,0 +1,97 @@
+"""hxlm.core.internal.metrics is a lightweight timing/counter collector
+
+Meant to be used by the hxlm command line tools to explain where the time
+goes (like `urnresolver --metricae`). When disabled, the cost is one
+time.perf_counter() call per timer.
+
+    >>> metrics = Metrics()
+    >>> with metrics.timer('load', 'urn.yml'):
+    ...     pass
+    >>> metrics.add('load', 'urn.yml', 'entries', value=10)
+    >>> metrics.add('cache', 'hit')
+    >>> metrics.add('cache', 'hit')
+    >>> metrics.data['load']['urn.yml']['entries']
+    10
+    >>> metrics.data['load']['urn.yml']['seconds'] >= 0
+    True
+    >>> metrics.data['cache']
+    {'hit': 2}
+    >>> Metrics(enabled=False).data
+    {}
+
+Author: 2021, Emerson Rocha (Etica.AI) <rocha@ieee.org>
+License: Public Domain / BSD Zero Clause License
+SPDX-License-Identifier: Unlicense OR 0BSD
+"""
+
+from contextlib import contextmanager
+import json
+import sys
+import threading
+import time
+
+__all__ = ['Metrics']
+
+
+class Metrics:
+    """Nested dict of timings (seconds) and counters, thread-safe
+
+    Keys are paths (like ('sources', 'urn.yml', 'seconds')). Timers and
+    add() sum values already there, so the same key can be measured more
+    than once (like one lookup per URN).
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.data = {}
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return self.enabled
+
+    def _parent(self, path: tuple) -> dict:
+        node = self.data
+        for key in path[:-1]:
+            node = node.setdefault(str(key), {})
+        return node
+
+    def add(self, *path, value=1):
+        """Sum value (default 1, an counter) to path"""
+        if not self.enabled:
+            return
+        with self._lock:
+            parent = self._parent(path)
+            parent[str(path[-1])] = parent.get(str(path[-1]), 0) + value
+
+    def set(self, *path, value=None):
+        """Replace the value of path (anything JSON serializable)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._parent(path)[str(path[-1])] = value
+
+    @contextmanager
+    def timer(self, *path):
+        """Context manager that sums elapsed seconds to path + ('seconds',)
+        """
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            if self.enabled:
+                self.add(*path, 'seconds',
+                         value=time.perf_counter() - start)
+
+    def to_json(self) -> str:
+        with self._lock:
+            return json.dumps(self.data, indent=4, sort_keys=False)
+
+    def write(self, target: str = '-', stderr=None):
+        """Write as JSON to an file or, if target is '-', to stderr"""
+        if not self.enabled:
+            return
+        if not target or target == '-':
+            (stderr or sys.stderr).write(self.to_json() + "\n")
+            return
+        with open(target, 'w') as metrics_file:
+            metrics_file.write(self.to_json() + "\n")
@@ -3,11 +3,70 @@
 (draft) module to deal with caching, at least the ones related with the
 python requests-cache, but could be extended to others
 
+Parsed YAML files (like ontologia/core.vkg.yml, core.lkg.yml and user
+.hdp.yml files) are cached on disk, keyed by the hash of the content, so
+other processes do not need to parse the same YAML again.
+
+    >>> import tempfile
+    >>> cache_dir = tempfile.mkdtemp()
+    >>> yml_file = cache_dir + '/test.hdp.yml'
+    >>> with open(yml_file, 'w') as test_file:
+    ...     _ = test_file.write('- hsilo:\\n    nomen: test\\n')
+    >>> load_yaml_file(yml_file, cache_dir=cache_dir)
+    [{'hsilo': {'nomen': 'test'}}]
+    >>> len(os.listdir(cache_dir + '/yaml'))
+    1
+    >>> load_yaml_file(yml_file, cache_dir=cache_dir)
+    [{'hsilo': {'nomen': 'test'}}]
+
+The cache keep at most HXLM_CACHE_YAML_LIMITEM files; the least recently
+used ones are removed when new ones are written
+
+    >>> for idx in range(5):
+    ...     with open(yml_file, 'w') as test_file:
+    ...         _ = test_file.write('- hsilo:\\n    nomen: ' + str(idx))
+    ...     _ = load_yaml_file(yml_file, cache_dir=cache_dir, limitem=3)
+    >>> len(os.listdir(cache_dir + '/yaml'))
+    3
+
 Author: 2021, Emerson Rocha (Etica.AI) <rocha@ieee.org>
 License: Public Domain / BSD Zero Clause License
 SPDX-License-Identifier: Unlicense OR 0BSD
 """
 
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from pathlib import Path
+
+from typing import (
+    Union
+)
+
+import yaml
+
+__all__ = ['load_yaml', 'load_yaml_file', 'HXLM_CACHE_DIR',
+           'HXLM_CACHE_YAML_LIMITEM', 'YAML_SAFE_LOADER']
+
+YAML_SAFE_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+"""yaml.CSafeLoader (libyaml, about 10x faster) if available, or the pure
+python yaml.SafeLoader. Both return the same result"""
+
+HXLM_CACHE_DIR = os.getenv(
+    'HXLM_CACHE_DIR', str(Path.home()) + '/.cache/hxlm')
+"""Base directory of on disk caches. An empty HXLM_CACHE_DIR environment
+variable disable the disk cache"""
+
+HXLM_CACHE_YAML_LIMITEM = int(os.getenv('HXLM_CACHE_YAML_LIMITEM', '128'))
+"""Maximum number of parsed YAML files kept on HXLM_CACHE_DIR/yaml. The
+least recently used ones are removed first"""
+
+# The pickle protocol may change between python versions
+_YAML_CACHE_SUFFIX = '.{0}.py{1}{2}.pickle'.format(
+    YAML_SAFE_LOADER.__name__, *sys.version_info[:2])
+
 # TODO: like libhxl-python, also implement
 #       https://pypi.org/project/requests-cache/
 #       https://github.com/reclosedev/requests-cache/tree/master/examples
@@ -16,3 +75,102 @@ SPDX-License-Identifier: Unlicense OR 0BSD
 
 # TODO: see also these general-propose caches (non-HTTP specific)
 #       https://github.com/grantjenks/python-diskcache
+
+
+def load_yaml(stream) -> Union[dict, list]:
+    """yaml.safe_load, but with YAML_SAFE_LOADER (libyaml when available)
+
+    Args:
+        stream (Union[str, bytes, file object]): The YAML
+
+    Returns:
+        Union[dict, list]: The parsed YAML
+
+    >>> load_yaml('hsilo: {tag: [test]}')
+    {'hsilo': {'tag': ['test']}}
+    """
+    return yaml.load(stream, Loader=YAML_SAFE_LOADER)
+
+
+def _prune_yaml_cache(cache_dir: str, limitem: int, cache_file: str):
+    """Remove the least recently used (by mtime) files of cache_dir, except
+    cache_file, so it keep at most limitem files. Errors (like other
+    process removing the same file) are ignored"""
+    try:
+        with os.scandir(cache_dir) as entries:
+            cached = [(entry.stat().st_mtime, entry.path)
+                      for entry in entries
+                      if entry.name.endswith('.pickle') and
+                      entry.path != cache_file]
+    except OSError:
+        return
+    if len(cached) < limitem:
+        return
+    for _mtime, path in sorted(cached)[:len(cached) - max(limitem - 1, 0)]:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def load_yaml_file(file_path: str,
+                   cache_dir: str = None,
+                   limitem: int = None) -> Union[dict, list]:
+    """Load an local YAML file, with on disk cache of the parsed result
+
+    The cache is keyed by the sha256 of the content of the file (so any
+    change to the file is a cache miss) and is written atomically. Any
+    error reading or writing the cache fall back to load_yaml. Since cache
+    files are unpickled, cache_dir must not be writable by others. Cache
+    hits update the mtime, so the least recently used files are removed
+    when there is more than limitem files.
+
+    Args:
+        file_path (str): Path to the YAML file
+        cache_dir (str, optional): Base directory of the cache. Defaults to
+                    HXLM_CACHE_DIR. An empty value disable the disk cache
+        limitem (int, optional): Maximum number of cached files. Defaults
+                    to HXLM_CACHE_YAML_LIMITEM
+
+    Returns:
+        Union[dict, list]: The parsed YAML
+    """
+    with open(file_path, 'rb') as yml_file:
+        content = yml_file.read()
+
+    cache_dir = HXLM_CACHE_DIR if cache_dir is None else cache_dir
+    if not cache_dir:
+        return load_yaml(content)
+
+    cache_dir = os.path.join(cache_dir, 'yaml')
+    cache_file = os.path.join(
+        cache_dir, hashlib.sha256(content).hexdigest() + _YAML_CACHE_SUFFIX)
+    try:
+        with open(cache_file, 'rb') as cached:
+            result = pickle.load(cached)
+        try:
+            os.utime(cache_file)
+        except OSError:
+            pass
+        return result
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        pass
+
+    result = load_yaml(content)
+    cache_tmp = None
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        # NamedTemporaryFile is 0600, so the cache is private
+        with tempfile.NamedTemporaryFile(
+                'wb', dir=cache_dir, delete=False) as cache_tmp:
+            pickle.dump(result, cache_tmp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(cache_tmp.name, cache_file)
+    except (OSError, pickle.PicklingError):
+        if cache_tmp is not None and os.path.exists(cache_tmp.name):
+            os.unlink(cache_tmp.name)
+        return result
+
+    _prune_yaml_cache(
+        cache_dir, HXLM_CACHE_YAML_LIMITEM if limitem is None else limitem,
+        cache_file)
+    return result
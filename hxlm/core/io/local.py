@@ -20,8 +20,10 @@ import pathlib
 
 import json
 import csv
-import yaml
 
+from hxlm.core.io.cache import (
+    load_yaml_file
+)
 from hxlm.core.io.util import (
     strip_file_protocol
 )
@@ -134,11 +136,12 @@ def load_file(file_path: str, delimiter: str = ',') -> Union[dict, list]:
     file_path = strip_file_protocol(file_path)
     norm_path = os.path.normpath(file_path)
 
+    if norm_path.endswith('.yml'):
+        return load_yaml_file(norm_path)
+
     with open(norm_path, 'r') as stream:
         if norm_path.endswith('.json'):
             return json.load(stream)
-        if norm_path.endswith('.yml'):
-            return yaml.safe_load(stream)
         if norm_path.endswith('.csv'):
             reader = csv.reader(stream, delimiter=delimiter)
             result = []
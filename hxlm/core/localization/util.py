@@ -29,7 +29,9 @@ import os
 #     Any
 # )
 
-import yaml
+from hxlm.core.io.cache import (
+    load_yaml_file
+)
 
 from hxlm.ontologia.python.commune import (
     Factum
@@ -371,9 +373,7 @@ def get_localization_knowledge_graph(
         dict: an HDP localization knowledge graph dict
     """
 
-    with open(path, 'r') as openfile:
-        data = yaml.safe_load(openfile)
-        return data
+    return load_yaml_file(path)
 
 
 @lru_cache(maxsize=1)
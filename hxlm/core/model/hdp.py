@@ -14,6 +14,7 @@ SPDX-License-Identifier: Unlicense OR 0BSD
 
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from urllib.request import urlopen
 
 from typing import (
@@ -39,9 +40,56 @@ from hxlm.core.schema.vocab import (
     HVocabHelper
 )
 
+from hxlm.core.hdp.hazmat.policy import (
+    is_not_acceptable_load_this
+)
+
+from hxlm.core.io.cache import (
+    load_yaml,
+    load_yaml_file
+)
+
+from hxlm.ontologia.python.hdp.aux import (
+    AuxLoadPolicy
+)
+
 
 __all__ = ['HDP']
 
+HDP_PROCESSUS_MINIMUM_FILES = 16
+"""Directories with fewer HDP files than this are loaded without an process
+pool (starting the pool would take more time than parse the files)"""
+
+
+def _load_local_file(file_path: str, policy: AuxLoadPolicy = None) -> Tuple:
+    """Parse one local HDP file (JSON or YAML), after the policy check
+
+    Top level function, so it can run on an process pool.
+
+    Args:
+        file_path (str): Path to the file
+        policy (AuxLoadPolicy, optional): Policy to check the file against.
+                                          Defaults to None (no check)
+
+    Returns:
+        Tuple: (file_path, parsed, not_acceptable). parsed is None if the
+               file is not acceptable (not_acceptable have the reason) or
+               not an HDP file
+    """
+    if policy is not None:
+        not_acceptable = is_not_acceptable_load_this(
+            'file://' + os.path.abspath(file_path), policy)
+        if not_acceptable:
+            return (file_path, None, not_acceptable)
+
+    if file_path.endswith(HDP.HDP_JSON_EXTENSIONS):
+        with open(file_path, mode="r") as filestring:
+            return (file_path, json.load(filestring), False)
+    if file_path.endswith(HDP.HDP_YML_EXTENSIONS):
+        return (file_path, load_yaml_file(file_path), False)
+
+    return (file_path, None, False)
+
 
 class HDP:
     """Class used by HDP Declarative Programming Command Line Interface
@@ -61,6 +109,15 @@ class HDP:
     # _hdp_raw: Union[str, dict] = None
     _hdp_raw: List = []
 
+    _policy: AuxLoadPolicy = None
+    """Policy to check local files against before load. Defaults to None
+    (no checks)"""
+
+    _processus: int = 1
+    """Number of processes to load directories. Defaults to 1 (no process
+    pool; the caller needs an `if __name__ == '__main__'` guard on spawn
+    platforms and an picklable policy to use more)"""
+
     _online_unrestricted_init: bool = False
     """For requests that implicitly ask for not-only localhost data, should
     we implicitly initiate HDP?
@@ -143,16 +200,34 @@ class HDP:
                  safer_zone_hosts: Tuple = None,
                  safer_zone_list: Tuple = None,
                  fontem_linguam: str = None,
-                 debug: bool = False
+                 debug: bool = False,
+                 vocab: dict = None,
+                 policy: AuxLoadPolicy = None,
+                 processus: int = 1
                  ):
         """
         Constructs all the necessary attributes for the HDP object.
+
+        vocab (optional) is an ItemHVocab().to_dict() already parsed, to be
+        shared (read-only) by many HDP objects, like hdpcli
+        --transpose-multiplum does.
+
+        policy (optional) is checked (is_not_acceptable_load_this) before
+        load each local file of an directory. processus (optional) is the
+        number of processes used to parse directories. Defaults to 1 (no
+        pool), since an process pool needs an `if __name__ == '__main__'`
+        guard on spawn platforms and an picklable policy; hdpcli enable it.
         """
 
         self._debug = debug
+        self._policy = policy
+        self._processus = processus
         self._fontem_linguam = fontem_linguam
         self._online_unrestricted_init = online_unrestricted_init
-        self._vocab = ItemHVocab().to_dict()
+        # Per object, not the (shared, mutable) class attributes
+        self._hdp = {}
+        self._hdp_raw = []
+        self._vocab = vocab if vocab is not None else ItemHVocab().to_dict()
         # self._vocab = ItemHVocab().to_dict()
 
         self._VHelper = HVocabHelper(self._vocab, debug=debug)
@@ -659,8 +734,29 @@ class HDP:
 
         result_files_sorted = sorted(result_files)
 
-        for filepath in result_files_sorted:
-            if not self._prepare_from_local_file(filepath):
+        # Files are parsed (and checked against the policy) on an process
+        # pool, but merged on self._hdp in sorted order, one at time, so the
+        # result is the same as without the pool
+        processus = self._processus or 1
+        if processus > 1 and \
+                len(result_files_sorted) >= HDP_PROCESSUS_MINIMUM_FILES:
+            with ProcessPoolExecutor(max_workers=processus) as executor:
+                chunksize = max(1, len(result_files_sorted) // (processus * 4))
+                results = list(executor.map(
+                    _load_local_file, result_files_sorted,
+                    [self._policy] * len(result_files_sorted),
+                    chunksize=chunksize))
+        else:
+            results = [_load_local_file(filepath, self._policy)
+                       for filepath in result_files_sorted]
+
+        for filepath, parsed, not_acceptable in results:
+            if not_acceptable and self._debug:
+                print('_prepare_from_local_directory ¬ policy',
+                      str(filepath), not_acceptable)
+            if parsed is None or not self._update(
+                    parsed, domain_base='local',
+                    container_base=os.path.split(filepath)[1]):
                 if self._debug:
                     print('ERROR', str(filepath))
                 result_status = False
@@ -677,20 +773,12 @@ class HDP:
             print('HDP._prepare_from_local_file os.path.split [1]',
                   os.path.split(file_path)[1])
 
-        domain_base = 'local'
-        container_base = os.path.split(file_path)[1]
-
-        with open(file_path, mode="r") as filestring:
-            if file_path.endswith(self.HDP_JSON_EXTENSIONS):
-                return self._prepare_from_string(json_string=filestring,
-                                                 domain_base=domain_base,
-                                                 container_base=container_base)
-            if file_path.endswith(self.HDP_YML_EXTENSIONS):
-                return self._prepare_from_string(yml_string=filestring,
-                                                 domain_base=domain_base,
-                                                 container_base=container_base)
+        parsed = _load_local_file(file_path)[1]
+        if parsed is None:
+            return False
 
-        return False
+        return self._update(parsed, domain_base='local',
+                            container_base=os.path.split(file_path)[1])
 
     def _prepare_from_remote_iri(self, iri: str, is_startup: bool = False):
         if self._debug:
@@ -732,7 +820,7 @@ class HDP:
             # self._hdp_raw = yml_string
             # self._hdp = yaml.safe_load(yml_string)
             # return True
-            parsed = yaml.safe_load(yml_string)
+            parsed = load_yaml(yml_string)
             return self._update(parsed,
                                 domain_base=domain_base,
                                 container_base=container_base)
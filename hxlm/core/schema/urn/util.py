@@ -3,10 +3,20 @@
 
 import os
 import csv
+import hashlib
 import json
+import marshal
+import re
+import string
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-# from urllib.parse import urlparse
-# import requests
+from urllib.parse import urlparse
+import requests
 
 # import glob
 
@@ -49,6 +59,36 @@ HXLM_DATA_URN_EXTENSIONS = ('urn.csv', 'urn.tsv',
                             'urn.json', 'urn.yml', 'urn.txt')
 """HXLM_DATA_URN_EXTENSIONS Must be a python truple"""
 
+HXLM_DATA_URN_REWRITE_EXTENSIONS = ('urn.naptr.yml', 'urn.naptr.json')
+"""HXLM_DATA_URN_REWRITE_EXTENSIONS files with DDDS/NAPTR-style rewrite
+rules (see URNRewriteRules). Must be a python truple"""
+
+HXLM_URN_REMOTE_CACHE = os.getenv(
+    'HXLM_URN_REMOTE_CACHE', _HOME + '/.cache/hxlm/urn/')
+"""HXLM_URN_REMOTE_CACHE folder of the remote URN lists already downloaded
+(see get_urn_resolver_remote). It is a cache: can be removed at any time"""
+
+HXLM_URN_REMOTE_TTL = int(os.getenv('HXLM_URN_REMOTE_TTL', '3600'))
+"""HXLM_URN_REMOTE_TTL seconds an remote URN list is used without checking
+if it changed on the server"""
+
+HXLM_URN_REMOTE_STALE = int(os.getenv('HXLM_URN_REMOTE_STALE', '86400'))
+"""HXLM_URN_REMOTE_STALE seconds after HXLM_URN_REMOTE_TTL an remote URN
+list is still used while revalidated in background (stale-while-revalidate).
+Remote lists are also used, no matter how old, if the server is offline"""
+
+HXLM_URN_REMOTE_TIMEOUT = float(os.getenv('HXLM_URN_REMOTE_TIMEOUT', '10'))
+"""HXLM_URN_REMOTE_TIMEOUT seconds to wait for an remote URN list"""
+
+HXLM_URN_INDEX = os.getenv(
+    'HXLM_URN_INDEX', _HOME + '/.cache/hxlm/urnresolver.index')
+"""HXLM_URN_INDEX default file of compiled URN index (urnresolver
+--urn-index-compile). It is a cache: can be removed at any time"""
+
+HXLM_URN_INDEX_VERSION = 1
+"""HXLM_URN_INDEX_VERSION change this if the compiled index format changes
+(older files are then ignored, as if they were stale)"""
+
 HXLM_DATA_URN_EXTENSIONS_ENCRYPTED = (
     'urn.csv.enc', 'urn.csv.gpg',
     'urn.tsv.enc', 'urn.tsv.gpg',
@@ -232,16 +272,9 @@ def get_urn_resolver_from_any(filepath: str,
                               required: bool = False,
                               filetype: str = '') -> List[dict]:
 
-    if filetype == '.csv' or filepath.endswith('.csv'):
-        return get_urn_resolver_from_csv(filepath)
-    elif filetype == '.tsv' or filepath.endswith('.tsv'):
-        return get_urn_resolver_from_csv(filepath, '\t')
-    elif filetype == '.txt' or filepath.endswith('.txt'):
-        return get_urn_resolver_from_csv(filepath, ':')
-    elif filetype == '.json' or filepath.endswith('.json'):
-        return get_urn_resolver_from_json(filepath)
-    elif filetype == '.yml' or filepath.endswith('.yml'):
-        return get_urn_resolver_from_yml(filepath)
+    loader = _get_urn_resolver_loader(filetype or filepath)
+    if loader is not None:
+        return loader(filepath)
     elif required:
         raise RuntimeError(
             'local_file_or_path [' + filepath + '] not found')
@@ -249,10 +282,97 @@ def get_urn_resolver_from_any(filepath: str,
         return None
 
 
+def _get_urn_resolver_loader(filepath_or_filetype: str):
+    """Parser of an URN list by the file extension (or None)
+
+    >>> _get_urn_resolver_loader('un.urn.tsv').keywords
+    {'delimiter': '\\t'}
+    >>> _get_urn_resolver_loader('.yml').__name__
+    'get_urn_resolver_from_yml'
+    >>> _get_urn_resolver_loader('un.urn.xlsx')
+    """
+    return _URN_RESOLVER_LOADERS.get(
+        os.path.splitext(filepath_or_filetype)[1] or filepath_or_filetype)
+
+
+_URN_RESOLVER_LOADERS = {
+    '.csv': get_urn_resolver_from_csv,
+    '.tsv': partial(get_urn_resolver_from_csv, delimiter='\t'),
+    '.txt': partial(get_urn_resolver_from_csv, delimiter=':'),
+    '.json': get_urn_resolver_from_json,
+    '.yml': get_urn_resolver_from_yml,
+}
+
+
+def get_urn_resolver_local_files(
+        basepath: str,
+        extensions: tuple = HXLM_DATA_URN_EXTENSIONS) -> List[str]:
+    """List files of an folder that may be used as URN index
+
+    Not recursive, one os.scandir() pass (directory order). Files starting
+    with ~ are skipped and only the ones ending with extensions are
+    returned.
+
+    Args:
+        basepath (str): Local folder
+        extensions (tuple): Defaults to HXLM_DATA_URN_EXTENSIONS
+
+    Returns:
+        List[str]: full path of each file
+    """
+    result_files = []
+    with os.scandir(basepath) as entries:
+        for entry in entries:
+            if entry.name.startswith('~'):
+                if _VERBOSE:
+                    print('get_urn_resolver_local skiping ', entry.path)
+                continue
+            if entry.name.endswith(extensions) and entry.is_file():
+                result_files.append(entry.path)
+    return result_files
+
+
+def _get_urn_resolver_local_sources(
+        local_files_or_paths: List[str]) -> List[str]:
+    """Files (in order) of local URN lists, folders expanded"""
+    result_files = []
+    for file_or_path in local_files_or_paths:
+        if os.path.isdir(file_or_path):
+            result_files.extend(get_urn_resolver_local_files(file_or_path))
+        elif os.path.isfile(file_or_path) and \
+                not file_or_path.endswith(HXLM_DATA_URN_REWRITE_EXTENSIONS):
+            result_files.append(file_or_path)
+    return result_files
+
+
+def _get_urn_resolver_local_files_map(func, filepaths: List[str]):
+    """Iterator of func(filepath), loaded in parallel but in order
+
+    The remaining files are cancelled if the consumer stops early.
+    """
+    if len(filepaths) < 2:
+        for filepath in filepaths:
+            yield func(filepath)
+        return
+    executor = ThreadPoolExecutor(min(8, len(filepaths)))
+    futures = []
+    try:
+        futures = [executor.submit(func, filepath) for filepath in filepaths]
+        for future in futures:
+            yield future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
 def get_urn_resolver_local(local_file_or_path: str,
                            required: bool = False) -> List[str]:
     """From an exact local file or an folder, return URN resolver dictionary
 
+    Files of an folder are loaded in parallel; the result keeps the
+    folder (os.scandir) order.
+
     Args:
         local_file_or_path (str): Local file on disk or an folder to search
                                   (not recursive search)
@@ -264,10 +384,9 @@ def get_urn_resolver_local(local_file_or_path: str,
     Returns:
         List[str]: [description]
     """
-    result_files = []
-    if Path(local_file_or_path).is_dir():
+    if os.path.isdir(local_file_or_path):
         basepath = local_file_or_path
-    elif Path(local_file_or_path).is_file():
+    elif os.path.isfile(local_file_or_path):
         # result_files.append(Path(local_file_or_path).read_text())
         # return result_files
         return get_urn_resolver_from_any(local_file_or_path)
@@ -278,52 +397,12 @@ def get_urn_resolver_local(local_file_or_path: str,
         # print('get_urn_resolver_local', local_file_or_path)
         return None
 
-    # pitr = Path(basepath)
-    pitr = Path(basepath).glob('*')
-    # result_files_ = []
-    for file_ in pitr:
-        # print('file_', file_)
-        # print('file_ start ~', str(file_.name).startswith('~'))
-        # print('file_ ends with csv', str(file_).endswith('.csv'))
-        # print('file_ ends with HXLM_DATA_URN_EXTENSIONS',
-        #       str(file_).endswith(HXLM_DATA_URN_EXTENSIONS))
-        if str(file_.name).startswith('~'):
-            if _VERBOSE:
-                print('get_urn_resolver_local skiping ', str(file_))
-            continue
-        if str(file_.name).endswith(HXLM_DATA_URN_EXTENSIONS):
-            result_files.append(str(file_))
+    result_files = get_urn_resolver_local_files(basepath)
 
-    # print('result_files', result_files)
-    # print('sorted result_files', sorted(result_files))
     urn_rules_all = []
-    for filepath in result_files:
-
-        if filepath.endswith('.csv'):
-            urn_rules_all.extend(get_urn_resolver_from_csv(filepath))
-        elif filepath.endswith('.tsv'):
-            urn_rules_all.extend(get_urn_resolver_from_csv(filepath, '\t'))
-        elif filepath.endswith('.txt'):
-            # print('')
-            # print('txt')
-            # print('')
-            urn_rules_all.extend(get_urn_resolver_from_csv(filepath, ':'))
-        elif filepath.endswith('.json'):
-            urn_rules_all.extend(get_urn_resolver_from_json(filepath))
-        elif filepath.endswith('.yml'):
-            urn_rules_all.extend(get_urn_resolver_from_yml(filepath))
-
-    # print('')
-    # print('')
-    # print('')
-    # print('')
-    # print('')
-    # print('urn_rules_all', urn_rules_all)
-    # print('')
-    # print('')
-    # print('')
-    # print('')
-    # print('')
+    for urn_rules in _get_urn_resolver_local_files_map(
+            get_urn_resolver_from_any, result_files):
+        urn_rules_all.extend(urn_rules)
 
     if required and len(urn_rules_all) == 0:
         raise RuntimeError(
@@ -335,38 +414,810 @@ def get_urn_resolver_local(local_file_or_path: str,
     return urn_rules_all
 
 
+def find_urn_resolver_local(urn: str,
+                            local_files_or_paths: List[str]) -> dict:
+    """First rule of urn on local files or folders (same precedence of
+    merge_urn_resolvers over get_urn_resolver_local of each one)
+
+    Files are loaded in parallel, but an hit only waits for the files
+    before it: the remaining ones are not parsed.
+
+    Args:
+        urn (str): Exact URN
+        local_files_or_paths (List[str]): files or folders, in order
+
+    Returns:
+        dict: the URN rule, None if not found
+
+    >>> find_urn_resolver_local('urn:data:zz', ['/non/existent/'])
+    """
+    def _find(filepath: str):
+        for item in get_urn_resolver_from_any(filepath) or []:
+            if item['urn'] == urn:
+                return item
+        return None
+
+    for item in _get_urn_resolver_local_files_map(
+            _find, _get_urn_resolver_local_sources(local_files_or_paths)):
+        if item is not None:
+            return item
+    return None
+
+
+def _urn_rule_content(item: dict) -> dict:
+    return {key: value for key, value in item.items() if key != 'urnref'}
+
+
+def merge_urn_resolvers(urn_resolvers: List[List[dict]],
+                        conflicts: list = None) -> List[dict]:
+    """Merge lists of URN rules, keyed by URN. O(n)
+
+    The first list has precedence (urnresolver uses local, then
+    HXLM_CONFIG_BASE/urn/, then vendor defaults) and inside each list, the
+    first rule. Repeated rules are removed. If conflicts is a list, each
+    rule ignored that is not equal (except by urnref) to the one used is
+    reported on it as (urn, urnref used, urnref ignored).
+
+    Args:
+        urn_resolvers (List[List[dict]]): lists in order of precedence.
+                                          None items are ignored.
+        conflicts (list, optional): Output list of conflicting duplicates
+
+    Returns:
+        List[dict]: one rule per URN, by order of first appearance
+
+    >>> local = [{'urn': 'urn:data:zz:a', 'source': ['a.csv'],
+    ...           'urnref': 'local.urn.csv'}]
+    >>> vendor = [{'urn': 'urn:data:zz:a', 'source': ['b.csv'],
+    ...            'urnref': 'vendor.urn.csv'},
+    ...           {'urn': 'urn:data:zz:b', 'source': ['c.csv'],
+    ...            'urnref': 'vendor.urn.csv'}]
+    >>> conflicts = []
+    >>> [item['source'][0] for item in merge_urn_resolvers(
+    ...     [local, None, vendor], conflicts)]
+    ['a.csv', 'c.csv']
+    >>> conflicts
+    [('urn:data:zz:a', 'local.urn.csv', 'vendor.urn.csv')]
+    """
+    result = []
+    position = {}
+    for urn_rules in urn_resolvers:
+        if not urn_rules:
+            continue
+        for item in urn_rules:
+            urn = item['urn']
+            if urn not in position:
+                position[urn] = len(result)
+                result.append(item)
+            elif conflicts is not None:
+                used = result[position[urn]]
+                if used is not item and \
+                        _urn_rule_content(used) != _urn_rule_content(item):
+                    conflicts.append(
+                        (urn, used.get('urnref'), item.get('urnref')))
+    return result
+
+
+def get_urn_pattern_literals(pattern: str) -> tuple:
+    """Literal text that any match of an regex pattern must have
+
+    Conservative: an URN that does not start with the prefix or does not
+    contain every literal can be discarded before running the full regex.
+    Patterns with | return nothing and the scan stops on groups (these may
+    have flags or quantifiers). Escapes like \\d, \\x41 or \\101 (and the
+    hex/octal digits after them) and character classes end the literal.
+
+    Args:
+        pattern (str): python regex, as used by re.search
+
+    Returns:
+        tuple: (prefix, literals). prefix is only non empty for patterns
+               anchored with ^
+
+    >>> get_urn_pattern_literals('^urn:data:xz:hxl:.*hashtag$')
+    ('urn:data:xz:hxl:', ['urn:data:xz:hxl:', 'hashtag'])
+    >>> get_urn_pattern_literals('un:unece:?locode')
+    ('', ['un:unece', 'locode'])
+    >>> get_urn_pattern_literals('un|br')
+    ('', [])
+    >>> get_urn_pattern_literals('^urn:[^]]x')
+    ('urn:', ['urn:', 'x'])
+    """
+    if '|' in pattern:
+        return ('', [])
+
+    literals = []
+    run = ''
+    anchored = pattern.startswith('^')
+    prefix = None if anchored else ''
+    index = 1 if anchored else 0
+
+    def _end_run():
+        nonlocal run, prefix
+        if prefix is None:
+            prefix = run
+        if run:
+            literals.append(run)
+        run = ''
+
+    while index < len(pattern):
+        char = pattern[index]
+        if char == '(':
+            break
+        if char in '*?{':
+            # the last char is optional (or repeated zero times)
+            run = run[:-1]
+            _end_run()
+            if char == '{':
+                index = pattern.find('}', index)
+                if index == -1:
+                    break
+        elif char == '+':
+            _end_run()
+        elif char == '[':
+            _end_run()
+            # []] and [^]] have an literal ]; escaped \\] do not end it
+            index += 1
+            if pattern[index:index + 1] == '^':
+                index += 1
+            if pattern[index:index + 1] == ']':
+                index += 1
+            while index < len(pattern) and pattern[index] != ']':
+                index += 2 if pattern[index] == '\\' else 1
+            if index >= len(pattern):
+                break
+        elif char == '\\':
+            if index + 1 < len(pattern) and \
+                    not pattern[index + 1].isalnum():
+                run += pattern[index + 1]
+                index += 1
+            else:
+                # \\d, \\x41, \\u0041, \\101, \\1, \\N{...}: skip the escape
+                # and any hex/octal digits after it (at worst, some
+                # literal text is not used)
+                _end_run()
+                index += 1
+                if pattern[index:index + 2] == 'N{':
+                    index = pattern.find('}', index)
+                    if index == -1:
+                        break
+                else:
+                    while index + 1 < len(pattern) and \
+                            pattern[index + 1] in string.hexdigits:
+                        index += 1
+        elif char in '.^$)}':
+            _end_run()
+        else:
+            run += char
+        index += 1
+
+    # a pending run is only safe if the pattern was fully scanned and the
+    # next char is not a quantifier (handled above)
+    if index >= len(pattern):
+        _end_run()
+    elif run:
+        literals.append(run)
+        if prefix is None:
+            prefix = run
+
+    return (prefix or '', literals)
+
+
+class URNTrie:
+    """Trie of URN segments (split by :), to search URNs by prefix
+
+    Each URN has an value (urnresolver uses the position on the list of
+    rules). A prefix search is O(k) on the number of segments of the prefix
+    plus the size of the result.
+
+    >>> trie = URNTrie(['urn:data:xz:hxl:standard:core:hashtag',
+    ...                 'urn:data:un:locode',
+    ...                 'urn:data:xz:hxl:standard:core:attribute'])
+    >>> trie.prefix('urn:data:xz:hxl')
+    [0, 2]
+    >>> trie.prefix('urn:data:u')
+    [1]
+    >>> trie.prefix('urn:data:un:locode:')
+    []
+    >>> len(trie)
+    3
+    """
+
+    def __init__(self, urns: List[str] = None):
+        # Each node is a dict of segment -> node. Values are on key None
+        self._root = {}
+        self._size = 0
+        if urns:
+            for position, urn in enumerate(urns):
+                self.add(urn, position)
+
+    def __len__(self):
+        return self._size
+
+    def add(self, urn: str, value):
+        """Add an URN (and its value) to the trie"""
+        node = self._root
+        for segment in urn.split(':'):
+            node = node.setdefault(segment, {})
+        node.setdefault(None, []).append(value)
+        self._size += 1
+
+    def prefix(self, prefix: str) -> list:
+        """Values of URNs starting with prefix, sorted"""
+        segments = prefix.split(':')
+        node = self._root
+        for segment in segments[:-1]:
+            if segment not in node:
+                return []
+            node = node[segment]
+
+        partial = segments[-1]
+        stack = [child for segment, child in node.items()
+                 if segment is not None and segment.startswith(partial)]
+        result = []
+        while stack:
+            node = stack.pop()
+            for segment, child in node.items():
+                if segment is None:
+                    result.extend(child)
+                else:
+                    stack.append(child)
+        return sorted(result)
+
+
+def get_urn_index_signature(sources: List[str]) -> List[list]:
+    """Signature (path, mtime, size) of each source of an URN index
+
+    Folders are expanded (same rules as get_urn_resolver_local) and the
+    folder itself is also part of the signature, so adding or removing
+    files invalidates an compiled index.
+
+    Args:
+        sources (List[str]): files or folders, same order used to load
+
+    Returns:
+        List[list]: [path, st_mtime_ns, st_size], -1 if path does not exist
+
+    >>> get_urn_index_signature(['/non/existent/urn.yml'])
+    [['/non/existent/urn.yml', -1, -1]]
+    """
+    def _stat(path: str) -> list:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return [path, -1, -1]
+        return [path, stat.st_mtime_ns, stat.st_size]
+
+    signature = []
+    for source in sources:
+        signature.append(_stat(source))
+        if Path(source).is_dir():
+            for filepath in sorted(get_urn_resolver_local_files(
+                    source, HXLM_DATA_URN_EXTENSIONS +
+                    HXLM_DATA_URN_REWRITE_EXTENSIONS)):
+                signature.append(_stat(filepath))
+    return signature
+
+
+def get_urn_rule_fontem(item: dict) -> List[str]:
+    """Resources of an URN rule (urn.yml/urn.json use 'fontem', the
+    ones from CSV/TSV/TXT 'source')
+
+    >>> get_urn_rule_fontem({'urn': 'urn:data:zz', 'source': ['a']})
+    ['a']
+    """
+    if 'fontem' in item:
+        return item['fontem']
+    return item.get('source', [])
+
+
+def get_urn_rewrite_rules_local(local_file_or_path: str) -> List[dict]:
+    """From an exact local file or an folder, return URN rewrite rules
+
+    Files ending with HXLM_DATA_URN_REWRITE_EXTENSIONS (YAML or JSON) are
+    lists of rules, see URNRewriteRules. An file that is not an rule file
+    (like an ordinary urn.yml) returns an empty list.
+
+    Args:
+        local_file_or_path (str): Local file or an folder (not recursive)
+
+    Returns:
+        List[dict]: rules, with urnref
+    """
+    if Path(local_file_or_path).is_dir():
+        files = sorted(get_urn_resolver_local_files(
+            local_file_or_path, HXLM_DATA_URN_REWRITE_EXTENSIONS))
+    elif str(local_file_or_path).endswith(HXLM_DATA_URN_REWRITE_EXTENSIONS):
+        files = [local_file_or_path]
+    else:
+        return []
+
+    result = []
+    for filepath in files:
+        if filepath.endswith('.json'):
+            result.extend(get_urn_resolver_from_json(filepath))
+        else:
+            result.extend(get_urn_resolver_from_yml(filepath))
+    return result
+
+
+class URNRewriteRules:
+    """DDDS/NAPTR-style (RFC 3402/3403) rewrite rules, fully offline
+
+    One rule can replace thousands of explicit URN entries. Each rule is
+    an dict with the NAPTR fields:
+
+    - order (int): lower first. Rules with higher order are only used if
+      no rule with lower order matched
+    - preference (int): lower first, between rules with same order
+    - flags (str): 'u' if the result is terminal (an resource, like an
+      URL or local file); empty if the result is another URN to resolve
+    - regexp (str): substitution expression, like '!ere!replacement!',
+      the first char being the delimiter; backreferences as \\1 ... \\9.
+      Ends with an i to be case insensitive
+    - replacement (str): used as result if regexp is empty
+    - urn (str): with empty regexp, only this exact URN is rewritten
+      (otherwise the replacement applies to any URN, as on NAPTR)
+
+    Rules are grouped by the namespace (the literal prefix of the regex, see
+    get_urn_pattern_literals) so each URN is only tested against the rules
+    of its own namespaces, in a single pass sorted by (order, preference).
+    Results are kept in an LRU cache of up to LIMITEM_CACHE URNs (usage on
+    cache_hits and cache_misses).
+
+    >>> rules = URNRewriteRules([
+    ...     {'order': 100, 'preference': 10, 'flags': 'u',
+    ...      'regexp': '!^urn:data:xz:example:(.*)$!https://x.org/\\\\1.csv!'},
+    ...     {'order': 100, 'preference': 20, 'flags': 'u',
+    ...      'regexp': '!^urn:data:xz:example:(.*)$!/mirror/\\\\1.csv!'},
+    ...     {'order': 10, 'flags': '',
+    ...      'regexp': '!^urn:data:xz:old-example:!urn:data:xz:example:!'}])
+    >>> rules.rewrite('urn:data:xz:example:abc')
+    ['https://x.org/abc.csv', '/mirror/abc.csv']
+    >>> rules.rewrite('urn:data:xz:old-example:abc')
+    ['urn:data:xz:example:abc']
+    >>> rules.resolve('urn:data:xz:old-example:abc')
+    ['https://x.org/abc.csv', '/mirror/abc.csv']
+    >>> rules.resolve('urn:data:zz:other') is None
+    True
+    """
+
+    LIMITEM_CACHE = 4096
+    # NAPTR non-terminal loops
+    LIMITEM_RECURSIONEM = 10
+
+    def __init__(self, rules: List[dict] = None):
+        # namespace -> rules, namespace is the prefix up to an : (or '')
+        self._namespace = {}
+        # namespace of an URN (up to the last :) -> candidate rules, sorted
+        self._candidates = {}
+        self._cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.rules = []
+        for rule in rules or []:
+            self.add(rule)
+
+    def __len__(self):
+        return len(self.rules)
+
+    @staticmethod
+    def _compile(rule: dict) -> tuple:
+        regexp = rule.get('regexp') or ''
+        if not regexp:
+            if rule.get('urn'):
+                return (re.compile('^' + re.escape(rule['urn']) + '$'),
+                        None, rule['urn'])
+            return (None, None, '')
+        delimiter = regexp[0]
+        parts = regexp[1:].split(delimiter)
+        if len(parts) != 3 or not parts[0]:
+            raise SyntaxError('URN rewrite rule regexp [' + regexp + ']')
+        ere, replacement, flags = parts
+        cptn = re.compile(ere, re.IGNORECASE if 'i' in flags else 0)
+        prefix = get_urn_pattern_literals(ere)[0] if 'i' not in flags else ''
+        return (cptn, replacement, prefix)
+
+    def add(self, rule: dict):
+        """Add an rule (and clear the cache)"""
+        cptn, replacement, prefix = self._compile(rule)
+        compiled = (
+            int(rule.get('order', 0)),
+            int(rule.get('preference', 0)),
+            len(self.rules),
+            cptn,
+            # None: the result is the replacement field, as is
+            replacement,
+            rule.get('replacement', ''),
+            'u' in str(rule.get('flags', '')).lower()
+        )
+        namespace = prefix[:prefix.rfind(':')] if ':' in prefix else ''
+        self._namespace.setdefault(namespace, []).append(compiled)
+        self._namespace[namespace].sort()
+        self.rules.append(rule)
+        self._candidates.clear()
+        self._cache.clear()
+
+    def _rewrite(self, urn: str) -> tuple:
+        if urn in self._cache:
+            self.cache_hits += 1
+            self._cache.move_to_end(urn)
+            return self._cache[urn]
+        self.cache_misses += 1
+
+        urn_namespace = urn[:urn.rfind(':')]
+        candidates = self._candidates.get(urn_namespace)
+        if candidates is None:
+            candidates = list(self._namespace.get('', []))
+            segments = urn.split(':')
+            for index in range(1, len(segments)):
+                candidates.extend(
+                    self._namespace.get(':'.join(segments[:index]), []))
+            candidates.sort()
+            if len(self._candidates) >= self.LIMITEM_CACHE:
+                self._candidates.clear()
+            self._candidates[urn_namespace] = candidates
+
+        result = (None, False)
+        order = None
+        for rule_order, _, _, cptn, substitution, replacement, terminal \
+                in candidates:
+            if order is not None and rule_order != order:
+                break
+            if cptn is not None and not cptn.search(urn):
+                continue
+            if substitution is None:
+                output = replacement
+            else:
+                output = cptn.sub(substitution, urn, count=1)
+            if order is None:
+                order = rule_order
+                result = ([], terminal)
+            result[0].append(output)
+
+        self._cache[urn] = result
+        if len(self._cache) > self.LIMITEM_CACHE:
+            self._cache.popitem(last=False)
+        return result
+
+    def rewrite(self, urn: str) -> List[str]:
+        """Apply the rules once
+
+        Returns:
+            List[str]: results of the first order with matches (sorted by
+                       preference) or None
+        """
+        return self._rewrite(urn)[0]
+
+    def resolve(self, urn: str, urn_quaerendum=None) -> List[str]:
+        """Rewrite until an terminal result (flag 'u' on the first rule
+        that matched), up to LIMITEM_RECURSIONEM times. Non-terminal results
+        are first searched with urn_quaerendum (function urn -> exact rule,
+        like ones from urn.yml, or None)
+
+        Returns:
+            List[str]: resolved resources, or None
+        """
+        for _ in range(self.LIMITEM_RECURSIONEM):
+            item = urn_quaerendum(urn) if urn_quaerendum else None
+            if item is not None:
+                return get_urn_rule_fontem(item) or None
+            result, terminal = self._rewrite(urn)
+            if not result or terminal:
+                return result
+            urn = result[0]
+        return None
+
+
+def get_urn_index_hash(signature: List[list], urn_rules: List[dict]) -> str:
+    """Hash of an URN index: changes if the sources or the rules change
+
+    Args:
+        signature (List[list]): see get_urn_index_signature
+        urn_rules (List[dict]): rules, as returned by get_urn_resolver_*
+
+    Returns:
+        str: sha256, hex
+    """
+    # JSON, not marshal: YAML sources may have values like dates
+    canonical = json.dumps([signature, urn_rules], sort_keys=True,
+                           ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _get_marshal_safe(thing):
+    """Copy of thing with only types marshal can write; others (like dates
+    from YAML) as str
+
+    >>> import datetime
+    >>> _get_marshal_safe({'updated': datetime.date(2021, 3, 1), 'n': [1]})
+    {'updated': '2021-03-01', 'n': [1]}
+    """
+    if isinstance(thing, dict):
+        return {_get_marshal_safe(key): _get_marshal_safe(value)
+                for key, value in thing.items()}
+    if isinstance(thing, (list, tuple)):
+        return [_get_marshal_safe(item) for item in thing]
+    if thing is None or isinstance(thing, (str, int, float, bool, bytes)):
+        return thing
+    return str(thing)
+
+
+def compile_urn_index(urn_rules: List[dict],
+                      sources: List[str],
+                      index_file: str = HXLM_URN_INDEX,
+                      conflicts: list = None,
+                      rewrite_rules: List[dict] = None) -> dict:
+    """Compile an list of URN rules to an file to be loaded with URNIndex
+
+    The index is an python marshal file with the rules (same order), an
+    hash map of exact URN to the position of each rule, the signature of
+    the sources (see get_urn_index_signature) and an hash of the content.
+    Values marshal can not write (like dates from YAML) are saved as str.
+    The file is written to an temporary file and then renamed.
+
+    Args:
+        urn_rules (List[dict]): rules, as returned by get_urn_resolver_*
+        sources (List[str]): files or folders used to load urn_rules
+        index_file (str, optional): Defaults to HXLM_URN_INDEX.
+        conflicts (list, optional): see merge_urn_resolvers
+        rewrite_rules (List[dict], optional): see URNRewriteRules
+
+    Returns:
+        dict: the compiled index
+    """
+    urn_rules = _get_marshal_safe(urn_rules)
+    rewrite_rules = _get_marshal_safe(rewrite_rules or [])
+    urn_map = {}
+    for position, item in enumerate(urn_rules):
+        urn_map.setdefault(item['urn'], []).append(position)
+
+    signature = get_urn_index_signature(sources)
+    index = {
+        'version': HXLM_URN_INDEX_VERSION,
+        'sources': signature,
+        'hash': get_urn_index_hash(signature, urn_rules),
+        'rules': urn_rules,
+        'urn': urn_map,
+        'conflicts': [list(conflict) for conflict in conflicts or []],
+        'rewrite': rewrite_rules
+    }
+
+    index_dir = os.path.dirname(os.path.abspath(index_file))
+    os.makedirs(index_dir, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+            'wb', dir=index_dir, delete=False) as index_tmp:
+        marshal.dump(index, index_tmp)
+    os.replace(index_tmp.name, index_file)
+
+    return index
+
+
+class URNIndex:
+    """URN index compiled by compile_urn_index, opened lazily
+
+    The file is only read on first use. With sources, the index is only
+    used if the sources did not change (mtime and size) since compilation.
+
+    >>> index = URNIndex('/non/existent/urnresolver.index')
+    >>> index.is_fresh()
+    False
+    >>> index.lookup('urn:data:xz:hxl:standard:core:hashtag')
+    []
+    """
+
+    def __init__(self, index_file: str = HXLM_URN_INDEX,
+                 sources: List[str] = None):
+        self.index_file = index_file
+        self.sources = sources
+        self._index = None
+
+    def _load(self) -> dict:
+        if self._index is None:
+            self._index = {}
+            try:
+                with open(self.index_file, 'rb') as index_file:
+                    index = marshal.load(index_file)
+            except (OSError, EOFError, ValueError, TypeError):
+                return self._index
+            if isinstance(index, dict) and \
+                    index.get('version') == HXLM_URN_INDEX_VERSION:
+                self._index = index
+        return self._index
+
+    def is_fresh(self) -> bool:
+        """The index exists and (if sources were given) is not stale"""
+        index = self._load()
+        if not index:
+            return False
+        if self.sources is None:
+            return True
+        return index['sources'] == get_urn_index_signature(self.sources)
+
+    def conflicts(self) -> List[tuple]:
+        """Conflicting duplicates found when merging (merge_urn_resolvers)
+        """
+        return [tuple(conflict)
+                for conflict in self._load().get('conflicts', [])]
+
+    def rewrite_rules(self) -> List[dict]:
+        """DDDS/NAPTR-style rewrite rules (see URNRewriteRules)"""
+        return self._load().get('rewrite', [])
+
+    def hash(self) -> str:
+        """Hash of the sources and rules, as when compiled"""
+        return self._load().get('hash')
+
+    def lookup(self, urn: str) -> List[dict]:
+        """Rules with exact URN, same order as compiled. O(1)"""
+        index = self._load()
+        if not index:
+            return []
+        return [index['rules'][position]
+                for position in index['urn'].get(urn, [])]
+
+    def rules(self) -> List[dict]:
+        """All rules, same order as compiled"""
+        return self._load().get('rules', [])
+
+
+def _get_urn_remote_iri(iri_or_domain: str) -> str:
+    if iri_or_domain.find('://') == -1:
+        # Bare domain. See tests/urnresolver/README.md
+        return 'https://' + iri_or_domain + '/.well-known/urn.txt'
+    return iri_or_domain
+
+
+def _get_urn_remote_cache(iri: str, cache_dir: str) -> tuple:
+    extension = os.path.splitext(urlparse(iri).path)[1].lower()
+    if extension not in ('.csv', '.tsv', '.txt', '.json', '.yml'):
+        extension = '.txt'
+    name = hashlib.sha256(iri.encode('utf-8')).hexdigest()
+    return (os.path.join(cache_dir, name + extension),
+            os.path.join(cache_dir, name + '.meta.json'))
+
+
+def _get_urn_remote_revalidate(iri: str, cache_dir: str, headers: dict,
+                               timeout: float) -> bool:
+    """Conditional GET of iri to the cache. True if the cache is valid"""
+    cache_file, meta_file = _get_urn_remote_cache(iri, cache_dir)
+    meta = {}
+    if os.path.exists(cache_file) and os.path.exists(meta_file):
+        with open(meta_file, 'r') as meta_f:
+            meta = json.load(meta_f)
+
+    request_headers = dict(headers or {})
+    if meta.get('etag'):
+        request_headers['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'):
+        request_headers['If-Modified-Since'] = meta['last_modified']
+
+    try:
+        response = requests.get(iri, headers=request_headers,
+                                timeout=timeout)
+    except requests.RequestException:
+        return False
+
+    if response.status_code == 304 and meta:
+        pass
+    elif response.status_code == 200:
+        os.makedirs(cache_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+                'wb', dir=cache_dir, delete=False) as cache_tmp:
+            cache_tmp.write(response.content)
+        os.replace(cache_tmp.name, cache_file)
+        meta = {
+            'iri': iri,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')
+        }
+    else:
+        return False
+
+    meta['fetched'] = time.time()
+    with tempfile.NamedTemporaryFile(
+            'w', dir=cache_dir, delete=False) as meta_tmp:
+        json.dump(meta, meta_tmp)
+    os.replace(meta_tmp.name, meta_file)
+    return True
+
+
 def get_urn_resolver_remote(iri_or_domain: str,
                             required: bool = False,
-                            headers=None) -> List[str]:
+                            headers=None,
+                            cache_dir: str = None,
+                            ttl: int = None,
+                            stale: int = None,
+                            timeout: float = None,
+                            metrics=None) -> List[dict]:
     """Return instructions for an remote resolver
 
+    The remote file (same formats as get_urn_resolver_from_any) is saved on
+    cache_dir and revalidated (ETag/Last-Modified) only after ttl seconds.
+    Up to stale seconds after ttl, the cached version is used while
+    revalidated in background. If the server is offline (or an error
+    happens) any cached version is used.
+
     Args:
-        iri_or_domain (str): [description]
+        iri_or_domain (str): URL or an bare domain
+                             (https://domain/.well-known/urn.txt)
         required (bool, optional): Raise error if missing. Defaults to False.
+        headers (dict, optional): HTTP headers
+        cache_dir (str, optional): Defaults to HXLM_URN_REMOTE_CACHE
+        ttl (int, optional): Defaults to HXLM_URN_REMOTE_TTL
+        stale (int, optional): Defaults to HXLM_URN_REMOTE_STALE
+        timeout (float, optional): Defaults to HXLM_URN_REMOTE_TIMEOUT
+        metrics (Metrics, optional): hxlm.core.internal.metrics.Metrics to
+                                     record time and cache (hit, stale,
+                                     miss) of iri_or_domain
 
     Raises:
-        NotImplementedError: [description]
+        RuntimeError: if required and not available (even on cache)
 
     Returns:
-        List[str]: list of raw contents for each resolver instructions files
+        List[dict]: parsed result, urnref is the URL
     """
+    iri = _get_urn_remote_iri(iri_or_domain)
+    cache_dir = cache_dir or HXLM_URN_REMOTE_CACHE
+    ttl = HXLM_URN_REMOTE_TTL if ttl is None else ttl
+    stale = HXLM_URN_REMOTE_STALE if stale is None else stale
+    timeout = HXLM_URN_REMOTE_TIMEOUT if timeout is None else timeout
+    cache_file, meta_file = _get_urn_remote_cache(iri, cache_dir)
+
+    age = None
+    if os.path.exists(cache_file) and os.path.exists(meta_file):
+        try:
+            with open(meta_file, 'r') as meta_f:
+                age = time.time() - json.load(meta_f).get('fetched', 0)
+        except ValueError:
+            age = None
+
+    start = time.perf_counter()
+    if age is None or age >= ttl + stale:
+        cache = 'miss'
+        _get_urn_remote_revalidate(iri, cache_dir, headers, timeout)
+    elif age >= ttl:
+        cache = 'stale'
+        # stale-while-revalidate. Not daemon: finish before exit
+        threading.Thread(
+            target=_get_urn_remote_revalidate,
+            args=(iri, cache_dir, headers, timeout)).start()
+    else:
+        cache = 'hit'
+    if metrics is not None:
+        metrics.set('sources', iri_or_domain, 'cache', value=cache)
+        metrics.add('sources', iri_or_domain, 'fetch_seconds',
+                    value=time.perf_counter() - start)
+
+    if not os.path.exists(cache_file):
+        if required:
+            raise RuntimeError(
+                'iri_or_domain [' + iri_or_domain + '] not available')
+        return None
 
-    # bare domain not implemented yet.
-
-    # r = requests.get(iri_or_domain, headers=headers)
-    # path = urlparse(iri_or_domain).path
-    # ext = os.path.splitext(path)[1]
+    urnref = Path(cache_file).name
+    result = get_urn_resolver_from_any(cache_file) or []
+    for item in result:
+        if item.get('urnref') == urnref:
+            item['urnref'] = iri
+    return result
 
-    # print('ext r', urlparse(iri_or_domain))
-    # print('ext r', ext, r, r.text, os.path.splitext(path))
 
-    # if ext == 'csv':
-    #     return ...
+def get_urn_resolver_remotes(iris_or_domains: List[str],
+                             required: bool = False,
+                             **kwargs) -> List[List[dict]]:
+    """get_urn_resolver_remote for several remotes, concurrently
 
-    raise NotImplementedError(
-        "get_urn_resolver_remote for iri_or_domain [" +
-        iri_or_domain + "] not implemtend at the moment (but will)"
-    )
+    Returns:
+        List[List[dict]]: one result per iri_or_domain, same order
+    """
+    if not iris_or_domains:
+        return []
+    with ThreadPoolExecutor(min(8, len(iris_or_domains))) as executor:
+        futures = [executor.submit(get_urn_resolver_remote, iri_or_domain,
+                                   required, **kwargs)
+                   for iri_or_domain in iris_or_domains]
+        return [future.result() for future in futures]
 
 
 def get_urn_resolver_remote_authenticated(iri_or_domain: str,
@@ -70,6 +70,10 @@ from hxlm.core.exception import (
 from hxlm.core.hdp.util.common import (
     get_hdp_term_cleaned
 )
+from hxlm.core.io.cache import (
+    load_yaml,
+    load_yaml_file
+)
 
 # HXLM_CORE_SCHEMA_CORE_VOCAB = os.path.dirname(os.path.realpath(__file__)) + \
 #     '/core_vocab.yml'
@@ -213,11 +217,9 @@ class ItemHVocab:
             [dict]: YAML result
         """
         if os.path.isfile(yaml_item):
-            with open(yaml_item, 'r') as openfile:
-                data = yaml.safe_load(openfile)
-                return data
+            return load_yaml_file(yaml_item)
         else:
-            data = yaml.safe_load(yaml_item)
+            data = load_yaml(yaml_item)
             return data
 
     def to_dict(self) -> dict:
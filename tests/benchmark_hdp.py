@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+
+# Benchmarks for hxlm.core.hdp.util.common (transpose), integrity
+# (MerkleTree) and io.cache (YAML). Not collected by pytest (too slow for
+# unit tests). Usage:
+#     ./tests/benchmark_hdp.py
+#     ./tests/benchmark_hdp.py 1000 100000
+#     ./tests/benchmark_hdp.py --merkle 10000 1000000
+#     ./tests/benchmark_hdp.py --yaml
+
+import hxlm.core.hdp.util.common as common
+from hxlm.core.hdp.util.common import (
+    build_new_vocabulary_knowledge_graph,
+    get_transpose_keymap,
+    get_vkg_languages,
+    transpose_hsilo,
+    TransposeFragmentCache,
+    TransposeKeymapTable,
+    HDP_VKG_KEYMAP_FILE,
+    VOCAB_RECURSION_LEAF
+)
+from hxlm.core.internal.integrity import (
+    get_checksum,
+    verify_merkle_proof,
+    MerkleTree
+)
+from hxlm.core.io.cache import (
+    load_yaml_file
+)
+from hxlm.core.util import load_file
+import hxlm.core.constant as C
+from copy import deepcopy
+import sys
+import tempfile
+import time
+import yaml
+
+SIZES = [1000, 100000]
+MERKLE_SIZES = [10000, 1000000]
+YAML_FILES = ['core.vkg.yml', 'core.lkg.yml', 'cor.hdplisp.yml']
+ATTRS = ['datum', 'descriptionem', 'exemplum', 'fontem', 'id', 'iri',
+         'linguam', 'locum', 'meta', 'nomen', 'objectivum', 'urn']
+
+
+def synthetic_hsilo(total: int) -> list:
+    """Synthetic hsilo with about total keys, up to 4 levels deep"""
+    hdatum = []
+    keys = 0
+    while keys < total:
+        hdatum.append({
+            'id': 'datum-' + str(keys),
+            'nomen': 'Exemplum ' + str(keys),
+            'meta': {
+                'descriptionem': 'Lorem ipsum',
+                'fontem': {'iri': 'https://example.org/' + str(keys),
+                           'linguam': 'LAT'},
+            },
+            'grupum': [{'urn': 'urn:data:xz:' + str(keys)}]
+        })
+        keys += 9
+    return [{
+        '([Lingua Latina])': None,
+        'hsilo': {'nomen': 'benchmark', 'tag': ['benchmark']},
+        'hdatum': hdatum
+    }]
+
+
+def transpose_old(hsilo: list, target: str, source: str = 'LAT') -> list:
+    """deepcopy + recursive version, before get_transpose_keymap (without
+    the hsilo header change, done the same way by both)"""
+    active_vkg = build_new_vocabulary_knowledge_graph(
+        key_vid=source)[source]
+
+    def _recursive(item, context, level):
+        if level > 10:
+            raise RecursionError('Level too high')
+        if context.endswith(VOCAB_RECURSION_LEAF):
+            return item
+        if isinstance(item, list):
+            return [_recursive(sub, context, level + 1) for sub in item]
+        if isinstance(item, dict):
+            item_new = {}
+            for key in item:
+                if str(key).startswith('_'):
+                    item_new[key] = item[key]
+                    continue
+                if key in active_vkg['attr'] and \
+                        active_vkg['attr'][key][target]['id']:
+                    key_new = active_vkg['attr'][key][target]['id']
+                else:
+                    key_new = key
+                item_new[key_new] = _recursive(
+                    item[key], context + '.' + key, level + 1)
+            return item_new
+        return item
+
+    result = deepcopy(hsilo)
+    for hdpns, _ in enumerate(hsilo):
+        for key_l1 in hsilo[hdpns]:
+            if key_l1 in active_vkg['root'] and \
+                    target in active_vkg['root'][key_l1]:
+                newterm = active_vkg['root'][key_l1][target]['id']
+                result[hdpns][newterm] = _recursive(
+                    result[hdpns].pop(key_l1), key_l1, 1)
+            elif not str(key_l1).startswith('_'):
+                result[hdpns][key_l1] = _recursive(
+                    hsilo[hdpns][key_l1], key_l1, 1)
+    return result
+
+
+def benchmark_transpose(total: int, repeat: int = 3):
+    hsilo = synthetic_hsilo(total)
+
+    for name, func in [('transpose_old', transpose_old),
+                       ('transpose_hsilo', transpose_hsilo)]:
+        func(hsilo, 'RUS', 'LAT')
+        elapsed = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func(hsilo, 'RUS', 'LAT')
+            elapsed.append(time.perf_counter() - start)
+        print(name.ljust(16), total, 'keys:', round(min(elapsed), 4), 's')
+
+
+def benchmark_transpose_incremental(total: int, repeat: int = 3):
+    """Transpose again after one key changed, with TransposeFragmentCache:
+    fragments found by hash, and edits tracked with update()"""
+    hsilo = synthetic_hsilo(total)
+    cache = TransposeFragmentCache()
+    transpose_hsilo(hsilo, 'RUS', 'LAT', cache=cache)
+
+    elapsed = []
+    for idx in range(repeat):
+        hsilo[0]['hdatum'][idx]['nomen'] = 'Editum ' + str(idx)
+        start = time.perf_counter()
+        transpose_hsilo(hsilo, 'RUS', 'LAT', cache=cache)
+        elapsed.append(time.perf_counter() - start)
+    print('incremental'.ljust(16), total, 'keys:', round(min(elapsed), 4),
+          's')
+
+    cache = TransposeFragmentCache()
+    cache.track(hsilo)
+    transpose_hsilo(hsilo, 'RUS', 'LAT', cache=cache)
+
+    elapsed = []
+    for idx in range(repeat):
+        cache.update((0, 'hdatum', idx, 'nomen'), 'Tractum ' + str(idx))
+        start = time.perf_counter()
+        transpose_hsilo(hsilo, 'RUS', 'LAT', cache=cache)
+        elapsed.append(time.perf_counter() - start)
+    print('tracked'.ljust(16), total, 'keys:', round(min(elapsed), 6), 's')
+
+
+def benchmark_merkle(total: int, repeat: int = 3):
+    """Verify again after one key changed: full (CRC32 and MerkleTree of
+    everything), incremental (MerkleTree.update) and one subtree (proof)"""
+    body = synthetic_hsilo(total)[0]
+    body.pop('([Lingua Latina])')
+    tree = MerkleTree(body)
+    path = ('hdatum', len(body['hdatum']) // 2, 'meta', 'descriptionem')
+    proof = tree.get_proof(path[:2])
+
+    def _full_crc32():
+        get_checksum(body, 'CRC32')
+
+    def _full_merkle():
+        MerkleTree(body).hexdigest()
+
+    def _incremental():
+        tree.update(path, 'Salve')
+        tree.hexdigest()
+
+    def _subtree():
+        verify_merkle_proof(tree.hexdigest(), body['hdatum'][path[1]], proof)
+
+    for name, func in [('full CRC32', _full_crc32),
+                       ('full MERKLE', _full_merkle),
+                       ('incremental MERKLE', _incremental),
+                       ('subtree MERKLE', _subtree)]:
+        elapsed = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            elapsed.append(time.perf_counter() - start)
+        print(name.ljust(20), total, 'keys:', round(min(elapsed), 6), 's')
+
+
+def benchmark_keymap(repeat: int = 20):
+    """Key maps of one source to every language, without any cache (like
+    an new process) from HDP_VKG and from the compiled table"""
+    languages = get_vkg_languages()
+
+    def _from_vkg():
+        common.HDP_VKG_FULL.clear()
+        for target in languages:
+            common._get_transpose_keymap_vkg(
+                build_new_vocabulary_knowledge_graph(key_vid='RUS')['RUS'],
+                target)
+
+    def _from_yaml():
+        # load_file is lru_cache'd, as if an new process
+        load_file.__wrapped__(common.HDP_VKG_FILE)
+        _from_vkg()
+
+    def _from_table():
+        table = TransposeKeymapTable(HDP_VKG_KEYMAP_FILE)
+        for target in languages:
+            table.get('RUS', target)
+
+    get_transpose_keymap('LAT', 'RUS')  # compile the table, if need
+    for name, func in [('keymap from YAML', _from_yaml),
+                       ('keymap from HDP_VKG', _from_vkg),
+                       ('keymap from table', _from_table)]:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        elapsed = (time.perf_counter() - start) / repeat
+        print(name.ljust(20), len(languages), 'languages:',
+              round(elapsed * 1000, 3), 'ms')
+
+
+def benchmark_yaml(repeat: int = 5):
+    """Load ontologia/ YAML files: pure python yaml.safe_load, libyaml
+    (without disk cache) and warm disk cache of io.cache.load_yaml_file"""
+    cache_dir = tempfile.mkdtemp()
+    for name in YAML_FILES:
+        yml_file = C.HXLM_ROOT + '/ontologia/' + name
+
+        def _safe_load():
+            with open(yml_file, 'r') as openfile:
+                yaml.safe_load(openfile)
+
+        load_yaml_file(yml_file, cache_dir=cache_dir)  # warm cache
+        for label, func in [
+                ('yaml.safe_load', _safe_load),
+                ('CSafeLoader', lambda: load_yaml_file(yml_file, '')),
+                ('cache (warm)', lambda: load_yaml_file(yml_file, cache_dir))]:
+            elapsed = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                func()
+                elapsed.append(time.perf_counter() - start)
+            print((label + ' ' + name).ljust(32),
+                  round(min(elapsed) * 1000, 3), 'ms')
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['--yaml']:
+        benchmark_yaml()
+        sys.exit(0)
+    if sys.argv[1:2] == ['--merkle']:
+        for size in [int(arg) for arg in sys.argv[2:]] or MERKLE_SIZES:
+            benchmark_merkle(size)
+        sys.exit(0)
+    benchmark_keymap()
+    for size in [int(arg) for arg in sys.argv[1:]] or SIZES:
+        benchmark_transpose(size)
+        benchmark_transpose_incremental(size)
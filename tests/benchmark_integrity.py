@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+# Micro-benchmark of hxlm.core.internal.integrity get_hashable and
+# get_checksum of files. Not collected by pytest. Usage:
+#     ./tests/benchmark_integrity.py
+#     ./tests/benchmark_integrity.py 100000
+
+from hxlm.core.internal.integrity import (
+    get_checksum,
+    get_hashable,
+    get_hashable_json
+)
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+LOOPS = 20000
+FILE_SIZE = 64 * 1048576
+
+
+def get_hashable_old(thing):
+    """get_hashable before the prefix check (json.loads of every str)"""
+    if isinstance(thing, str):
+        try:
+            jsonlike = json.loads(thing)
+        except ValueError:
+            jsonlike = False
+        if not jsonlike:
+            return thing
+        return get_hashable_json(jsonlike)
+    if isinstance(thing, int):
+        return str(thing)
+    return get_hashable_json(thing)
+
+
+def benchmark_get_hashable(loops: int):
+    cases = [
+        ('short str', 'Lorem ipsum'),
+        ('long str', 'Lorem ipsum dolor sit amet ' * 1000),
+        ('word prefix str', 'true story'),
+        ('numeric str', '12345'),
+        ('JSON str', json.dumps({'b': [1, 2, 3], 'a': {'c': None}})),
+        ('dict', {'b': [1, 2, 3], 'a': {'c': None}}),
+    ]
+    for name, thing in cases:
+        for label, func in [('old', get_hashable_old),
+                            ('new', get_hashable)]:
+            start = time.perf_counter()
+            for _ in range(loops):
+                func(thing)
+            elapsed = time.perf_counter() - start
+            print((label + ' ' + name).ljust(20), loops, 'loops:',
+                  round(elapsed * 1000, 3), 'ms')
+
+
+def benchmark_file(size: int):
+    """get_checksum of an file: read() everything vs chunked"""
+    with tempfile.NamedTemporaryFile(delete=False) as temp:
+        temp.write(os.urandom(1048576) * (size // 1048576))
+    try:
+        def _read_all():
+            with open(temp.name, 'rb') as file_:
+                return get_checksum(file_.read().decode('latin-1'))
+
+        def _chunked():
+            return get_checksum(pathlib.Path(temp.name))
+
+        for name, func in [('file read()', _read_all),
+                           ('file chunked', _chunked)]:
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            print(name.ljust(20), size // 1048576, 'MiB:',
+                  round(elapsed, 4), 's')
+    finally:
+        os.unlink(temp.name)
+
+
+if __name__ == "__main__":
+    benchmark_get_hashable(int(sys.argv[1]) if sys.argv[1:] else LOOPS)
+    benchmark_file(FILE_SIZE)
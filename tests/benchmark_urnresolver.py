@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+
+# Benchmarks for hxlm.core.schema.urn.util (urnresolver). Not collected by
+# pytest (too slow for unit tests). Usage:
+#     ./tests/benchmark_urnresolver.py
+#     ./tests/benchmark_urnresolver.py 10000 100000 1000000
+
+from hxlm.core.bin.urnresolver import (
+    URNResolver,
+    URNResolverServitium,
+    ThreadingWSGIServer
+)
+from hxlm.core.schema.urn.util import (
+    find_urn_resolver_local,
+    get_urn_pattern_literals,
+    get_urn_resolver_from_any,
+    get_urn_resolver_local,
+    merge_urn_resolvers,
+    URNRewriteRules,
+    URNTrie
+)
+from concurrent.futures import ThreadPoolExecutor
+import http.client
+import json
+import os
+from pathlib import Path
+import re
+import sys
+import tempfile
+import threading
+import time
+from wsgiref.simple_server import make_server, WSGIRequestHandler
+
+SIZES = [10000, 100000, 1000000]
+# Old merge is O(n^2); above this it would take minutes
+OLD_MERGE_LIMIT = 10000
+# benchmark_local: many small files, but not more than this
+LOCAL_FILES_LIMIT = 2000
+
+
+def synthetic_catalogue(total: int, urnref: str, offset: int = 0):
+    """Synthetic URN list; 1 in each 10 URNs has a different source"""
+    return [{
+        'urn': 'urn:data:xz:benchmark:' + str(number + offset),
+        'source': ['https://example.org/' +
+                   ('alt/' if number % 10 == 0 else '') +
+                   str(number + offset) + '.csv'],
+        'urnref': urnref
+    } for number in range(total)]
+
+
+def merge_old(urn_resolvers):
+    """Merge used before merge_urn_resolvers (if item not in list)"""
+    result = []
+    for urn_rules in urn_resolvers:
+        for item_ in urn_rules:
+            if item_ not in result:
+                result.append(item_)
+    return result
+
+
+def benchmark_merge(total: int):
+    # local, config and vendor, each with half of its URNs also on the next
+    third = total // 3
+    urn_resolvers = [
+        synthetic_catalogue(third, 'local.urn.csv', 0),
+        synthetic_catalogue(third, 'config.urn.csv', third // 2),
+        synthetic_catalogue(total - 2 * third, 'vendor.urn.yml', third),
+    ]
+
+    conflicts = []
+    start = time.perf_counter()
+    result = merge_urn_resolvers(urn_resolvers, conflicts)
+    elapsed = time.perf_counter() - start
+    print('merge_urn_resolvers', total, 'entries:',
+          round(elapsed, 3), 's,', len(result), 'URNs,',
+          len(conflicts), 'conflicts')
+
+    if total <= OLD_MERGE_LIMIT:
+        start = time.perf_counter()
+        merge_old(urn_resolvers)
+        elapsed = time.perf_counter() - start
+        print('merge_old          ', total, 'entries:', round(elapsed, 3), 's')
+
+
+def local_old(basepath: str):
+    """get_urn_resolver_local before the single os.scandir pass (one glob
+    per extension, files loaded one after other)"""
+    urn_rules_all = []
+    for extension in ('urn.csv', 'urn.tsv', 'urn.json', 'urn.yml',
+                      'urn.txt'):
+        for filepath in Path(basepath).glob('*' + extension):
+            urn_rules_all.extend(get_urn_resolver_from_any(str(filepath)))
+    return urn_rules_all
+
+
+def benchmark_local(total: int):
+    """Folder with many small URN lists (CSV, TSV and YAML)"""
+    files = min(LOCAL_FILES_LIMIT, max(1, total // 10))
+    with tempfile.TemporaryDirectory() as basepath:
+        for number in range(files):
+            items = synthetic_catalogue(
+                total // files, 'x', number * (total // files))
+            extension = ('csv', 'tsv', 'yml')[number % 3]
+            with open(basepath + '/' + str(number) + '.urn.' + extension,
+                      'w') as urn_file:
+                for item in items:
+                    if extension == 'yml':
+                        urn_file.write('- urn: ' + item['urn'] +
+                                       '\n  fontem: [' +
+                                       item['source'][0] + ']\n')
+                    else:
+                        urn_file.write(
+                            item['urn'] + (',' if extension == 'csv'
+                                           else '\t') +
+                            item['source'][0] + '\n')
+
+        for name, func in [('local_old', local_old),
+                           ('get_urn_resolver_local', get_urn_resolver_local)]:
+            start = time.perf_counter()
+            result = func(basepath)
+            elapsed = time.perf_counter() - start
+            print(name.ljust(24), total, 'entries,', files, 'files:',
+                  round(elapsed, 3), 's,', len(result), 'rules')
+
+        for name, urn in [('first', result[0]['urn']),
+                          ('last', result[-1]['urn'])]:
+            start = time.perf_counter()
+            find_urn_resolver_local(urn, [basepath])
+            elapsed = time.perf_counter() - start
+            print('find_urn_resolver_local', total, 'entries, hit on',
+                  name, 'file:', round(elapsed, 3), 's')
+
+
+def benchmark_urn_list(total: int):
+    # 1 in 100 URNs on the namespace searched
+    urns = ['urn:data:xz:' + ('hxl' if number % 100 == 0 else 'benchmark') +
+            ':' + str(number) for number in range(total)]
+    pattern = '^urn:data:xz:hxl:.*00$'
+
+    start = time.perf_counter()
+    trie = URNTrie(urns)
+    elapsed = time.perf_counter() - start
+    print('URNTrie            ', total, 'entries:', round(elapsed, 3),
+          's (build)')
+
+    start = time.perf_counter()
+    result = trie.prefix('urn:data:xz:hxl:')
+    elapsed = time.perf_counter() - start
+    print('URNTrie.prefix     ', total, 'entries:', round(elapsed, 3), 's,',
+          len(result), 'URNs')
+
+    cptn = re.compile(pattern)
+    start = time.perf_counter()
+    prefix, literals = get_urn_pattern_literals(pattern)
+    result = [position for position in trie.prefix(prefix)
+              if all(literal in urns[position] for literal in literals) and
+              cptn.search(urns[position])]
+    elapsed = time.perf_counter() - start
+    print('pattern, prefilter ', total, 'entries:', round(elapsed, 3), 's,',
+          len(result), 'URNs')
+
+    start = time.perf_counter()
+    result = [position for position, urn in enumerate(urns)
+              if urn.startswith(prefix) and cptn.search(urn)]
+    elapsed = time.perf_counter() - start
+    print('pattern, startswith', total, 'entries:', round(elapsed, 3), 's,',
+          len(result), 'URNs')
+
+    start = time.perf_counter()
+    result = [urn for urn in urns if cptn.search(urn)]
+    elapsed = time.perf_counter() - start
+    print('pattern, re.search ', total, 'entries:', round(elapsed, 3), 's,',
+          len(result), 'URNs')
+
+
+def benchmark_rewrite(total: int):
+    """One DDDS/NAPTR-style rule vs an explicit list with total entries"""
+    urns = ['urn:data:xz:benchmark:' + str(number) for number in range(total)]
+
+    start = time.perf_counter()
+    catalogue = json.loads(json.dumps(
+        synthetic_catalogue(total, 'benchmark.urn.json')))
+    urn_map = {}
+    for item in merge_urn_resolvers([catalogue]):
+        urn_map[item['urn']] = item
+    elapsed = time.perf_counter() - start
+    print('explicit list load ', total, 'entries:', round(elapsed, 3), 's')
+
+    start = time.perf_counter()
+    for urn in urns:
+        urn_map[urn]['source'][0]
+    elapsed = time.perf_counter() - start
+    print('explicit list      ', total, 'lookups:', round(elapsed, 3), 's')
+
+    rules = URNRewriteRules([{
+        'order': 100, 'preference': 10, 'flags': 'u',
+        'regexp': '!^urn:data:xz:benchmark:(.*)$!https://example.org/\\1.csv!'
+    }] + [{
+        # Other namespaces, that must not be tested for these URNs
+        'order': 100, 'preference': 10, 'flags': 'u',
+        'regexp': '!^urn:data:xz:other' + str(number) +
+                  ':(.*)$!https://example.org/\\1.csv!'
+    } for number in range(100)])
+
+    start = time.perf_counter()
+    for urn in urns:
+        rules.resolve(urn)
+    elapsed = time.perf_counter() - start
+    print('rewrite rules      ', total, 'lookups:', round(elapsed, 3),
+          's (cache miss)')
+
+    urns_cache = urns[:rules.LIMITEM_CACHE]
+    for urn in urns_cache:
+        rules.resolve(urn)
+    start = time.perf_counter()
+    for _ in range(total // len(urns_cache)):
+        for urn in urns_cache:
+            rules.resolve(urn)
+    elapsed = time.perf_counter() - start
+    print('rewrite rules      ', total, 'lookups:', round(elapsed, 3),
+          's (cache hit)')
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def benchmark_servitium(total: int, requests: int = 2000,
+                        threads: int = 8):
+    """Load test of urnresolver --servitium (local instance, random port)
+    """
+    with tempfile.TemporaryDirectory() as urn_dir:
+        with open(os.path.join(urn_dir, 'benchmark.urn.json'), 'w') as urns:
+            json.dump(synthetic_catalogue(total, 'benchmark.urn.json'), urns)
+
+        sys.argv = ['urnresolver', '--urn-index-local', urn_dir,
+                    '--no-urn-user-defaults', '--no-urn-vendor-defaults']
+        urnresolver = URNResolver()
+        args = urnresolver.make_args_urnresolver()
+        start = time.perf_counter()
+        servitium = URNResolverServitium(
+            urnresolver, args, urnresolver.get_urn_sources(args))
+        elapsed = time.perf_counter() - start
+        print('servitium load     ', total, 'entries:', round(elapsed, 3),
+              's')
+
+        server = make_server('127.0.0.1', 0, servitium,
+                             server_class=ThreadingWSGIServer,
+                             handler_class=QuietWSGIRequestHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_port
+
+        def request(number):
+            start = time.perf_counter()
+            connection = http.client.HTTPConnection('127.0.0.1', port)
+            connection.request(
+                'GET', '/urn:data:xz:benchmark:' + str(number % total))
+            response = connection.getresponse()
+            response.read()
+            connection.close()
+            assert response.status == 200
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as executor:
+            latency = sorted(executor.map(request, range(requests)))
+        elapsed = time.perf_counter() - start
+        server.shutdown()
+        server.server_close()
+
+        print('servitium GET      ', total, 'entries:',
+              round(requests / elapsed), 'req/s, p50',
+              round(latency[len(latency) // 2] * 1000, 2), 'ms, p99',
+              round(latency[int(len(latency) * 0.99)] * 1000, 2), 'ms')
+
+
+if __name__ == "__main__":
+    for size in [int(arg) for arg in sys.argv[1:]] or SIZES:
+        benchmark_merge(size)
+        benchmark_local(size)
+        benchmark_urn_list(size)
+        benchmark_rewrite(size)
+        benchmark_servitium(size)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+# To output even more verbose results
+#     ./tests/test_core_bin_hdpcli.py
+#
+# To test directly
+#     pytest -vv ./tests/test_core_bin_hdpcli.py
+
+from hxlm.core.bin.hdpcli import (
+    HDPCLI
+)
+from hxlm.core.model.hdp import (
+    HDP
+)
+from hxlm.ontologia.python.hdp.aux import (
+    AuxLoadPolicy
+)
+import io
+import json
+import os
+import sys
+import pathlib
+TESTDIR = str(pathlib.Path(__file__).parent.absolute()) + '/htransformare'
+
+
+def test_core_bin_hdpcli_transpose_multiplum(tmp_path, monkeypatch, capsys):
+    exitum_dir = str(tmp_path / 'exitum')
+    monkeypatch.setattr(sys, 'argv', [
+        'hdpcli', '--transpose-multiplum', 'rus,POR,ARA',
+        '--transpose-multiplum-exitum', exitum_dir,
+        '--transpose-multiplum-processus', '2', TESTDIR])
+    hdpcli = HDPCLI()
+    args = hdpcli.make_args_hdpcli()
+
+    assert hdpcli.execute_cli(args, stderr=io.StringIO()) == hdpcli.EXIT_OK
+
+    statisticae = json.loads(capsys.readouterr().out)
+    # salve-mundi.lat.hdp.yml and salve-mundi.por.hdp.yml have the same
+    # output names, so only the first one (sorted) is written
+    assert statisticae['summa']['files'] == 2
+    assert statisticae['summa']['outputs'] == 3
+    assert statisticae['summa']['errors'] == 0
+    assert sorted(os.listdir(exitum_dir)) == [
+        'salve-mundi.ara.hdp.yml',
+        'salve-mundi.por.hdp.yml',
+        'salve-mundi.rus.hdp.yml'
+    ]
+
+    # Same result as one file, one language, at time
+    hdp = HDP(hdp_entry_point=TESTDIR + '/salve-mundi.lat.hdp.yml')
+    with open(exitum_dir + '/salve-mundi.rus.hdp.yml', 'rb') as exitum:
+        assert exitum.read() == hdp.export_yml({}, 'RUS')
+
+
+def test_core_bin_hdpcli_transpose_multiplum_error(monkeypatch):
+    monkeypatch.setattr(sys, 'argv', [
+        'hdpcli', '--transpose-multiplum', 'RUS,XYZ', TESTDIR])
+    hdpcli = HDPCLI()
+    args = hdpcli.make_args_hdpcli()
+    stderr = io.StringIO()
+
+    assert hdpcli.execute_cli(args, stderr=stderr) == hdpcli.EXIT_SYNTAX
+    assert '[XYZ]' in stderr.getvalue()
+
+    for processus in ['0', '-1']:
+        monkeypatch.setattr(sys, 'argv', [
+            'hdpcli', '--transpose-multiplum', 'RUS',
+            '--transpose-multiplum-processus', processus, TESTDIR])
+        args = hdpcli.make_args_hdpcli()
+        stderr = io.StringIO()
+
+        assert hdpcli.execute_cli(args, stderr=stderr) == \
+            hdpcli.EXIT_SYNTAX
+        assert '[' + processus + '] must be 1 or more' in stderr.getvalue()
+
+
+def test_core_bin_hdpcli_load_directory(tmp_path, monkeypatch):
+    # Enough files to use the process pool (HDP_PROCESSUS_MINIMUM_FILES)
+    with open(TESTDIR + '/salve-mundi.lat.hdp.yml') as hdp_file:
+        hdp_yml = hdp_file.read()
+    for idx in range(20):
+        (tmp_path / ('salve-mundi-' + str(idx) + '.lat.hdp.yml')).write_text(
+            hdp_yml.replace('salve-mundi', 'salve-mundi-' + str(idx)))
+
+    hdp_inline = HDP(hdp_entry_point=str(tmp_path), processus=1)
+    hdp_pool = HDP(hdp_entry_point=str(tmp_path), processus=2)
+    assert len(hdp_inline._hdp) == 20
+    assert list(hdp_pool._hdp) == list(hdp_inline._hdp)
+    assert hdp_pool.export_json() == hdp_inline.export_json()
+
+    # Policy checked before load each file
+    policy = AuxLoadPolicy()
+    policy.allowed_entrypoint_type = ()
+    hdp_policy = HDP(hdp_entry_point=str(tmp_path), processus=2,
+                     policy=policy)
+    assert len(hdp_policy._hdp) == 0
+
+    # The process pool is opt-in: HDP() alone never starts one
+    def _no_pool(*args, **kwargs):
+        raise AssertionError('HDP() started an process pool')
+    monkeypatch.setattr(
+        'hxlm.core.model.hdp.ProcessPoolExecutor', _no_pool)
+    hdp_default = HDP(hdp_entry_point=str(tmp_path))
+    assert hdp_default.export_json() == hdp_inline.export_json()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+
+# To output even more verbose results
+#     ./tests/test_core_bin_hxltmcli.py
+#
+# To test directly
+#     pytest -vv ./tests/test_core_bin_hxltmcli.py
+
+from hxlm.core.bin.hxltmcli import (
+    HXLTMArgumentum,
+    HXLTMASA,
+    HXLTMCLI,
+    HXLTMDatumConceptumSaccum,
+    HXLTMInFormatumTMX,
+    HXLTMInFormatumXLIFF,
+    HXLTMMetricae,
+    HXLTMTestumAuxilium,
+)
+import json
+import pathlib
+import re
+import pytest
+TESTDIR = str(pathlib.Path(__file__).parent.parent.absolute()) + \
+    '/testum/hxltm'
+EXEMPLUM = 'hxltm-exemplum-linguam.tm.hxl.csv'
+RESULTATUM_TMX = 'resultatum/hxltm-exemplum-linguam.tmx'
+RESULTATUM_XLIFF = 'resultatum/hxltm-exemplum-linguam.por-Latn--spa-Latn.xlf'
+
+
+def in_textum(formatum_classem, argumentum):
+    """Same output of HXLTMInFormatum.in_archivum(), but as Python str"""
+    hxltm_asa = HXLTMASA(
+        HXLTMTestumAuxilium.datum(EXEMPLUM),
+        ontologia=HXLTMTestumAuxilium.ontologia(),
+        argumentum=argumentum
+    )
+    formatum = formatum_classem(hxltm_asa)
+    return ''.join([rem + "\n" for rem in formatum.in_collectionem()])
+
+
+def argumentum_xliff(formatum_celer: bool = False):
+    argumentum = HXLTMArgumentum()
+    argumentum.est_fontem_linguam('por-Latn@pt')
+    argumentum.est_objectivum_linguam('spa-Latn@es')
+    argumentum.est_auxilium_linguam(None)
+    argumentum.est_auxilium_linguam(['epo-Latn@eo', 'eng-Latn@en'])
+    argumentum.formatum_celer = formatum_celer
+    return argumentum
+
+
+def resultatum(archivum):
+    with open(TESTDIR + '/' + archivum, 'r') as arch:
+        return arch.read()
+
+
+def test_core_bin_hxltmcli_formatum_celer_tmx():
+    argumentum = HXLTMArgumentum()
+    argumentum.formatum_celer = True
+    celer = in_textum(HXLTMInFormatumTMX, argumentum)
+    liquid = in_textum(HXLTMInFormatumTMX, HXLTMArgumentum())
+
+    assert celer == liquid
+    assert celer == resultatum(RESULTATUM_TMX)
+
+
+def test_core_bin_hxltmcli_formatum_celer_xliff():
+    celer = in_textum(HXLTMInFormatumXLIFF, argumentum_xliff(True))
+    liquid = in_textum(HXLTMInFormatumXLIFF, argumentum_xliff(False))
+
+    assert celer == liquid
+    assert celer == resultatum(RESULTATUM_XLIFF)
+
+
+def test_core_bin_hxltmcli_metricae():
+    argumentum = HXLTMArgumentum()
+    argumentum.metricae = '/dev/null'
+    hxltm_asa = HXLTMASA(
+        HXLTMTestumAuxilium.datum(EXEMPLUM),
+        ontologia=HXLTMTestumAuxilium.ontologia(),
+        argumentum=argumentum
+    )
+    formatum = HXLTMInFormatumTMX(hxltm_asa)
+    textum = ''.join([rem + "\n" for rem in formatum.in_collectionem()])
+    metricae = formatum.metricae.v()
+    conceptum_quantitatem = textum.count('<tu ')
+
+    assert textum == resultatum(RESULTATUM_TMX)
+    assert list(metricae['sectionem'].keys()) == \
+        ['initiale', 'corporeum', 'finale', 'especiale']
+    assert metricae['conceptum']['quantitatem'] == conceptum_quantitatem
+    # initiale, corporeum, finale: each template is compiled only once
+    assert metricae['formulam']['compilatum'] == 3
+    assert metricae['formulam']['cache_hits'] == conceptum_quantitatem - 1
+
+
+def test_core_bin_hxltmcli_metricae_stderr(monkeypatch, capsys):
+    # --metricae without an file path is stderr, like urnresolver --metricae
+    monkeypatch.setattr('sys.argv', ['hxltmcli', EXEMPLUM, '--metricae'])
+    assert HXLTMCLI().make_args_hxltmcli().metricae == '-'
+    monkeypatch.setattr('sys.argv', ['hxltmcli', EXEMPLUM])
+    assert HXLTMCLI().make_args_hxltmcli().metricae is None
+
+    HXLTMMetricae('HXLTMInFormatumTMX').in_archivum('-')
+    captured = capsys.readouterr()
+    assert captured.out == ''
+    assert json.loads(captured.err)['formatum'] == 'HXLTMInFormatumTMX'
+
+
+def test_core_bin_hxltmcli_grupum_intervallum():
+    ordinatum = [['C1', 'a'], ['C1', 'b'], ['', 'c'], ['C1', 'd'],
+                 ['C2', 'e'], ['C3', 'f'], ['C3', 'g']]
+    non_ordinatum = [['C2', 'a'], ['C1', 'b'], ['C2', 'c'], ['C3', 'd'],
+                     ['C1', 'e'], ['C1', 'f'], ['', 'g'], ['C2', 'h']]
+
+    assert list(HXLTMDatumConceptumSaccum.
+                iterandum_grupum_intervallum_de_datum(ordinatum)) == [
+        ('C1', [range(0, 2), range(3, 4)]),
+        ('C2', [range(4, 5)]),
+        ('C3', [range(5, 7)]),
+    ]
+
+    # limitem_memoriam=1: each interval goes to one temporary file
+    for limitem_memoriam in [1, 2, None]:
+        assert list(HXLTMDatumConceptumSaccum.
+                    iterandum_grupum_intervallum_de_datum(
+                        non_ordinatum,
+                        limitem_memoriam=limitem_memoriam)) == [
+            ('C2', [range(0, 1), range(2, 3), range(7, 8)]),
+            ('C1', [range(1, 2), range(4, 6)]),
+            ('C3', [range(3, 4)]),
+        ]
+
+    assert HXLTMDatumConceptumSaccum.reducendum_grupum_indicem_de_datum(
+        non_ordinatum, [0, 1])['C2a'] == [0]
+
+    # Keys that never decrease: no temporary files, only the previous key
+    clavem_de_lineam = HXLTMDatumConceptumSaccum._clavem_de_lineam()
+    assert HXLTMDatumConceptumSaccum._quod_ordinatum_est(
+        ordinatum, clavem_de_lineam)
+    assert not HXLTMDatumConceptumSaccum._quod_ordinatum_est(
+        non_ordinatum, clavem_de_lineam)
+
+    # Grouped, but decreasing keys (and keys with tab and new line, that
+    # go to the temporary files) keep the order of the first appearance
+    decrescens = [['C\t2', 'a'], ['C\t2', 'b'], ['C\n1', 'c'],
+                  ['C\t2', 'd'], ['C\n1', 'e']]
+    for limitem_memoriam in [1, 2, None]:
+        assert list(HXLTMDatumConceptumSaccum.
+                    iterandum_grupum_intervallum_de_datum(
+                        decrescens,
+                        limitem_memoriam=limitem_memoriam)) == [
+            ('C\t2', [range(0, 2), range(3, 4)]),
+            ('C\n1', [range(2, 3), range(4, 5)]),
+        ]
+
+
+def test_core_bin_hxltmcli_limitem_lineam():
+    def datum_lineam(argumentum):
+        hxltm_asa = HXLTMASA(
+            HXLTMTestumAuxilium.datum(EXEMPLUM),
+            ontologia=HXLTMTestumAuxilium.ontologia(),
+            argumentum=argumentum
+        )
+        return [lineam[0] for lineam in hxltm_asa.datum.datum]
+
+    omnes = datum_lineam(HXLTMArgumentum())
+
+    argumentum = HXLTMArgumentum()
+    argumentum.limitem_quantitatem = 3
+    argumentum.limitem_initiale_lineam = 2
+    assert datum_lineam(argumentum) == omnes[2:5]
+
+    # Default limit reached without customization: abort
+    argumentum = HXLTMArgumentum()
+    argumentum.LIMITEM_QUANTITATEM_DEFALLO = 3
+    argumentum.limitem_quantitatem = 3
+    with pytest.raises(ValueError):
+        datum_lineam(argumentum)
+
+    argumentum.est_ad_astra(True)
+    assert datum_lineam(argumentum) == omnes[:3]
+
+
+def test_core_bin_hxltmcli_ad_hoc_multiplum():
+    argumentum = HXLTMArgumentum()
+    argumentum.est_objectivum_linguam('spa-Latn@es')
+    hxltm_asa = HXLTMASA(
+        HXLTMTestumAuxilium.datum(EXEMPLUM),
+        ontologia=HXLTMTestumAuxilium.ontologia(),
+        argumentum=argumentum
+    )
+    hxltm_asa.AD_HOC_LIMITEM = 2
+    expressionem = ['I18N_testum_salve_mundi_testum_I18N',
+                    'L10N_ego_codicem', 'non_conceptum']
+
+    resultatum = hxltm_asa.ad_hoc_multiplum(expressionem + expressionem)
+
+    assert resultatum == \
+        ['¡Hola mundo!', 'spa-Latn', '!!!non_conceptum!!!'] * 2
+    assert list(hxltm_asa._ad_hoc_collectionem.keys()) == expressionem[1:]
+
+    # Same HXLTMAdHoc (and concept search) for the same expression
+    ad_hoc = hxltm_asa._ad_hoc_collectionem['L10N_ego_codicem']
+    hxltm_asa.ad_hoc('L10N_ego_codicem')
+    assert hxltm_asa._ad_hoc_collectionem['L10N_ego_codicem'] is ad_hoc
+
+
+def test_core_bin_hxltmcli_limitem_lineam_formatum():
+    """--limitem-* ranges on the exported files, first concept included"""
+    tuid = re.compile('<tu tuid="([^"]+)"')
+    unit_id = re.compile('<unit id="([^"]+)"')
+    omnes = tuid.findall(in_textum(HXLTMInFormatumTMX, HXLTMArgumentum()))
+    assert omnes[0] == 'L10N_ego_summarius'
+
+    for initiale, quantitatem in [(0, 2), (1, 2), (2, 3)]:
+        for formatum_celer in [False, True]:
+            argumentum = HXLTMArgumentum()
+            argumentum.formatum_celer = formatum_celer
+            argumentum.limitem_initiale_lineam = initiale
+            argumentum.limitem_quantitatem = quantitatem
+            assert tuid.findall(in_textum(
+                HXLTMInFormatumTMX, argumentum)) == \
+                omnes[initiale:initiale + quantitatem]
+
+            argumentum = argumentum_xliff(formatum_celer)
+            argumentum.limitem_initiale_lineam = initiale
+            argumentum.limitem_quantitatem = quantitatem
+            assert unit_id.findall(in_textum(
+                HXLTMInFormatumXLIFF, argumentum)) == \
+                omnes[initiale:initiale + quantitatem]
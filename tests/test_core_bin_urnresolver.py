@@ -6,14 +6,35 @@
 # To test directly
 #     pytest -vv ./tests/test_core_bin_urnresolver.py
 
+from hxlm.core.bin.urnresolver import (
+    URNResolver,
+    URNResolverServitium
+)
 from hxlm.core.schema.urn.util import (
+    compile_urn_index,
+    find_urn_resolver_local,
     get_urn_resolver_from_csv,
     get_urn_resolver_from_json,
     get_urn_resolver_from_yml,
-    # get_urn_resolver_local,
+    get_urn_resolver_local,
+    get_urn_resolver_remote,
+    get_urn_resolver_remotes,
+    get_urn_pattern_literals,
+    URNIndex,
+    URNTrie
 )
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import io
+import json
 import os
+import re
+import shutil
+import sys
+import threading
+from wsgiref.util import setup_testing_defaults
 import pathlib
+import pytest
 TESTDIR = str(pathlib.Path(__file__).parent.absolute()) + '/urnresolver'
 TEST_SIG_A = 'urn:data:xz:hxl:standard:core:hashtag'
 
@@ -54,6 +75,381 @@ def test_core_bin_urnresolver_yml():
     assert result2 == "urn:data:un:unece:locode"
 
 
+def test_core_bin_urnresolver_urn_index(tmp_path):
+    urn_dir = str(tmp_path / 'urn')
+    shutil.copytree(TESTDIR + '/all-in-same-dir', urn_dir)
+    index_file = str(tmp_path / 'cache' / 'urnresolver.index')
+    rules = get_urn_resolver_local(urn_dir)
+
+    index = compile_urn_index(rules, [urn_dir], index_file)
+    urn_index = URNIndex(index_file, [urn_dir])
+
+    assert urn_index.is_fresh()
+    assert urn_index.hash() == index['hash']
+    assert urn_index.rules() == rules
+    assert urn_index.lookup(TEST_SIG_A) == search_by_urn(TEST_SIG_A, rules)
+    assert urn_index.lookup('urn:data:xz:non-existent') == []
+
+    # Any change on the sources (even new files) make the index stale
+    with open(urn_dir + '/new.urn.csv', 'w') as new_file:
+        new_file.write('urn:data:xz:new,https://example.org/new.csv\n')
+    assert not URNIndex(index_file, [urn_dir]).is_fresh()
+    assert URNIndex(index_file).is_fresh()
+
+    # YAML values that marshal can not write (like dates) are saved as str
+    with open(urn_dir + '/date.urn.yml', 'w') as yml_file:
+        yml_file.write('- urn: urn:data:xz:date\n  updated: 2021-03-01\n' +
+                       '  source:\n    - https://example.org/date.csv\n')
+    compile_urn_index(get_urn_resolver_local(urn_dir), [urn_dir], index_file)
+    urn_index = URNIndex(index_file, [urn_dir])
+    assert urn_index.is_fresh()
+    assert urn_index.lookup('urn:data:xz:date')[0]['updated'] == '2021-03-01'
+
+
+def test_core_bin_urnresolver_pattern_literals():
+    # No false negatives: if re.search matches, the prefilter must accept
+    for pattern, urn in [
+            (r'a\x41b', 'aAb'),
+            (r'a\u0041b', 'aAb'),
+            (r'a\101b', 'aAb'),
+            (r'^a\N{LATIN CAPITAL LETTER A}b', 'aAb'),
+            (r'[^]]x', 'ax'),
+            (r'[]a]x', 'ax'),
+            (r'[\]a]b', 'ab'),
+            (r'^urn:\d+:x?y', 'urn:12:y'),
+            (r'^urn:data:xz:hxl:.*hashtag$', 'urn:data:xz:hxl:std:hashtag')]:
+        assert re.search(pattern, urn)
+        prefix, literals = get_urn_pattern_literals(pattern)
+        assert urn.startswith(prefix), pattern
+        assert all(literal in urn for literal in literals), pattern
+
+
+def test_core_bin_urnresolver_urn_multiplum(tmp_path, monkeypatch):
+    manifest = tmp_path / 'manifest.txt'
+    manifest.write_text(TEST_SIG_A + '\n\nurn:data:xz:non-existent\n' +
+                        'urn:data:un:locode\n')
+    monkeypatch.setattr(sys, 'argv', [
+        'urnresolver', '--urn-multiplum', str(manifest),
+        '--urn-index-local', TESTDIR + '/all-in-same-dir/',
+        '--no-urn-user-defaults', '--no-urn-vendor-defaults'])
+    urnresolver = URNResolver()
+    urnresolver.URN_MULTIPLUM_LIMITEM = 1
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+
+    resultatum = urnresolver.execute_cli(
+        urnresolver.make_args_urnresolver(), stdout=stdout, stderr=stderr)
+
+    assert resultatum == urnresolver.EXIT_ERROR
+    assert stdout.getvalue().splitlines() == [
+        '#item+conceptum+codicem,#item+rem+i_qcc+is_zxxx+ix_urn',
+        TEST_SIG_A + ',https://docs.google.com/spreadsheets/d/' +
+        '1En9FlmM8PrbTWgl3UHPF_MXnJ6ziVZFhBbojSJzBdLI/pub?gid=319251406' +
+        '&single=true&output=csv',
+        'urn:data:xz:non-existent,',
+        'urn:data:un:locode,urn:data:un:unece:locode'
+    ]
+    assert 'urn:data:xz:non-existent' in stderr.getvalue()
+
+
+def test_core_bin_urnresolver_merge(monkeypatch):
+    monkeypatch.setattr(sys, 'argv', [
+        'urnresolver', '--urn-index-local', TESTDIR + '/all-in-same-dir/',
+        '--no-urn-user-defaults', '--no-urn-index'])
+    urnresolver = URNResolver()
+    args = urnresolver.make_args_urnresolver()
+
+    rules = urnresolver.get_urn_rules(
+        args, urnresolver.get_urn_sources(args))
+    urns = [item['urn'] for item in rules]
+
+    assert len(urns) == len(set(urns))
+    # local (--urn-index-local) has precedence over vendor defaults
+    assert search_by_urn(TEST_SIG_A, rules)[0]['urnref'] == \
+        '00-named-urn.json'
+    assert (TEST_SIG_A, '00-named-urn.json',
+            'urnresolver-default.urn.yml') in urnresolver.urn_conflicts
+
+
+def test_core_bin_urnresolver_find(monkeypatch):
+    monkeypatch.setattr(sys, 'argv', [
+        'urnresolver', '--urn-index-local', TESTDIR + '/all-in-same-dir/',
+        '--no-urn-user-defaults', '--no-urn-index', TEST_SIG_A])
+    urnresolver = URNResolver()
+    args = urnresolver.make_args_urnresolver()
+    sources = urnresolver.get_urn_sources(args)
+
+    assert urnresolver.is_urn_quaerendum_simplex(args, sources)
+
+    # Same precedence of the fully loaded (and merged) rules
+    rules = urnresolver.get_urn_rules(args, sources)
+    for item in rules:
+        assert find_urn_resolver_local(
+            item['urn'], [source_ for _, source_ in sources]) == item
+    assert find_urn_resolver_local(
+        'urn:data:xz:non-existent', [TESTDIR + '/all-in-same-dir/']) is None
+
+    stdout = io.StringIO()
+    monkeypatch.setattr(sys, 'stdout', stdout)
+    urnresolver.execute_cli(args, stderr=io.StringIO())
+    assert stdout.getvalue() == \
+        search_by_urn(TEST_SIG_A, rules)[0]['source'][0] + '\n'
+
+
+def test_core_bin_urnresolver_find_local_not_found(monkeypatch):
+    # The URN is on the vendor defaults, but --urn-index-local is required
+    monkeypatch.setattr(sys, 'argv', [
+        'urnresolver', '--urn-index-local', TESTDIR + '/non-existent/',
+        '--no-urn-user-defaults', '--no-urn-index', TEST_SIG_A])
+    urnresolver = URNResolver()
+    args = urnresolver.make_args_urnresolver()
+
+    assert urnresolver.is_urn_quaerendum_simplex(
+        args, urnresolver.get_urn_sources(args))
+    with pytest.raises(RuntimeError, match='non-existent/] not found'):
+        urnresolver.execute_cli(args, stderr=io.StringIO())
+
+
+def test_core_bin_urnresolver_metricae(tmp_path, monkeypatch):
+    metricae_file = str(tmp_path / 'metricae.json')
+    monkeypatch.setattr(sys, 'argv', [
+        'urnresolver', '--urn-index-local', TESTDIR + '/naptr/',
+        '--no-urn-user-defaults', '--no-urn-index',
+        '--metricae', metricae_file, 'urn:data:xz:non-existent'])
+    urnresolver = URNResolver()
+    args = urnresolver.make_args_urnresolver()
+    urnresolver.execute_cli(args, stderr=io.StringIO())
+
+    with open(metricae_file, 'r') as metricae_f:
+        metricae = json.load(metricae_f)
+
+    # Not found on the first files, so everything was loaded
+    assert metricae['find_first']['found'] is False
+    assert metricae['sources'][TESTDIR + '/naptr/']['entries'] == 1
+    assert metricae['sources'][TESTDIR + '/naptr/']['rewrite_rules'] == 4
+    assert metricae['merge']['urns'] == \
+        metricae['merge']['entries'] - metricae['merge']['duplicates']
+    assert metricae['lookup']['miss'] == 1
+    assert metricae['rewrite']['cache_misses'] >= 1
+    assert metricae['total']['seconds'] >= metricae['merge']['seconds']
+
+
+def test_core_bin_urnresolver_urn_list(monkeypatch):
+    def urn_list(*argv, trie=False):
+        monkeypatch.setattr(sys, 'argv', [
+            'urnresolver', '--no-urn-user-defaults', '--no-urn-index'] +
+            list(argv))
+        urnresolver = URNResolver()
+        args = urnresolver.make_args_urnresolver()
+        rules = urnresolver.get_urn_rules(
+            args, urnresolver.get_urn_sources(args))
+        urns = [item['urn'] for item in rules]
+        positions = urnresolver.get_urn_list_positions(
+            args, rules, URNTrie(urns) if trie else None)
+        return urns, [urns[position] for position in positions]
+
+    urns, resultatum = urn_list('--urn-list')
+    assert resultatum == urns
+    assert urn_list('--urn-list', '--limit', '3', '--offset', '2')[1] == \
+        urns[2:5]
+
+    for trie in [False, True]:
+        assert urn_list('--urn-list-prefix', 'urn:data:xz:hxl:',
+                        trie=trie)[1] == \
+            [urn for urn in urns if urn.startswith('urn:data:xz:hxl:')]
+
+        # The prefilter must not change the result of a full regex search
+        for pattern in ['^urn:data:un.*codes$', 'hxl:standard', 'un|br',
+                        '^urn:data:xz:h(x)?l', 'core:[a-z]+$', 'xz:.{3}:']:
+            assert urn_list('--urn-list-pattern', pattern,
+                            trie=trie)[1] == \
+                [urn for urn in urns if re.search(pattern, urn)]
+
+
+def test_core_bin_urnresolver_servitium(tmp_path, monkeypatch):
+    urn_dir = str(tmp_path / 'urn')
+    shutil.copytree(TESTDIR + '/all-in-same-dir', urn_dir)
+    monkeypatch.setattr(sys, 'argv', [
+        'urnresolver', '--urn-index-local', urn_dir,
+        '--no-urn-user-defaults', '--no-urn-vendor-defaults'])
+    urnresolver = URNResolver()
+    args = urnresolver.make_args_urnresolver()
+    servitium = URNResolverServitium(
+        urnresolver, args, urnresolver.get_urn_sources(args))
+    servitium.INTERVALLUM_VERIFICANDUM = 0
+
+    def request(path, method='GET', body=b'', headers=None):
+        environ = {'PATH_INFO': path.split('?')[0],
+                   'QUERY_STRING': path.partition('?')[2],
+                   'REQUEST_METHOD': method,
+                   'CONTENT_LENGTH': str(len(body)),
+                   'wsgi.input': io.BytesIO(body)}
+        environ.update(headers or {})
+        setup_testing_defaults(environ)
+        response = {}
+
+        def start_response(status, response_headers):
+            response['status'] = status
+            response['headers'] = dict(response_headers)
+
+        response['body'] = b''.join(
+            servitium(environ, start_response)).decode('utf-8')
+        return response
+
+    response = request('/urn:data:un:locode')
+    assert response['status'] == '200 OK'
+    assert response['body'] == "urn:data:un:unece:locode\n"
+    assert request('/urn:data:xz:non-existent')['status'] == \
+        '404 Not Found'
+    response_post = request('/', 'POST',
+                            b'urn:data:un:locode\nurn:data:xz:none\n')
+    assert response_post['body'].splitlines()[1:] == \
+        ['urn:data:un:locode,urn:data:un:unece:locode', 'urn:data:xz:none,']
+    assert 'ETag' not in response_post['headers']
+    assert 'Cache-Control' not in response_post['headers']
+    assert request('/', 'POST', b'urn:data:\xff\n')['status'] == \
+        '400 Bad Request'
+    servitium.LIMITEM_CORPUS = 16
+    assert request('/', 'POST', b'urn:data:un:locode\n')['status'] == \
+        '413 Payload Too Large'
+    del servitium.LIMITEM_CORPUS
+    assert request('/?prefix=urn:data:un')['body'] == "urn:data:un:locode\n"
+
+    etag = response['headers']['ETag']
+    assert request('/urn:data:un:locode', headers={
+        'HTTP_IF_NONE_MATCH': etag})['status'] == '304 Not Modified'
+
+    # Hot reload when the sources change on disk
+    with open(urn_dir + '/new.urn.csv', 'w') as new_file:
+        new_file.write('urn:data:xz:new,https://example.org/new.csv\n')
+    response = request('/urn:data:xz:new')
+    assert response['body'] == "https://example.org/new.csv\n"
+    assert response['headers']['ETag'] != etag
+
+    # Source saved with an syntax error (like in the middle of an edit):
+    # the previous rules are still served
+    etag = response['headers']['ETag']
+    with open(urn_dir + '/zz-name-urn.urn.yml', 'a') as yml_file:
+        yml_file.write('\n- urn: [unclosed\n')
+    response = request('/urn:data:xz:new')
+    assert response['status'] == '200 OK'
+    assert response['body'] == "https://example.org/new.csv\n"
+    assert response['headers']['ETag'] == etag
+
+    # YAML values that are not strings (like dates) do not stop the service
+    shutil.copy(TESTDIR + '/all-in-same-dir/zz-name-urn.urn.yml', urn_dir)
+    with open(urn_dir + '/zz-name-urn.urn.yml', 'a') as yml_file:
+        yml_file.write('\n- urn: urn:data:xz:date\n  updated: 2021-03-01\n' +
+                       '  source:\n    - https://example.org/date.csv\n')
+    servitium = URNResolverServitium(
+        urnresolver, args, urnresolver.get_urn_sources(args))
+    assert request('/urn:data:xz:date')['body'] == \
+        "https://example.org/date.csv\n"
+
+
+def test_core_bin_urnresolver_naptr(tmp_path, monkeypatch):
+    manifest = tmp_path / 'manifest.txt'
+    manifest.write_text('urn:data:xz:example:abc\n' +
+                        'urn:data:xz:old-example:abc\n' +
+                        'urn:data:xz:hashtag\n' +
+                        'urn:data:xz:non-existent\n')
+    index_file = str(tmp_path / 'urnresolver.index')
+    argv = ['urnresolver', '--urn-index-local', TESTDIR + '/naptr/',
+            '--urn-index-file', index_file, '--no-urn-user-defaults',
+            '--no-urn-vendor-defaults']
+    resultatum = [
+        '#item+conceptum+codicem,#item+rem+i_qcc+is_zxxx+ix_urn',
+        'urn:data:xz:example:abc,https://example.org/abc.csv|' +
+        'https://mirror.example.org/abc.csv',
+        'urn:data:xz:old-example:abc,https://example.org/abc.csv|' +
+        'https://mirror.example.org/abc.csv',
+        'urn:data:xz:hashtag,https://example.org/hashtag.csv',
+        'urn:data:xz:non-existent,'
+    ]
+
+    def urn_multiplum(*argv_):
+        monkeypatch.setattr(sys, 'argv', argv + list(argv_))
+        urnresolver = URNResolver()
+        stdout = io.StringIO()
+        urnresolver.execute_cli(urnresolver.make_args_urnresolver(),
+                                stdout=stdout, stderr=io.StringIO())
+        return stdout.getvalue().splitlines()
+
+    assert urn_multiplum('--all', '--urn-multiplum', str(manifest)) == \
+        resultatum
+
+    # Rewrite rules are also on the compiled index
+    urn_multiplum('--urn-index-compile')
+    assert len(URNIndex(index_file).rewrite_rules()) == 4
+    assert urn_multiplum('--all', '--urn-multiplum', str(manifest)) == \
+        resultatum
+
+
+class ETagHTTPRequestHandler(SimpleHTTPRequestHandler):
+    """SimpleHTTPRequestHandler (Last-Modified only) with ETag"""
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        self.requests.append((self.path, self.headers.get('If-None-Match')))
+        self.etag = None
+        if os.path.isfile(path):
+            self.etag = '"' + str(os.stat(path).st_mtime_ns) + '"'
+            if self.headers.get('If-None-Match') == self.etag:
+                self.send_response(304)
+                self.end_headers()
+                return None
+        return super().send_head()
+
+    def end_headers(self):
+        if getattr(self, 'etag', None):
+            self.send_header('ETag', self.etag)
+        super().end_headers()
+
+
+def test_core_bin_urnresolver_remote(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(
+        ETagHTTPRequestHandler, directory=TESTDIR))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    iri = 'http://127.0.0.1:' + str(server.server_port)
+    ETagHTTPRequestHandler.requests = []
+
+    try:
+        result_csv, result_json = get_urn_resolver_remotes(
+            [iri + '/csv/urn.csv', iri + '/json/urn.json'],
+            cache_dir=cache_dir)
+        assert result_csv == [
+            dict(item, urnref=iri + '/csv/urn.csv')
+            for item in get_urn_resolver_from_csv(TESTDIR + '/csv/urn.csv')]
+        assert result_json[0]['urn'] == TEST_SIG_A
+        assert len(ETagHTTPRequestHandler.requests) == 2
+
+        # Inside TTL: no request at all
+        assert get_urn_resolver_remote(
+            iri + '/csv/urn.csv', cache_dir=cache_dir) == result_csv
+        assert len(ETagHTTPRequestHandler.requests) == 2
+
+        # After TTL: conditional request (304)
+        assert get_urn_resolver_remote(
+            iri + '/csv/urn.csv', cache_dir=cache_dir, ttl=0,
+            stale=0) == result_csv
+        assert ETagHTTPRequestHandler.requests[-1][1] is not None
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # Server offline: the cached version is still used
+    assert get_urn_resolver_remote(
+        iri + '/csv/urn.csv', cache_dir=cache_dir, ttl=0, stale=0,
+        timeout=1) == result_csv
+    assert get_urn_resolver_remote(
+        iri + '/yml/urn.yml', cache_dir=cache_dir, timeout=1) is None
+
+
 test_core_bin_urnresolver_csv()
 # test_core_bin_urnresolver_json()
 # test_core_bin_urnresolver_yml()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+# To output even more verbose results
+#     ./tests/test_core_hdp.py
+#
+# To test directly
+#     pytest -vv ./tests/test_core_hdp.py
+
+from hxlm.core.hdp.util.common import (
+    checksum,
+    check_integrity,
+    get_merkle_tree,
+    transpose_hsilo,
+    TransposeFragmentCache
+)
+from hxlm.core.internal.integrity import (
+    verify_merkle_proof,
+    MerkleTree
+)
+import json
+import time
+
+
+def synthetic_hsilo(total: int) -> list:
+    return [{
+        '([Lingua Latina])': None,
+        'hsilo': {'nomen': 'test', 'tag': ['test']},
+        'hdatum': [{
+            'id': 'datum-' + str(idx),
+            'meta': {'descriptionem': 'Lorem ipsum',
+                     'fontem': {'iri': 'https://example.org/' + str(idx)}}
+        } for idx in range(total)]
+    }]
+
+
+def test_core_hdp_transpose_incremental():
+    for total in [100, 10000]:
+        hsilo = synthetic_hsilo(total)
+        cache = TransposeFragmentCache()
+        transpose_hsilo(hsilo, 'RUS', 'LAT', cache=cache)
+        assert cache.cache_misses == total + 2
+
+        # One key changed: only one fragment is transposed again (but all
+        # fragments are still hashed to find it)
+        hsilo[0]['hdatum'][total // 2]['meta']['descriptionem'] = 'Salve'
+        cache_misses = cache.cache_misses
+        result = transpose_hsilo(hsilo, 'RUS', 'LAT', cache=cache)
+
+        assert cache.cache_misses - cache_misses == 1
+        assert json.dumps(result) == json.dumps(
+            transpose_hsilo(hsilo, 'RUS', 'LAT'))
+
+    # With track(), edits done with update() only cost their path: much
+    # less than an transpose of the entire document
+    hsilo = synthetic_hsilo(20000)
+    cache = TransposeFragmentCache()
+    tree = cache.track(hsilo)
+    transpose_hsilo(hsilo, 'RUS', 'LAT', cache=cache)
+    elapsed_full = []
+    elapsed_tracked = []
+    for idx in range(3):
+        start = time.perf_counter()
+        transpose_hsilo(hsilo, 'RUS', 'LAT')
+        elapsed_full.append(time.perf_counter() - start)
+
+        cache.update((0, 'hdatum', idx * 1000, 'meta', 'descriptionem'),
+                     {'nomen': 'Salve ' + str(idx)})
+        start = time.perf_counter()
+        result = transpose_hsilo(hsilo, 'RUS', 'LAT', cache=cache)
+        elapsed_tracked.append(time.perf_counter() - start)
+
+        assert json.dumps(result) == json.dumps(
+            transpose_hsilo(hsilo, 'RUS', 'LAT'))
+    assert min(elapsed_tracked) * 20 < min(elapsed_full)
+    assert tree.hexdigest() == MerkleTree(hsilo).hexdigest()
+
+    # Same JSON, different keys (int and str): not the same fragment
+    cache = TransposeFragmentCache()
+    for hdatum in [{1: 'a'}, {'1': 'a'}]:
+        hsilo = [{'([Lingua Latina])': None, 'hdatum': [hdatum]}]
+        assert transpose_hsilo(hsilo, 'RUS', 'LAT', cache=cache) == \
+            transpose_hsilo(hsilo, 'RUS', 'LAT')
+
+
+def test_core_hdp_merkle():
+    hsilo = synthetic_hsilo(100)
+    tree = get_merkle_tree(hsilo[0])
+
+    # The root is an checksum, like CRC32, and check_integrity verify it
+    merkle = checksum(hsilo, 'MERKLE')[0].replace("''", "'")
+    assert merkle.endswith('"' + tree.hexdigest() + '")')
+    hsilo[0]['([Lingua Latina])'] = [merkle]
+    assert check_integrity(hsilo)
+
+    # After edits, only the path is hashed again, with the same result
+    tree.update(('hdatum', 50, 'meta', 'descriptionem'), 'Salve')
+    tree.update(('hdatum', 3), {'id': 'novum', 'tag': [1, 2.5, None]})
+    tree.update(('hsilo', 'grupum'), ['test'])
+    assert tree.hexdigest() == MerkleTree(
+        json.loads(json.dumps(tree.thing))).hexdigest()
+
+    # One subtree verified without the rest of the document
+    proof = json.loads(json.dumps(tree.get_proof(('hdatum', 50))))
+    assert verify_merkle_proof(
+        tree.hexdigest(), tree.thing['hdatum'][50], proof)
+    assert not verify_merkle_proof(
+        tree.hexdigest(), tree.thing['hdatum'][49], proof)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+# Import time budget of hxlm.core and the command line tools, measured with
+# python -X importtime on an new process.
+#
+# To test directly
+#     pytest -vv ./tests/test_core_import.py
+
+import json
+import os
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+ROOTDIR = str(pathlib.Path(__file__).parent.parent.absolute())
+
+# Seconds. Generous (slow CI machines): about 5x the time measured when
+# this test was written
+IMPORT_BUDGET = {
+    'hxlm.core': 1.5,
+    'hxlm.core.bin.hdpcli': 2.5,
+    'hxlm.core.bin.hxl2tab': 2.5,
+    'hxlm.core.bin.hxlquickimport': 2.5,
+    'hxlm.core.bin.hxlquickmeta': 2.5,
+    'hxlm.core.bin.hxltmcli': 2.5,
+    'hxlm.core.bin.hxltmdexml': 2.5,
+    'hxlm.core.bin.urnprovider_local': 2.5,
+    'hxlm.core.bin.urnresolver': 2.5,
+}
+
+_IMPORTTIME_CODE = """import sys
+sys.stderr.write('--\\n')
+import {0}
+common = sys.modules.get('hxlm.core.hdp.util.common')
+print(json.dumps(sorted(common._KNOWLEDGE_GRAPHS) if common else []))
+"""
+
+
+def importtime(module: str) -> tuple:
+    """Import module on an new process. Returns (seconds, knowledge graphs
+    loaded on import)"""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = ROOTDIR
+    if os.environ.get('PYTHONPATH'):
+        env['PYTHONPATH'] += os.pathsep + os.environ['PYTHONPATH']
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         'import json; ' + _IMPORTTIME_CODE.format(module)],
+        env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, check=False)
+    if result.returncode != 0:
+        if 'ModuleNotFoundError' in result.stderr:
+            # Optional dependency (like pandas) not installed
+            pytest.skip(result.stderr.strip().splitlines()[-1])
+        raise RuntimeError(result.stderr)
+
+    # import time: self [us] | cumulative | imported package
+    # Only the top level imports after the marker (not python startup)
+    microseconds = 0
+    lines = result.stderr.split('--\n', 1)[1].splitlines()
+    for line in lines:
+        if not line.startswith('import time:'):
+            continue
+        _self, cumulative, name = line.split('|')
+        if not name.startswith('  '):
+            microseconds += int(cumulative)
+
+    return (microseconds / 1000000, json.loads(result.stdout))
+
+
+@pytest.mark.parametrize('module', sorted(IMPORT_BUDGET))
+def test_core_import_budget(module):
+    seconds, knowledge_graphs = importtime(module)
+
+    # HDP_VKG and CORE_LKG are loaded on first use, not on import
+    assert knowledge_graphs == []
+    assert seconds < IMPORT_BUDGET[module], \
+        module + ' import took ' + str(round(seconds, 3)) + 's'
@@ -19,9 +19,12 @@ from hxlm.core.constant import (
 from hxlm.core.htype.urn import (
     cast_urn,
     is_urn,
+    parse_data_urn,
     GenericUrnHtype,
     HdpUrnHtype
 )
+import dataclasses
+import pytest
 
 from hxlm.core.schema.urn.util import (
     get_urn_resolver_local
@@ -234,6 +237,28 @@ def test_core_htype_urn_cast_b():
 # print('cast_urn urn_ietf1', urn_ietf1.nid, urn_ietf1.get_resources())
 
 
+def test_core_htype_urn_parse_cache():
+    urn_string = 'urn:data--i:xz:hxlcplp:fod:bool'
+    parsed = parse_data_urn(urn_string)
+
+    # interned and immutable
+    assert parse_data_urn(urn_string) is parsed
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        parsed.nid = 'other'
+
+    urn_item1 = cast_urn(urn_string).prepare()
+    urn_item2 = cast_urn(urn_string).prepare()
+    urn_item2.bpln = 'changed'
+
+    # GenericUrnHtype objects still are independent
+    assert urn_item1 is not urn_item2
+    assert urn_item1.about() == {
+        'nid': 'data', 'nid_attr': 'i', 'bpgp': 'xz', 'bpln': 'hxlcplp',
+        'nss': 'xz:hxlcplp:fod:bool'}
+    assert urn_item1.about('base_paths') == ['xz/hxlcplp/']
+    assert urn_item2.about('base_paths') == ['xz/changed/']
+
+
 # test_core_htype_urn_is_urn_generic_valid()
 # test_core_htype_urn_is_urn_invalid()
 # test_core_schema_urn_test1()